@@ -0,0 +1,159 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from benchmarks.simulator import Latency, SimulatorConfig, TranslationSimulator
+from benchmarks.synthetic import generate_vocab_db
+from src import pipeline
+from src.concurrency import TokenBucket
+from src.resilience import reset_breakers
+from src.vocab import connect_vocab, read_lookups
+
+# Code paths of the translation backends, each called with (source_lang, sentence, word) items
+PATHS: Dict[str, Callable[[List[Tuple[str, str, str]], int], List[str]]] = {
+    'google': lambda items, workers: pipeline.translate([(lang, word) for lang, _, word in items], 'en', workers),
+    'google_pack': lambda items, workers: pipeline.translate(
+        [(lang, word) for lang, _, word in items], 'en', workers, pack=True
+    ),
+    'google_context': lambda items, workers: pipeline.translate_with_context(items, 'en', workers),
+    'openai': lambda items, workers: pipeline.translate_openai(items, 'en', 'sk-simulated', 'simulated', workers),
+    'furigana': lambda items, workers: pipeline.add_furigana(
+        [sentence for _, sentence, _ in items], 'sk-simulated', 'simulated', workers
+    ),
+}
+
+
+def make_items(n_items: int, seed: int = 0) -> List[Tuple[str, str, str]]:
+    """Distinct (source_lang, sentence, word) items taken from a synthetic vocab.db."""
+    # Words are long-tailed, a quarter of the lookups are distinct words at most
+    data = read_lookups(connect_vocab(generate_vocab_db(n_items * 10, seed=seed)))
+    unique = data[['Word language', 'Sentence', 'Word']].drop_duplicates(['Word language', 'Word'])
+    return list(unique.head(n_items).itertuples(index=False, name=None))
+
+
+class _CountingHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+def run_path(
+    simulator: TranslationSimulator, path: str, items: List[Tuple[str, str, str]], workers: int
+) -> Dict[str, Any]:
+    """
+    Translate the items through one code path against the simulator.
+
+    Returns:
+        throughput, latency percentiles of the requests and the number of requests per outcome
+    """
+    # Failed translations are counted instead of printed
+    warnings = _CountingHandler()
+    pipeline.logger.addHandler(warnings)
+    pipeline.logger.propagate = False
+    simulator.reset()
+    # Every run starts with closed circuits, a circuit opened by the previous path would only measure rejections
+    reset_breakers()
+    # Every run starts with an empty translation cache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ['KVTA_CACHE_PATH'] = os.path.join(cache_dir, 'translations.sqlite3')
+        start = time.perf_counter()
+        try:
+            PATHS[path](items, workers)
+        finally:
+            pipeline.logger.removeHandler(warnings)
+            pipeline.logger.propagate = True
+        seconds = time.perf_counter() - start
+
+    latencies = np.array([record.seconds for record in simulator.records])
+    outcomes: Dict[str, int] = {}
+    for record in simulator.records:
+        outcomes[record.outcome] = outcomes.get(record.outcome, 0) + 1
+    return {
+        'path': path,
+        'items': len(items),
+        'seconds': round(seconds, 4),
+        'items_per_second': round(len(items) / seconds, 2) if seconds > 0 else None,
+        'requests': len(latencies),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2) if len(latencies) else None,
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 2) if len(latencies) else None,
+        'outcomes': outcomes,
+        'warnings': warnings.count,
+    }
+
+
+def run(
+    paths: Sequence[str], n_items: int, workers: int, config: SimulatorConfig, google_rate: float = 0
+) -> List[Dict[str, Any]]:
+    items = make_items(n_items, config.seed)
+    environ = dict(os.environ)
+    rate_limiter = pipeline.google_rate_limiter
+    pipeline.google_rate_limiter = TokenBucket(google_rate)
+    try:
+        with TranslationSimulator(config) as simulator:
+            os.environ[pipeline.GOOGLE_URL_ENV] = simulator.google_url
+            os.environ['OPENAI_BASE_URL'] = simulator.openai_url
+            return [run_path(simulator, path, items, workers) for path in paths]
+    finally:
+        pipeline.google_rate_limiter = rate_limiter
+        os.environ.clear()
+        os.environ.update(environ)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.load',
+        description='Measure the translation code paths against a local simulator of Google Translate and OpenAI.',
+    )
+    parser.add_argument('--paths', nargs='+', choices=PATHS, default=list(PATHS), help='code paths to measure')
+    parser.add_argument('--items', type=int, default=200, help='distinct words to translate')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent requests')
+    parser.add_argument(
+        '--latency',
+        type=Latency.parse,
+        default=Latency('lognormal', 0.05, 0.5),
+        help='fixed:A, uniform:A:B or lognormal:A:B',
+    )
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='probability of a 429 response')
+    parser.add_argument('--timeout', type=float, default=0.0, help='probability of a request hanging without answer')
+    parser.add_argument('--stall', type=float, default=0.5, help='seconds a timed out request hangs')
+    parser.add_argument('--malformed', type=float, default=0.0, help='probability of a malformed batch output')
+    parser.add_argument('--google-rate', type=float, default=0, help='Google requests per second, 0 for no limit')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    config = SimulatorConfig(
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        timeout=args.timeout,
+        stall=args.stall,
+        malformed=args.malformed,
+        seed=args.seed,
+    )
+    results = run(args.paths, args.items, args.workers, config, args.google_rate)
+    text = json.dumps({'workers': args.workers, 'config': repr(config), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+    for r in results:
+        sys.stderr.write(
+            f'{r["path"]:<16} {r["items_per_second"]:>9} items/s  p50 {r["p50_ms"]} ms  p99 {r["p99_ms"]} ms  '
+            f'{r["requests"]} requests {r["outcomes"]}\n'
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_vocab_db
+from src import pipeline
+from src.export import build_export_table, write_csv, write_table_apkg
+from src.query import VocabFilter, VocabQuery
+from src.stats import compute_stats
+from src.vocab import connect_vocab, read_lookups
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+# A stage is reported as a regression when it gets slower than the baseline by more than this factor
+DEFAULT_TOLERANCE = 1.25
+
+
+def _stub_translate(rows: Sequence[tuple], *args: Any, **kwargs: Any) -> List[str]:
+    """Stand in for a translation backend: the last field of every row, upper-cased."""
+    return [str(row[-1]).upper() for row in rows]
+
+
+STUB_TRANSLATORS = pipeline.Translators(
+    translate=_stub_translate,
+    translate_with_context=_stub_translate,
+    translate_openai=_stub_translate,
+    add_furigana=lambda sentences, *args, **kwargs: list(sentences),
+)
+
+
+def _best_of(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_size(n_lookups: int, repeat: int) -> List[Dict[str, Any]]:
+    """
+    Time every stage of the pipeline on a synthetic vocab.db.
+
+    Args:
+        n_lookups: number of lookups in the database
+        repeat: runs per stage, the fastest one is reported
+
+    Returns:
+        one record per stage
+    """
+    db = generate_vocab_db(n_lookups, seed=n_lookups)
+    data = read_lookups(connect_vocab(db))
+    langs = tuple(sorted(data['Word language'].unique())[:3])
+    vocab_filter = VocabFilter(top_n=int(n_lookups * 0.8), langs=langs)
+    translated = pipeline.make_more_columns(
+        data.copy(), 'en', ['Word', 'Stem'], 'Word only', translators=STUB_TRANSLATORS
+    )
+    columns = ['Word', 'Stem', 'Sentence', 'translated_word', 'translated_stem']
+    table = build_export_table(translated, columns, 'Cloze deletion')
+
+    def filtering() -> None:
+        query = VocabQuery.from_bytes(db)
+        query.count(vocab_filter)
+        query.distinct('Book title', vocab_filter)
+        query.fetch(vocab_filter)
+
+    def export_csv() -> None:
+        with tempfile.TemporaryFile('w+', encoding='utf-8', newline='') as output:
+            write_csv(table, output)
+
+    def export_apkg() -> None:
+        with tempfile.TemporaryFile() as output:
+            write_table_apkg(table, output)
+
+    stages: Dict[str, Callable[[], Any]] = {
+        'ingest': lambda: read_lookups(connect_vocab(db)),
+        'filter': filtering,
+        'translate_stub': lambda: pipeline.make_more_columns(
+            data.copy(), 'en', ['Word', 'Stem'], 'Word only', translators=STUB_TRANSLATORS
+        ),
+        'stats': lambda: compute_stats(data),
+        'highlight': lambda: build_export_table(translated, columns, 'Cloze deletion'),
+        'export_csv': export_csv,
+        'export_apkg': export_apkg,
+    }
+    return [
+        {'size': n_lookups, 'stage': name, 'seconds': round(_best_of(func, repeat), 6)}
+        for name, func in stages.items()
+    ]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: Sequence[int], repeat: int) -> Dict[str, Any]:
+    results = []
+    for size in sizes:
+        results.extend(bench_size(size, repeat))
+    return {
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compare the timings with a previous report.
+
+    Returns:
+        the stages slower than the baseline by more than `tolerance`, with their ratio
+    """
+    previous = {(r['size'], r['stage']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    for record in report['results']:
+        before = previous.get((record['size'], record['stage']))
+        if before and record['seconds'] > before * tolerance:
+            regressions.append({**record, 'baseline': before, 'ratio': round(record['seconds'] / before, 2)})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.run', description='Time the pipeline on synthetic Kindle databases.'
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='lookups per database')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the fastest is reported')
+    parser.add_argument('-o', '--output', help='write the JSON report to this file instead of stdout')
+    parser.add_argument('--baseline', help='JSON report of a previous run to compare with')
+    parser.add_argument(
+        '--tolerance', type=float, default=DEFAULT_TOLERANCE, help='slowdown factor reported as a regression'
+    )
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.repeat)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report['regressions'] = compare(report, json.load(f), args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+    for record in report['results']:
+        sys.stderr.write(f'{record["size"]:>8} {record["stage"]:<16} {record["seconds"]:.4f}s\n')
+    for record in report.get('regressions', []):
+        sys.stderr.write(f'REGRESSION {record["size"]} {record["stage"]}: {record["ratio"]}x slower than baseline\n')
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import html
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# Outcomes of a simulated request
+OK = 'ok'
+RATE_LIMITED = 'rate_limited'
+TIMED_OUT = 'timed_out'
+MALFORMED = 'malformed'
+
+
+@dataclass(frozen=True)
+class Latency:
+    """
+    Distribution of the service time of a request, in seconds.
+
+    `fixed:A` always waits A, `uniform:A:B` between A and B, `lognormal:A:B` has median A and shape B.
+    """
+
+    kind: str = 'fixed'
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Latency':
+        kind, *values = spec.split(':')
+        if kind not in ('fixed', 'uniform', 'lognormal') or not 1 <= len(values) <= 2:
+            raise ValueError(f'Invalid latency "{spec}", expected fixed:A, uniform:A:B or lognormal:A:B')
+        numbers = [float(value) for value in values]
+        return cls(kind, numbers[0], numbers[1] if len(numbers) > 1 else 0.0)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == 'uniform':
+            return rng.uniform(self.a, self.b)
+        if self.kind == 'lognormal':
+            return rng.lognormvariate(0, self.b) * self.a
+        return self.a
+
+
+@dataclass
+class SimulatorConfig:
+    """Behaviour of the simulated backends; the probabilities apply to every request independently."""
+
+    latency: Latency = field(default_factory=Latency)
+    rate_limit: float = 0.0
+    # Seconds sent in the retry-after header of rate limited responses
+    retry_after: float = 0.05
+    # Timed out requests hang for `stall` seconds and are then dropped without a response
+    timeout: float = 0.0
+    stall: float = 0.5
+    # Malformed responses lose a line of a batch, or the whole translation of a single text
+    malformed: float = 0.0
+    seed: int = 0
+
+
+@dataclass
+class RequestRecord:
+    backend: str
+    outcome: str
+    seconds: float
+
+
+def fake_translate(text: str) -> str:
+    """Translate like the simulator does: upper-case, which keeps line breaks and context markers intact."""
+    return text.upper()
+
+
+def _furigana_output(prompt: str, malformed: bool) -> str:
+    sentences = re.findall(r'^(\d+)\. (.*)$', prompt.split('Sentences:\n', 1)[-1], re.MULTILINE)
+    if malformed:
+        del sentences[len(sentences) // 2]
+    # Sentences come back without readings, which is still a valid annotation
+    return json.dumps({'sentences': [{'id': int(n), 'annotated': sentence} for n, sentence in sentences]})
+
+
+def _openai_output(prompt: str, malformed: bool, structured: bool) -> str:
+    numbered = re.findall(r'(\d+)\. Word: "([^"]+)"', prompt)
+    if numbered:
+        if malformed:
+            # Models sometimes skip an item of the batch
+            del numbered[len(numbered) // 2]
+        if structured:
+            return json.dumps(
+                {'translations': [{'id': int(n), 'translation': fake_translate(w)} for n, w in numbered]}
+            )
+        return '\n'.join(f'{n}. {fake_translate(word)}' for n, word in numbered)
+    if malformed:
+        return ''
+    word = re.search(r'Translate the word "([^"]+)"', prompt)
+    if word:
+        return fake_translate(word.group(1))
+    sentence = re.search(r'^Sentence: (.*)$', prompt, re.MULTILINE)
+    return sentence.group(1) if sentence else ''
+
+
+def _response_body(text: str) -> Dict[str, Any]:
+    return {
+        'id': 'resp_simulated',
+        'object': 'response',
+        'created_at': int(time.time()),
+        'model': 'simulated',
+        'status': 'completed',
+        'parallel_tool_calls': False,
+        'tool_choice': 'auto',
+        'tools': [],
+        'output': [
+            {
+                'type': 'message',
+                'id': 'msg_simulated',
+                'status': 'completed',
+                'role': 'assistant',
+                'content': [{'type': 'output_text', 'text': text, 'annotations': []}],
+            }
+        ],
+    }
+
+
+class TranslationSimulator:
+    """
+    Local HTTP server standing in for Google Translate and the OpenAI Responses API.
+
+    It answers the requests of `deep_translator.GoogleTranslator` on `/m` and of the `openai` client on
+    `/v1/responses`, translating by upper-casing, with configurable latency, rate limits, timeouts and malformed
+    outputs. Point the app at it with `KVTA_GOOGLE_URL=<google_url>` and `OPENAI_BASE_URL=<openai_url>`.
+
+        with TranslationSimulator(SimulatorConfig(rate_limit=0.1)) as sim:
+            os.environ['KVTA_GOOGLE_URL'] = sim.google_url
+            ...
+            print(sim.records)
+    """
+
+    def __init__(self, config: Optional[SimulatorConfig] = None, port: int = 0) -> None:
+        self.config = config or SimulatorConfig()
+        self.records: List[RequestRecord] = []
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    @property
+    def google_url(self) -> str:
+        return f'{self.url}/m'
+
+    @property
+    def openai_url(self) -> str:
+        return f'{self.url}/v1'
+
+    def start(self) -> 'TranslationSimulator':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'TranslationSimulator':
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.records = []
+
+    def _draw(self) -> Tuple[str, float]:
+        """Pick the outcome and service time of a request."""
+        config = self.config
+        with self._lock:
+            roll = self._rng.random()
+            delay = max(0.0, config.latency.sample(self._rng))
+        if roll < config.rate_limit:
+            return RATE_LIMITED, 0.0
+        roll -= config.rate_limit
+        if roll < config.timeout:
+            return TIMED_OUT, config.stall
+        roll -= config.timeout
+        return (MALFORMED if roll < config.malformed else OK), delay
+
+    def _record(self, backend: str, outcome: str, start: float) -> None:
+        with self._lock:
+            self.records.append(RequestRecord(backend, outcome, time.perf_counter() - start))
+
+    def _handler(self) -> type:
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                start = time.perf_counter()
+                url = urlsplit(self.path)
+                if url.path != '/m':
+                    self._send(404, b'', 'text/plain')
+                    return
+                text = parse_qs(url.query).get('q', [''])[0]
+                outcome = self._serve()
+                if outcome is None:
+                    simulator._record('google', TIMED_OUT, start)
+                    return
+                if outcome == RATE_LIMITED:
+                    self._send(429, b'Too Many Requests', 'text/plain')
+                else:
+                    lines = fake_translate(text).split('\n')
+                    if outcome == MALFORMED:
+                        # A pack loses a line, a single text comes back without a translation
+                        lines = lines[:-1]
+                    body = f'<div class="result-container">{html.escape(chr(10).join(lines))}</div>' if lines else ''
+                    self._send(200, f'<html><body>{body}</body></html>'.encode(), 'text/html; charset=utf-8')
+                simulator._record('google', outcome, start)
+
+            def do_POST(self) -> None:
+                start = time.perf_counter()
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if urlsplit(self.path).path != '/v1/responses':
+                    self._send(404, b'{}', 'application/json')
+                    return
+                outcome = self._serve()
+                if outcome is None:
+                    simulator._record('openai', TIMED_OUT, start)
+                    return
+                if outcome == RATE_LIMITED:
+                    error = {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_exceeded'}}
+                    self._send(
+                        429,
+                        json.dumps(error).encode(),
+                        'application/json',
+                        {'retry-after': str(simulator.config.retry_after)},
+                    )
+                else:
+                    prompt = str(body.get('input', ''))
+                    if body.get('text', {}).get('format', {}).get('name') == 'furigana':
+                        text = _furigana_output(prompt, outcome == MALFORMED)
+                    else:
+                        text = _openai_output(prompt, outcome == MALFORMED, 'text' in body)
+                    self._send(200, json.dumps(_response_body(text)).encode(), 'application/json')
+                simulator._record('openai', outcome, start)
+
+            def _serve(self) -> Optional[str]:
+                """Wait for the simulated service time; None if the request times out and gets no response."""
+                outcome, delay = simulator._draw()
+                time.sleep(delay)
+                if outcome == TIMED_OUT:
+                    self.close_connection = True
+                    return None
+                return outcome
+
+            def _send(self, status: int, data: bytes, content_type: str, headers: Dict[str, str] = {}) -> None:
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
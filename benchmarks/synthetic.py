@@ -0,0 +1,90 @@
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+from typing import Dict, List, Sequence
+
+# Syllables used to build words that look different in every language
+SYLLABLES: Dict[str, List[str]] = {
+    'es': ['ca', 'sa', 'mi', 'lo', 'ra', 'te', 'pue', 'ción', 'do', 'na'],
+    'en': ['th', 'ing', 'er', 'str', 'ow', 'ea', 'ly', 'ck', 'ight', 'on'],
+    'de': ['sch', 'ei', 'ung', 'ach', 'ver', 'lich', 'tz', 'en', 'ge', 'keit'],
+    'fr': ['ou', 'eau', 'ment', 'que', 'ais', 'tion', 'eur', 'ille', 'con', 'gne'],
+    'ja': ['日', '本', '語', 'の', '学', '生', 'き', 'る', '見', 'た'],
+}
+DEFAULT_LANGUAGES = ('es', 'en', 'de', 'fr', 'ja')
+START = datetime.datetime(2022, 1, 1)
+
+
+def _make_word(rng: random.Random, lang: str) -> str:
+    return ''.join(rng.choice(SYLLABLES[lang]) for _ in range(rng.randint(2, 4)))
+
+
+def generate_vocab_db(
+    n_lookups: int,
+    languages: Sequence[str] = DEFAULT_LANGUAGES,
+    n_books: int = 20,
+    seed: int = 0,
+) -> bytes:
+    """
+    Generate a Kindle vocab.db with the WORDS, BOOK_INFO and LOOKUPS tables.
+
+    Words are drawn with a long-tailed distribution, so that like in real vocabularies some are looked up many times,
+    and the lookups are spread over two years of reading.
+
+    Args:
+        n_lookups: number of rows in LOOKUPS
+        languages: word languages, see SYLLABLES
+        n_books: number of books, each one in a single language
+        seed: seed of the random generator, the same seed gives the same database
+
+    Returns:
+        content of the database file
+    """
+    rng = random.Random(seed)
+    n_words = max(10, n_lookups // 4)
+    words = []
+    seen = set()
+    for i in range(n_words):
+        lang = languages[i % len(languages)]
+        word = _make_word(rng, lang)
+        while (word, lang) in seen:
+            word += rng.choice(SYLLABLES[lang])
+        seen.add((word, lang))
+        stem = word[: max(2, len(word) - 1)]
+        words.append((f'{lang}:{word}', word, stem, lang))
+
+    books = [(f'book{i}', f'Book {i} ({languages[i % len(languages)]})', f'Author {i % 7}') for i in range(n_books)]
+    books_by_lang: Dict[str, List[str]] = {}
+    for book_id, _, _ in books:
+        books_by_lang.setdefault(languages[int(book_id[4:]) % len(languages)], []).append(book_id)
+
+    span = 2 * 365 * 24 * 3600 * 1000
+    start = int(START.timestamp() * 1000)
+    timestamps = sorted(start + rng.randrange(span) for _ in range(n_lookups))
+    lookups = []
+    for ts in timestamps:
+        word_key, word, _, lang = words[
+            min(int(rng.paretovariate(1.2)) - 1, n_words - 1) if rng.random() < 0.5 else rng.randrange(n_words)
+        ]
+        filler = ' '.join(_make_word(rng, lang) for _ in range(rng.randint(3, 12)))
+        sentence = f'{filler} {word} {filler[::-1]}.'
+        lookups.append((word_key, rng.choice(books_by_lang.get(lang) or [books[0][0]]), sentence, ts))
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        con = sqlite3.connect(path)
+        con.execute('CREATE TABLE WORDS (id TEXT, word TEXT, stem TEXT, lang TEXT)')
+        con.execute('CREATE TABLE BOOK_INFO (id TEXT, title TEXT, authors TEXT)')
+        con.execute('CREATE TABLE LOOKUPS (word_key TEXT, book_key TEXT, usage TEXT, timestamp INTEGER)')
+        con.executemany('INSERT INTO WORDS VALUES (?, ?, ?, ?)', words)
+        con.executemany('INSERT INTO BOOK_INFO VALUES (?, ?, ?)', books)
+        con.executemany('INSERT INTO LOOKUPS VALUES (?, ?, ?, ?)', lookups)
+        con.commit()
+        con.close()
+        with open(path, 'rb') as f:
+            return f.read()
+    finally:
+        os.unlink(path)
@@ -1,6 +1,6 @@
 import streamlit as st
 
-from src.utils import init_session_state
+from src.utils import init_session_state, show_session_memory
 
 st.set_page_config(
     page_title='Kindle Vocabulary to Anki converter',
@@ -13,7 +13,9 @@ pages = [
     st.Page('pages/step_1_data_upload.py', title='Step 1: Upload the data', icon='👀'),
     st.Page('pages/step_2_data_translate.py', title='Step 2: Translate the data', icon='📖'),
     st.Page('pages/step_3_data_download.py', title='Step 3: Download the data', icon='⬇️'),
+    st.Page('pages/diagnostics.py', title='Diagnostics', icon='🩺'),
 ]
 
 pg = st.navigation(pages)
 pg.run()
+show_session_memory()
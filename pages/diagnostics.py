@@ -0,0 +1,55 @@
+import pandas as pd
+import streamlit as st
+
+from src.cache import get_translation_cache
+from src.governor import get_cache_governor
+from src.jobs import get_job_registry
+from src.query import vocab_query_report
+
+st.subheader('Memory')
+governor = get_cache_governor()
+
+col1, col2, col3 = st.columns(3)
+col1.metric('In-memory results', f'{governor.size_bytes / 2**20:.1f} MB', help='Results shared by all sessions')
+col2.metric('Budget', f'{governor.max_bytes / 2**20:.0f} MB', help='Set with KVTA_MEMORY_CACHE_MB')
+col3.metric('Eviction', governor.policy.upper(), help='Set with KVTA_MEMORY_CACHE_POLICY')
+
+jobs = get_job_registry().jobs()
+running = sum(not job.finished for job in jobs)
+st.caption(
+    f'Translation jobs: {running} running or queued, {len(jobs) - running} finished. Their results and previews are '
+    'kept within the budget until their session picks them up.'
+)
+
+cache = get_translation_cache()
+# The query tables are held by the sessions and the translations are on disk, so they don't count towards the budget
+reports = [(report, 'Memory budget') for report in governor.report()]
+reports += [(vocab_query_report(), 'Sessions'), (cache.report(), 'Disk')]
+st.dataframe(
+    pd.DataFrame(
+        {
+            'Kept for': [r.function for r, _ in reports],
+            'Kept in': [where for _, where in reports],
+            'Entries': [r.entries for r, _ in reports],
+            'Size (MB)': [round(r.size_bytes / 2**20, 2) for r, _ in reports],
+            'Hit rate': [f'{r.hit_rate:.0%}' for r, _ in reports],
+            'Hits': [r.hits for r, _ in reports],
+            'Misses': [r.misses for r, _ in reports],
+            'Evictions': [r.evictions for r, _ in reports],
+            'Expired': [r.expirations for r, _ in reports],
+        }
+    ),
+    hide_index=True,
+)
+
+if st.button(
+    'Clear the in-memory results',
+    help='Results not picked up yet are dropped too. Translations stay in the persistent cache.',
+):
+    governor.clear()
+    st.rerun()
+
+st.caption(
+    f'Persistent translation cache: {len(cache)} translations, {cache.size_bytes() / 2**20:.1f} MB '
+    f'of {cache.max_bytes / 2**20:.0f} MB in {cache.path}'
+)
@@ -27,7 +27,9 @@ This app converts Kindle vocabulary files into a table format that can be import
 
 ### Privacy
 
-This app does not store your data permanently. It is only saved in cache and will be cleared after your session ends.
+This app does not store your uploaded files. Individual translations are kept in a server-side translation cache,
+so that repeated words don't have to be translated again. If you use the incremental sync, your translated words
+are stored on the server until the next sync of the same device.
 
 Project link: https://github.com/Erlemar/KindleVocabToAnki
 """
@@ -1,20 +1,95 @@
+from typing import List
+
 import pandas as pd
 import streamlit as st
 
-from src.utils import get_data_from_vocab, show_vocabulary_stats
+from src.compact import compact_frame
+from src.incremental import get_sync_store
+from src.merge import SOURCE_COLUMN
+from src.stats import get_vocab_stats
+from src.utils import get_data_from_vocab, get_data_from_vocabs, get_vocab_sync_info, show_vocabulary_stats
 
 st.subheader('Upload your kindle vocabulary file here')
 if st.session_state.loaded_data.shape[0] > 0:
     st.write('The data is already uploaded. You can upload a new file, if necessary.')
 
+st.checkbox(
+    'Only new lookups since the last sync',
+    key='incremental',
+    help='Extract and translate only the words looked up after your previous translation of this device. '
+    'The new translations are merged with the previous ones. Every new lookup is translated, so the filters of '
+    'step 2 are not available.',
+)
+
+
+def load_vocabs(dbs: List[st.runtime.uploaded_file_manager.UploadedFile]) -> pd.DataFrame:
+    # Several devices are read in parallel and merged, the Source column tells where each lookup came from
+    bar = st.progress(0.0, text=f'Parsing {len(dbs)} vocabulary databases...')
+
+    def show_progress(loaded: int, total: int) -> None:
+        bar.progress(loaded / max(total, 1), text=f'Parsed {loaded} of {total} databases')
+
+    st.session_state.sync = None
+    st.session_state.sync_message = None
+    st.session_state.vocab_stats = None
+    st.session_state.vocab_query = None
+    if st.session_state.get('incremental'):
+        st.session_state.sync_message = 'Only new lookups are extracted when a single device is uploaded.'
+    data = get_data_from_vocabs(dbs, progress=show_progress)
+    bar.empty()
+    return data
+
+
+def load_vocab(dbs: List[st.runtime.uploaded_file_manager.UploadedFile]) -> pd.DataFrame:
+    if len(dbs) > 1:
+        return load_vocabs(dbs)
+    db = dbs[0]
+    # In the incremental mode only the lookups after the previous sync of this device are extracted
+    bar = st.progress(0.0, text='Parsing vocabulary database...')
+
+    def show_progress(loaded: int, total: int) -> None:
+        bar.progress(loaded / max(total, 1), text=f'Parsed {loaded} of {total} lookups')
+
+    st.session_state.sync = None
+    st.session_state.sync_message = None
+    st.session_state.vocab_stats = None
+    st.session_state.vocab_query = None
+    if not st.session_state.get('incremental'):
+        data = get_data_from_vocab(db, progress=show_progress)
+        bar.empty()
+        return data
+
+    source_key, latest, fingerprint = get_vocab_sync_info(db)
+    state = get_sync_store().get(source_key)
+    st.session_state.sync = {'source_key': source_key, 'watermark': latest, 'fingerprint': fingerprint}
+    since = state.watermark if state else None
+    data = get_data_from_vocab(db, since, progress=show_progress)
+    bar.empty()
+    if data.shape[0] == 0 and state:
+        st.session_state.translated_df = compact_frame(get_sync_store().load_dataset(source_key))
+        st.session_state.load_state = st.session_state.translated_df.shape[0] > 0
+        st.session_state.sync_message = (
+            'No new lookups since the last sync. The previous translations are ready in step 3.'
+        )
+    elif state:
+        st.session_state.sync_message = (
+            f'{data.shape[0]} new lookups since the last sync. '
+            f'They will be merged with {state.rows} previously translated words. '
+            'All of them are translated, the filters of step 2 are turned off.'
+        )
+    else:
+        st.session_state.sync_message = (
+            'First sync of this device: all lookups will be translated, the filters of step 2 are turned off.'
+        )
+    return data
+
 
 def get_vocab_data():
     st.session_state.data_type = 'db'
     if st.session_state.db:
         st.session_state.use_sample = None
         st.session_state.data_exists = False
-        with st.spinner('Parsing vocabulary database...'):
-            data = get_data_from_vocab(st.session_state.db)
+        data = load_vocab(st.session_state.db)
         if data.shape[0] == 0:
             st.session_state.loaded_data = pd.DataFrame()
             return
@@ -23,25 +98,32 @@ def get_vocab_data():
             st.error(f'Invalid database format. Expected columns: {expected_cols}')
             st.session_state.loaded_data = pd.DataFrame()
             return
-        st.session_state.loaded_data = data
+        # Kept in the session in compact form, the pages only take views of it
+        st.session_state.loaded_data = compact_frame(data)
 
 
 st.session_state.db = st.file_uploader(
-    'vocab.db', type='db', help='Upload the vocabulary file here', on_change=get_vocab_data
+    'vocab.db',
+    type='db',
+    accept_multiple_files=True,
+    help='Upload the vocabulary file here. Upload the files of several Kindles at once to merge them.',
+    on_change=get_vocab_data,
 )
 
 
 def get_sample_data():
     st.session_state.data_type = 'sample'
+    st.session_state.sync = None
+    st.session_state.sync_message = None
+    st.session_state.vocab_query = None
+    st.session_state.vocab_stats = None
     data = pd.read_csv('data_example/example_data.csv')
     st.session_state.data_exists = True
-    st.session_state.loaded_data = data
+    st.session_state.loaded_data = compact_frame(data)
     st.session_state.use_sample = True
 
 
 st.session_state.use_sample = st.button('Press the button to use a sample data', on_click=get_sample_data)
-if not st.session_state.db and not st.session_state.get('use_sample'):
-    st.cache_data.clear()
 
 
 def reset_data():
@@ -50,7 +132,10 @@ def reset_data():
     st.session_state.load_state = False
     st.session_state.data_exists = False
     st.session_state.data_type = None
-    st.cache_data.clear()
+    st.session_state.sync = None
+    st.session_state.sync_message = None
+    st.session_state.vocab_query = None
+    st.session_state.vocab_stats = None
 
 
 if st.session_state.loaded_data.shape[0] > 0:
@@ -65,12 +150,13 @@ if (
     if st.session_state.loaded_data.shape[0] > 0:
         data = st.session_state.loaded_data
     elif not st.session_state.use_sample and not st.session_state.data_exists:
-        with st.spinner('Parsing vocabulary database...'):
-            data = get_data_from_vocab(st.session_state.db)
-        st.session_state.loaded_data = data
+        data = st.session_state.loaded_data = compact_frame(load_vocab(st.session_state.db))
     else:
         data = st.session_state.loaded_data
 
+    if st.session_state.get('sync_message'):
+        st.info(st.session_state.sync_message)
+
     if data.shape[0] > 0:
         st.session_state.extracted = True
         st.subheader('Extracted data')
@@ -78,8 +164,12 @@ if (
             'This is the data extracted from the Kindle vocabulary file. You can sort it by clicking on any column name.'
         )
         cols_to_show = ['Word', 'Stem', 'Word language', 'Sentence', 'Book title', 'Authors', 'Timestamp']
-        st.dataframe(data[cols_to_show])
+        if SOURCE_COLUMN in data.columns:
+            cols_to_show.append(SOURCE_COLUMN)
+        st.dataframe(data, column_order=cols_to_show)
 
+        if st.session_state.vocab_stats is None:
+            st.session_state.vocab_stats = get_vocab_stats(data)
         my_expander1 = st.expander(label='Show vocabulary statistics')
         with my_expander1:
-            show_vocabulary_stats(data)
+            show_vocabulary_stats(st.session_state.vocab_stats)
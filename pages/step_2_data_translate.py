@@ -1,20 +1,97 @@
 import os
+from dataclasses import replace
 
 import pandas as pd
 import streamlit as st
 from deep_translator import GoogleTranslator
 
-from src.utils import estimate_openai_cost, make_more_columns
+from src.compact import compact_frame
+from src.dictionary import available_pairs, get_dictionaries
+from src.incremental import get_sync_store
+from src.jobs import CANCELLED, FAILED, Job, get_job_registry
+from src.openai_engine import MODELS
+from src.pipeline import DICTIONARY_BACKEND, translated_count
+from src.query import VocabFilter, get_vocab_query
+from src.utils import estimate_openai_cost, start_translation_job
+
+
+def finish_job(job: Job) -> None:
+    """Take the result of a finished translation job into the session."""
+    st.session_state.translation_job = None
+    st.query_params.pop('job', None)
+    if job.state == CANCELLED:
+        st.session_state.job_message = ('info', 'Translation cancelled.')
+        return
+    if job.state == FAILED:
+        st.session_state.job_message = ('error', f'Translation failed: {job.error}')
+        return
+    result = job.result
+    if result is None:
+        st.session_state.job_message = (
+            'warning',
+            'The translation finished, but its result was dropped from memory before this page picked it up. '
+            'Translate again: the words already translated are served from the cache.',
+        )
+        return
+    # The session keeps its own copy, the shared memory budget doesn't have to hold it any longer
+    job.release()
+    sync = st.session_state.get('sync')
+    if sync:
+        # Incremental mode: add the new translations to the ones from previous syncs
+        dedup_stats = result.attrs.get('dedup_stats')
+        result = get_sync_store().save(sync['source_key'], result, sync['watermark'], sync.get('fingerprint', ()))
+        result.attrs['dedup_stats'] = dedup_stats
+    st.session_state.job_message = ('warning', '\n\n'.join(job.warnings)) if job.warnings else None
+    st.session_state.translated_df = compact_frame(result)
+    st.session_state.load_state = True
+
+
+@st.fragment(run_every=1.0)
+def show_job(job_id: str) -> None:
+    """Poll a running translation job; the whole page is rerun once it's finished."""
+    job = get_job_registry().get(job_id)
+    if job is None:
+        st.session_state.translation_job = None
+        st.query_params.pop('job', None)
+        st.rerun()
+    if job.finished:
+        finish_job(job)
+        st.rerun()
+    step = f'{job.step} {job.done}/{job.total}' if job.total else job.step or 'Waiting for a free worker...'
+    st.progress(job.fraction, text=step)
+    st.button('Cancel', on_click=job.cancel, disabled=job.cancel_requested)
+    for warning in job.warnings[-5:]:
+        st.warning(warning)
+    if job.partial:
+        st.caption('Translated so far')
+        st.dataframe(pd.DataFrame(job.partial))
+
+
+# The job id is also kept in the URL, so a reconnected tab re-attaches to its running job
+job_id = st.session_state.get('translation_job') or st.query_params.get('job')
+if job_id and get_job_registry().get(job_id) is not None:
+    st.session_state.translation_job = job_id
+else:
+    job_id = st.session_state.translation_job = None
 
 st.subheader('Define translation parameters')
 my_expander2 = st.expander(label='Translation parameters', expanded=True)
 
 if 'loaded_data' in st.session_state and st.session_state.loaded_data.shape[0] > 0:
-    data = st.session_state.loaded_data.copy()
-    initial_count = data.shape[0]
+    if st.session_state.get('vocab_query') is None:
+        # Built on the first visit, and shared with the sessions that loaded the same data
+        st.session_state.vocab_query = get_vocab_query(st.session_state.loaded_data)
+    # Filters are compiled to SQL, only the matching rows are loaded into a DataFrame
+    query = st.session_state.vocab_query
+    initial_count = query.count()
+    # An incremental sync advances the watermark past every new lookup, so all of them have to be translated
+    incremental = bool(st.session_state.get('sync'))
 
     with my_expander2:
-        st.caption('Filters are applied in the numbered order.')
+        if incremental:
+            st.caption('Incremental sync: every new lookup is translated, the filters are turned off.')
+        else:
+            st.caption('Filters are applied in the numbered order.')
         # limit the number of rows
         col1_, col2_ = st.columns(2)
         with col1_:
@@ -22,8 +99,9 @@ if 'loaded_data' in st.session_state and st.session_state.loaded_data.shape[0] >
                 st.number_input(
                     '1. Take last N rows',
                     min_value=1,
-                    max_value=data.shape[0],
-                    value=data.shape[0],
+                    max_value=initial_count,
+                    value=initial_count,
+                    disabled=incremental,
                 )
             )
         with col2_:
@@ -31,20 +109,24 @@ if 'loaded_data' in st.session_state and st.session_state.loaded_data.shape[0] >
                 'Sort data by', options=['Timestamp', 'Word'], help='Select the column to sort the data by'
             )
 
-        data = data.sort_values(col_by)[-top_n:]
-        st.caption(f'After row limit: {data.shape[0]} rows (from {initial_count})')
+        vocab_filter = VocabFilter(top_n=None if incremental else top_n, sort_by=col_by)
+        n_rows = query.count(vocab_filter)
+        st.caption(f'After row limit: {n_rows} rows (from {initial_count})')
 
+        first_date, last_date = query.date_range(vocab_filter)
         d = st.date_input(
             label='2. Starting date',
-            value=pd.to_datetime(data['Timestamp']).dt.date.min(),
-            min_value=pd.to_datetime(data['Timestamp']).dt.date.min(),
-            max_value=pd.to_datetime(data['Timestamp']).dt.date.max(),
+            value=first_date,
+            min_value=first_date,
+            max_value=last_date,
             help='Change this value if you want to limit the data by the start date',
+            disabled=incremental,
         )
-        before_date = data.shape[0]
-        data = data.loc[pd.to_datetime(data['Timestamp']).dt.date >= d]
-        if data.shape[0] != before_date:
-            st.caption(f'After date filter: {data.shape[0]} rows (removed {before_date - data.shape[0]})')
+        before_date = n_rows
+        vocab_filter = replace(vocab_filter, start_date=None if incremental else d)
+        n_rows = query.count(vocab_filter)
+        if n_rows != before_date:
+            st.caption(f'After date filter: {n_rows} rows (removed {before_date - n_rows})')
 
         # select the target language
         langs_list = GoogleTranslator().get_supported_languages()
@@ -57,22 +139,61 @@ if 'loaded_data' in st.session_state and st.session_state.loaded_data.shape[0] >
         with col2__:
             translation_backend = st.selectbox(
                 'Translation backend',
-                options=['Google Translate', 'OpenAI'],
-                help='Google Translate is free. OpenAI provides higher-quality context-aware translations.',
+                options=['Google Translate', 'OpenAI', DICTIONARY_BACKEND],
+                help=(
+                    'Google Translate is free. OpenAI provides higher-quality context-aware translations. '
+                    'The offline dictionary looks words and stems up in local dictionary files and uses '
+                    'Google Translate for the rest.'
+                ),
             )
 
-        # Word translation style — only for Google Translate
+        # Word translation style — only for Google Translate and the offline dictionary
         translate_options = ['Word only', 'Use context']
-        if translation_backend == 'Google Translate':
+        pack_requests = False
+        reuse_stems = False
+        if translation_backend == DICTIONARY_BACKEND:
+            pairs = [f'{source} → {target}' for source, target in available_pairs()]
+            if pairs:
+                st.info(f'Offline dictionaries: {", ".join(pairs)}')
+            else:
+                st.warning(
+                    f'No dictionaries found in {get_dictionaries().directory}. Add TSV or StarDict files named '
+                    '<source>_<target>, e.g. es_en.tsv, or set KVTA_DICT_DIR; every word is translated online.'
+                )
+        if translation_backend in ('Google Translate', DICTIONARY_BACKEND):
             translate_option = st.selectbox(
                 'Word translation style',
                 options=translate_options,
                 help='Translate the word by itself or use the whole phrase as a context',
             )
+            pack_requests = st.checkbox(
+                'Pack words into combined requests',
+                value=True,
+                help='Translate many words and stems in one request. Much faster for large vocabularies.',
+            )
+            reuse_stems = st.checkbox(
+                'Translate each stem once',
+                value=False,
+                disabled=translate_option != 'Word only',
+                help=(
+                    'Inflected forms of a word, e.g. "arrimaba" and "arrimó", get the translation of their stem '
+                    '("arrimar"). Far fewer requests, but the translation is the one of the dictionary form.'
+                ),
+            )
         else:
             translate_option = 'Use context'
             st.info('OpenAI always uses sentence context for word translation.')
 
+        workers = int(
+            st.number_input(
+                'Parallel requests',
+                min_value=1,
+                max_value=16,
+                value=4,
+                help='Number of requests sent to the translation backend at the same time.',
+            )
+        )
+
         # OpenAI-specific controls
         openai_api_key = ''
         openai_model = 'gpt-4o-mini'
@@ -102,21 +223,12 @@ if 'loaded_data' in st.session_state and st.session_state.loaded_data.shape[0] >
 
             openai_model = st.selectbox(
                 'OpenAI model',
-                options=[
-                    'gpt-4o-mini',
-                    'gpt-4o',
-                    'gpt-4.1-nano',
-                    'gpt-4.1-mini',
-                    'gpt-4.1',
-                    'gpt-5-nano',
-                    'gpt-5-mini',
-                    'gpt-5',
-                ],
+                options=list(MODELS),
                 help='Nano/mini variants are cheapest and fastest; full gpt-4.1 and gpt-5 give the highest quality.',
             )
 
             # Furigana option — only if Japanese data is present
-            if 'ja' in data['Word language'].values:
+            if 'ja' in query.distinct('Word language', vocab_filter):
                 add_furigana_col = st.checkbox(
                     'Add furigana to Japanese sentences',
                     value=False,
@@ -130,45 +242,56 @@ if 'loaded_data' in st.session_state and st.session_state.loaded_data.shape[0] >
             help='Select the columns that will be translated',
         )
 
+        book_options = query.distinct('Book title', vocab_filter)
         books = st.multiselect(
             label='3. Filter by books',
-            options=data['Book title'].unique(),
-            default=data['Book title'].unique(),
+            options=book_options,
+            default=book_options,
             help='Select the books that will be translated',
+            disabled=incremental,
         )
-        if len(books) > 0:
-            before_books = data.shape[0]
-            data = data.loc[data['Book title'].isin(books)]
-            if data.shape[0] != before_books:
-                st.caption(f'After book filter: {data.shape[0]} rows (removed {before_books - data.shape[0]})')
+        if len(books) > 0 and not incremental:
+            before_books = n_rows
+            vocab_filter = replace(vocab_filter, books=tuple(books))
+            n_rows = query.count(vocab_filter)
+            if n_rows != before_books:
+                st.caption(f'After book filter: {n_rows} rows (removed {before_books - n_rows})')
 
+        author_options = query.distinct('Authors', vocab_filter)
         authors = st.multiselect(
             label='4. Filter by authors',
-            options=data['Authors'].unique(),
-            default=data['Authors'].unique(),
+            options=author_options,
+            default=author_options,
             help='Select the Authors that will be translated',
+            disabled=incremental,
         )
-        if len(authors) > 0:
-            before_authors = data.shape[0]
-            data = data.loc[data['Authors'].isin(authors)]
-            if data.shape[0] != before_authors:
-                st.caption(f'After author filter: {data.shape[0]} rows (removed {before_authors - data.shape[0]})')
+        if len(authors) > 0 and not incremental:
+            before_authors = n_rows
+            vocab_filter = replace(vocab_filter, authors=tuple(authors))
+            n_rows = query.count(vocab_filter)
+            if n_rows != before_authors:
+                st.caption(f'After author filter: {n_rows} rows (removed {before_authors - n_rows})')
 
+        lang_options = query.distinct('Word language', vocab_filter)
         langs_from = st.multiselect(
             label='5. Languages to translate',
-            options=data['Word language'].unique(),
-            default=data['Word language'].unique(),
+            options=lang_options,
+            default=lang_options,
             help='Select the languages that will be translated',
+            disabled=incremental,
         )
-        if len(langs_from) > 0:
-            before_langs = data.shape[0]
-            data = data.loc[data['Word language'].isin(langs_from)]
-            if data.shape[0] != before_langs:
-                st.caption(f'After language filter: {data.shape[0]} rows (removed {before_langs - data.shape[0]})')
+        if len(langs_from) > 0 and not incremental:
+            before_langs = n_rows
+            vocab_filter = replace(vocab_filter, langs=tuple(langs_from))
+            n_rows = query.count(vocab_filter)
+            if n_rows != before_langs:
+                st.caption(f'After language filter: {n_rows} rows (removed {before_langs - n_rows})')
+
+        data = query.fetch(vocab_filter)
 
         # Applied last so toggling it does not change the options of the filters above
-        drop_dupes = st.checkbox('6. Drop duplicate words (keep last occurrence)', value=False)
-        if drop_dupes:
+        drop_dupes = st.checkbox('6. Drop duplicate words (keep last occurrence)', value=False, disabled=incremental)
+        if drop_dupes and not incremental:
             before_dupes = data.shape[0]
             data = data.drop_duplicates('Word', keep='last')
             st.caption(f'After dedup: {data.shape[0]} rows (removed {before_dupes - data.shape[0]} duplicates)')
@@ -180,42 +303,68 @@ if 'loaded_data' in st.session_state and st.session_state.loaded_data.shape[0] >
             st.info(f'Estimated OpenAI cost: {cost} (approximate)')
 
         st.dataframe(
-            data.reset_index(drop=True).drop(
-                [col for col in data.columns if 'with' in col or 'translated' in col], axis=1
-            )
+            data,
+            column_order=[col for col in data.columns if 'with' not in col and 'translated' not in col],
+            hide_index=True,
         )
 
     # Disable button if OpenAI selected but no API key
     translate_disabled = translation_backend == 'OpenAI' and not openai_api_key
 
     def on_translate():
-        result = make_more_columns(
+        # Translation runs in the background, the page polls it and stays responsive
+        job = start_translation_job(
             data,
-            lang,
-            to_translate,
-            translate_option,
-            translation_backend,
-            openai_api_key,
-            openai_model,
-            add_furigana_col,
+            lang=lang,
+            to_translate=to_translate,
+            translate_option=translate_option,
+            translation_backend=translation_backend,
+            openai_api_key=openai_api_key,
+            openai_model=openai_model,
+            add_furigana_col=add_furigana_col,
+            workers=workers,
+            pack_requests=pack_requests,
+            reuse_stems=reuse_stems,
         )
-        st.session_state.translated_df = result
-        st.session_state.load_state = True
+        st.session_state.translation_job = job.id
+        st.query_params['job'] = job.id
+        st.session_state.job_message = None
+        st.session_state.load_state = False
 
     st.button(
         'Translate',
         on_click=on_translate,
-        disabled=translate_disabled,
+        disabled=translate_disabled or job_id is not None,
     )
 
     if translate_disabled:
         st.warning('Please provide an OpenAI API key to translate.')
 
-    if st.session_state.load_state:
-        translated_data = st.session_state.translated_df
-        st.success('Translation finished!', icon='✅')
-        cols_to_hide = [col for col in translated_data.columns if 'with' in col and col != 'sentence_with_furigana']
-        st.dataframe(translated_data.drop(cols_to_hide, axis=1))
-
-else:
+elif not job_id and not st.session_state.load_state:
     st.write('You need to upload some data in order to translate it.')
+
+if job_id:
+    show_job(job_id)
+
+if st.session_state.job_message:
+    kind, message = st.session_state.job_message
+    getattr(st, kind)(message)
+
+if st.session_state.load_state:
+    translated_data = st.session_state.translated_df
+    st.success('Translation finished!', icon='✅')
+    dedup_stats = translated_data.attrs.get('dedup_stats')
+    if dedup_stats and dedup_stats['lookups'] > 0:
+        metrics = [
+            ('Lookups', dedup_stats['lookups'], 'Texts that needed a translation'),
+            ('Translated', translated_count(dedup_stats), 'Unique texts sent to the translation backend'),
+            ('Duplicates saved', dedup_stats.get('deduplicated', 0), 'Repeated texts that reused a translation'),
+            ('Restored', dedup_stats.get('restored', 0), 'Texts of columns restored from an interrupted run'),
+            ('Reused', dedup_stats.get('reused', 0), 'Texts of columns copied from a column with the same key'),
+        ]
+        # The restored and reused texts are only shown when there are some
+        metrics = metrics[:3] + [metric for metric in metrics[3:] if metric[1]]
+        for col, (label, value, help_text) in zip(st.columns(len(metrics)), metrics):
+            col.metric(label, value, help=help_text)
+    cols_to_hide = [col for col in translated_data.columns if 'with' in col and col != 'sentence_with_furigana']
+    st.dataframe(translated_data, column_order=[col for col in translated_data.columns if col not in cols_to_hide])
@@ -1,7 +1,13 @@
 from datetime import datetime
+from functools import partial
 
 import streamlit as st
 
+from src.checkpoint import fingerprint
+from src.export import apkg_tempfile, csv_tempfile, default_export_columns
+from src.governor import get_cache_governor
+from src.highlight import HIGHLIGHT_FORMATS, HIGHLIGHT_RESULTS, highlight_variants
+
 st.subheader('Customize translated data')
 
 if 'translated_df' in st.session_state and st.session_state.translated_df.shape[0] > 0:
@@ -9,7 +15,7 @@ if 'translated_df' in st.session_state and st.session_state.translated_df.shape[
     options = st.multiselect(
         label='Columns to use',
         options=list(translated_data.columns),
-        default=['Word', 'Stem', 'Sentence'] + [col for col in translated_data.columns if 'translated' in col],
+        default=default_export_columns(list(translated_data.columns)),
         help='Select the columns you want to keep',
     )
 
@@ -25,37 +31,34 @@ if 'translated_df' in st.session_state and st.session_state.translated_df.shape[
 
     highlight = st.selectbox(
         label='Select highlight options',
-        options=(
-            'None',
-            'Replace with underscore',
-            'Surround with [] brackets',
-            'Surround with {} brackets',
-            'Bold',
-            'Cloze deletion',
-        ),
+        options=('None',) + tuple(HIGHLIGHT_FORMATS),
         index=0,
         help='separator',
     )
-    if highlight == 'None':
-        pass
-    elif highlight == 'Replace with underscore':
-        new_data['sentence_with_highlight'] = new_data.apply(lambda x: x.Sentence.replace(x.Word, '_'), axis=1)
-    elif highlight == 'Surround with [] brackets':
-        new_data['sentence_with_highlight'] = new_data.apply(
-            lambda x: x.Sentence.replace(x.Word, f'[{x.Word}]'), axis=1
-        )
-    elif highlight == 'Surround with {} brackets':
-        new_data['sentence_with_highlight'] = new_data.apply(
-            lambda x: x.Sentence.replace(x.Word, f'{{{x.Word}}}'), axis=1
-        )
-    elif highlight == 'Bold':
-        new_data['sentence_with_highlight'] = new_data.apply(
-            lambda x: x.Sentence.replace(x.Word, f'<b>{x.Word}</b>'), axis=1
-        )
-    elif highlight == 'Cloze deletion':
-        new_data['sentence_with_highlight'] = new_data.apply(
-            lambda x: x.Sentence.replace(x.Word, '{{c1::' + x.translated_word + '::' + x.Word + '}}'), axis=1
-        )
+    word_boundary = st.checkbox(
+        'Match whole words only',
+        value=False,
+        help='Only highlight the word where it stands alone, e.g. "cat" is not highlighted in "concatenate"',
+    )
+    if highlight != 'None':
+        # All variants are built at once and kept within the memory budget, so switching between them doesn't
+        # recompute anything. Keyed on the content: a new translation of the same rows has other cloze deletions.
+        highlighted = [col for col in ('Sentence', 'Word', 'translated_word') if col in translated_data.columns]
+        cache_key = f'{fingerprint(translated_data[highlighted])}:{word_boundary}'
+        found, variants = get_cache_governor().get(HIGHLIGHT_RESULTS, cache_key)
+        if not found:
+            variants = highlight_variants(
+                translated_data['Sentence'].tolist(),
+                translated_data['Word'].tolist(),
+                translations=(
+                    translated_data['translated_word'].tolist()
+                    if 'translated_word' in translated_data.columns
+                    else None
+                ),
+                word_boundary=word_boundary,
+            )
+            get_cache_governor().put(HIGHLIGHT_RESULTS, cache_key, variants)
+        new_data['sentence_with_highlight'] = variants[highlight]
 
     # Preview toggle
     preview_rows = st.slider(
@@ -75,18 +78,27 @@ if 'translated_df' in st.session_state and st.session_state.translated_df.shape[
 
     file_name = st.text_input('File name (without extension)', f'anki_table_{date}')
 
-    csv_data = new_data.to_csv(index=False, sep=sep, header=keep_header)
-
     col1, col2 = st.columns(2)
     with col1:
+        # The files are only written when a button is pressed, row chunk by row chunk to a temporary file
         st.download_button(
             label='Press to Download',
-            data=csv_data,
+            data=partial(csv_tempfile, new_data, sep, keep_header),
             file_name=f'{file_name}_{date}.csv',
             mime='text/csv',
             key='download-csv',
             help='Download as CSV file',
         )
+        deck_name = st.text_input('Anki deck name', 'Kindle vocabulary')
+        st.download_button(
+            label='Download Anki deck',
+            data=partial(apkg_tempfile, new_data, deck_name),
+            file_name=f'{file_name}_{date}.apkg',
+            mime='application/zip',
+            key='download-apkg',
+            help='Download as an Anki package. Open it with Anki to import the deck, '
+            'the first column is the front of the cards.',
+        )
     with col2:
         if new_data.shape[0] <= 200:
             tsv_data = new_data.to_csv(index=False, sep='\t', header=keep_header)
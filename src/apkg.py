@@ -0,0 +1,291 @@
+import hashlib
+import html
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import zipfile
+from typing import IO, Any, Collection, Iterable, Iterator, List, Sequence, Tuple, Union
+
+# Anki joins the fields of a note with this character
+FIELD_SEPARATOR = '\x1f'
+# Fields identifying a note, so the notes of a newer export keep their guid when only their translations changed
+IDENTITY_FIELDS = ('Word', 'Sentence', 'Timestamp')
+# Notes inserted per executemany call
+APKG_CHUNK_ROWS = 5000
+
+# Schema of an Anki 2.1 collection (version 11), which every Anki version can import
+COLLECTION_SCHEMA = """
+CREATE TABLE col (
+    id integer primary key, crt integer not null, mod integer not null, scm integer not null, ver integer not null,
+    dty integer not null, usn integer not null, ls integer not null, conf text not null, models text not null,
+    decks text not null, dconf text not null, tags text not null
+);
+CREATE TABLE notes (
+    id integer primary key, guid text not null, mid integer not null, mod integer not null, usn integer not null,
+    tags text not null, flds text not null, sfld integer not null, csum integer not null, flags integer not null,
+    data text not null
+);
+CREATE TABLE cards (
+    id integer primary key, nid integer not null, did integer not null, ord integer not null, mod integer not null,
+    usn integer not null, type integer not null, queue integer not null, due integer not null, ivl integer not null,
+    factor integer not null, reps integer not null, lapses integer not null, left integer not null,
+    odue integer not null, odid integer not null, flags integer not null, data text not null
+);
+CREATE TABLE revlog (
+    id integer primary key, cid integer not null, usn integer not null, ease integer not null, ivl integer not null,
+    lastIvl integer not null, factor integer not null, time integer not null, type integer not null
+);
+CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+"""
+# Created after the bulk insert, which is faster than maintaining them row by row
+COLLECTION_INDEXES = """
+CREATE INDEX ix_notes_usn on notes (usn);
+CREATE INDEX ix_cards_usn on cards (usn);
+CREATE INDEX ix_revlog_usn on revlog (usn);
+CREATE INDEX ix_cards_nid on cards (nid);
+CREATE INDEX ix_cards_sched on cards (did, queue, due);
+CREATE INDEX ix_revlog_cid on revlog (cid);
+CREATE INDEX ix_notes_csum on notes (csum);
+"""
+
+DEFAULT_DECK_CONF = {
+    'id': 1,
+    'name': 'Default',
+    'autoplay': True,
+    'maxTaken': 60,
+    'mod': 0,
+    'replayq': True,
+    'timer': 0,
+    'usn': 0,
+    'lapse': {'delays': [10], 'leechAction': 0, 'leechFails': 8, 'minInt': 1, 'mult': 0},
+    'new': {
+        'bury': True,
+        'delays': [1, 10],
+        'initialFactor': 2500,
+        'ints': [1, 4, 7],
+        'order': 1,
+        'perDay': 20,
+        'separate': True,
+    },
+    'rev': {'bury': True, 'ease4': 1.3, 'fuzz': 0.05, 'ivlFct': 1, 'maxIvl': 36500, 'minSpace': 1, 'perDay': 100},
+}
+CARD_CSS = '.card { font-family: arial; font-size: 20px; text-align: center; color: black; background-color: white; }'
+
+_HTML_TAG = re.compile(r'<[^>]+>')
+
+
+def anki_field_names(names: Sequence[str]) -> List[str]:
+    """Make column names valid and unique as Anki field names."""
+    result: List[str] = []
+    for i, name in enumerate(names):
+        field = re.sub(r'[:{}"]', '', str(name)).strip().lstrip('#^/') or f'Field {i + 1}'
+        while field in result:
+            field += '_'
+        result.append(field)
+    return result
+
+
+def _stable_id(*parts: str) -> int:
+    """Id derived from names, so exporting the same deck again updates it on import instead of duplicating it."""
+    digest = hashlib.sha1(FIELD_SEPARATOR.join(parts).encode('utf-8')).hexdigest()
+    # Anki ids are positive integers that fit in a JavaScript number
+    return int(digest[:12], 16) + 1
+
+
+def _guid(fields: Sequence[str]) -> str:
+    return hashlib.sha1(FIELD_SEPARATOR.join(fields).encode('utf-8')).hexdigest()[:16]
+
+
+def _identity(fields: Sequence[str]) -> List[int]:
+    """Positions of the fields identifying a note: those of IDENTITY_FIELDS, or else the first field."""
+    return [i for i, field in enumerate(fields) if field in IDENTITY_FIELDS] or [0]
+
+
+def _plain(text: str) -> str:
+    """Field without its HTML, as Anki sorts and compares it."""
+    return html.unescape(_HTML_TAG.sub('', text))
+
+
+def _checksum(text: str) -> int:
+    """First 8 hex digits of the SHA-1 of the sort field without HTML, used by Anki to find duplicates."""
+    return int(hashlib.sha1(_plain(text).encode('utf-8')).hexdigest()[:8], 16)
+
+
+def _deck(deck_id: int, name: str, now: int) -> dict:
+    return {
+        'id': deck_id,
+        'name': name,
+        'desc': '',
+        'conf': 1,
+        'dyn': 0,
+        'collapsed': False,
+        'extendNew': 0,
+        'extendRev': 50,
+        'mod': now,
+        'usn': -1,
+        'newToday': [0, 0],
+        'revToday': [0, 0],
+        'lrnToday': [0, 0],
+        'timeToday': [0, 0],
+    }
+
+
+def _model(model_id: int, name: str, fields: Sequence[str], deck_id: int, now: int) -> dict:
+    """Build a basic note type: the first field on the front, the other fields on the back."""
+    back = '<br>'.join(f'{{{{{field}}}}}' for field in fields[1:])
+    return {
+        'id': model_id,
+        'name': name,
+        'type': 0,
+        'mod': now,
+        'usn': -1,
+        'sortf': 0,
+        'did': deck_id,
+        'tags': [],
+        'vers': [],
+        'css': CARD_CSS,
+        'latexPre': '\\documentclass[12pt]{article}\n\\pagestyle{empty}\n\\begin{document}\n',
+        'latexPost': '\\end{document}',
+        'req': [[0, 'any', [0]]],
+        'flds': [
+            {'name': field, 'ord': i, 'font': 'Arial', 'size': 20, 'media': [], 'rtl': False, 'sticky': False}
+            for i, field in enumerate(fields)
+        ],
+        'tmpls': [
+            {
+                'name': 'Card 1',
+                'ord': 0,
+                'qfmt': f'{{{{{fields[0]}}}}}',
+                'afmt': f'{{{{FrontSide}}}}<hr id=answer>{back}',
+                'did': None,
+                'bqfmt': '',
+                'bafmt': '',
+            }
+        ],
+    }
+
+
+def _note_rows(
+    rows: Iterable[Sequence[Any]],
+    model_id: int,
+    deck_id: int,
+    first_id: int,
+    now: int,
+    identity: Sequence[int],
+    is_html: Sequence[bool],
+) -> Iterator[Tuple[tuple, tuple]]:
+    """Build the note and card rows of every exported row."""
+    for position, values in enumerate(rows):
+        texts = ['' if value is None or value != value else str(value) for value in values]
+        # Anki shows fields as HTML, so a '<' in a sentence must not start a tag
+        fields = [text if raw else html.escape(text, quote=False) for text, raw in zip(texts, is_html)]
+        note_id = first_id + position
+        sort_field = _plain(fields[0]) if fields else ''
+        flds = FIELD_SEPARATOR.join(fields)
+        guid = _guid([texts[i] for i in identity if i < len(texts)])
+        note = (note_id, guid, model_id, now, -1, '', flds, sort_field, _checksum(sort_field), 0, '')
+        card = (note_id, note_id, deck_id, 0, now, -1, 0, 0, position + 1, 0, 0, 0, 0, 0, 0, 0, 0, '')
+        yield note, card
+
+
+def _write_collection(
+    path: str,
+    rows: Iterable[Sequence[Any]],
+    fields: Sequence[str],
+    deck_name: str,
+    chunksize: int,
+    html_fields: Collection[str],
+) -> int:
+    now = int(time.time())
+    identity = _identity(fields)
+    is_html = [field in html_fields for field in fields]
+    fields = anki_field_names(fields)
+    deck_id = _stable_id('deck', deck_name)
+    model_id = _stable_id('model', deck_name, *fields)
+    con = sqlite3.connect(path)
+    try:
+        con.executescript('PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;' + COLLECTION_SCHEMA)
+        decks = {'1': _deck(1, 'Default', now), str(deck_id): _deck(deck_id, deck_name, now)}
+        conf = {'activeDecks': [1], 'curDeck': 1, 'curModel': str(model_id), 'nextPos': 1, 'sortType': 'noteFld'}
+        con.execute(
+            'INSERT INTO col VALUES (1, ?, ?, ?, 11, 0, 0, 0, ?, ?, ?, ?, ?)',
+            (
+                now,
+                now * 1000,
+                now * 1000,
+                json.dumps(conf),
+                json.dumps({str(model_id): _model(model_id, deck_name, fields, deck_id, now)}),
+                json.dumps(decks),
+                json.dumps({'1': DEFAULT_DECK_CONF}),
+                '{}',
+            ),
+        )
+
+        count = 0
+        note_rows = _note_rows(rows, model_id, deck_id, now * 1000, now, identity, is_html)
+        while True:
+            chunk: List[Tuple[tuple, tuple]] = []
+            for item in note_rows:
+                chunk.append(item)
+                if len(chunk) >= chunksize:
+                    break
+            if not chunk:
+                break
+            con.executemany('INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [note for note, _ in chunk])
+            con.executemany(
+                'INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [card for _, card in chunk],
+            )
+            count += len(chunk)
+        con.executescript(COLLECTION_INDEXES)
+        con.commit()
+    finally:
+        con.close()
+    return count
+
+
+def write_apkg(
+    output: Union[str, IO[bytes]],
+    rows: Iterable[Sequence[Any]],
+    fields: Sequence[str],
+    deck_name: str = 'Kindle vocabulary',
+    chunksize: int = APKG_CHUNK_ROWS,
+    html_fields: Collection[str] = (),
+) -> int:
+    """
+    Write an Anki package with one basic note per row.
+
+    The collection is built in a temporary SQLite file with bulk inserts and then zipped, so the memory used doesn't
+    grow with the number of notes. Deck and note type ids are derived from their names, and note guids from the
+    fields of IDENTITY_FIELDS (the first field if none of them is exported), so importing a newer export of the same
+    deck updates the existing notes, e.g. with better translations, instead of adding them again. Identity fields
+    are only recognized by their original names.
+
+    Field values are HTML-escaped, except those of `html_fields`.
+
+    Args:
+        output: path or binary file to write the .apkg to
+        rows: field values of every note, e.g. `DataFrame.itertuples(index=False)`
+        fields: names of the fields; the first one is the front of the card
+        deck_name: name of the deck in Anki
+        chunksize: notes inserted at a time
+        html_fields: fields holding HTML markup, e.g. the bold highlight of the word
+
+    Returns:
+        number of notes written
+    """
+    if not fields:
+        raise ValueError('An Anki note needs at least one field')
+    fd, path = tempfile.mkstemp(suffix='.anki2')
+    os.close(fd)
+    try:
+        count = _write_collection(path, rows, fields, deck_name, chunksize, html_fields)
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as package:
+            package.write(path, 'collection.anki2')
+            package.writestr('media', '{}')
+    finally:
+        os.unlink(path)
+    return count
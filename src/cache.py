@@ -0,0 +1,201 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+from src.governor import CacheReport
+
+DEFAULT_CACHE_PATH = Path.home() / '.cache' / 'kindle_vocab_to_anki' / 'translations.sqlite3'
+DEFAULT_MAX_MB = 256
+# After an eviction the cache is trimmed to this share of the budget, so a full cache doesn't evict on every write
+EVICT_TO_RATIO = 0.9
+# New translations are stored in chunks of this size while a run is in progress
+CHECKPOINT_SIZE = 100
+
+
+class CacheKey(NamedTuple):
+    """Identity of a single translation result."""
+
+    backend: str
+    model: str
+    source_lang: str
+    target_lang: str
+    text: str
+    context: str = ''
+
+    def digest(self) -> str:
+        raw = '\x1f'.join('' if part is None else str(part) for part in self)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """
+    Persistent word-level translation cache stored in SQLite.
+
+    Every entry is a single translation keyed by (backend, model, source lang, target lang, text, context),
+    so adding new words to a vocabulary only costs network calls for the new words.
+    The least recently used entries are evicted once the stored size exceeds `max_bytes`. Hits, misses and
+    evictions are counted since the process started, see `report`.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    key TEXT PRIMARY KEY,
+                    backend TEXT,
+                    model TEXT,
+                    source_lang TEXT,
+                    target_lang TEXT,
+                    text TEXT,
+                    context TEXT,
+                    value TEXT,
+                    size INTEGER,
+                    last_used REAL
+                )
+                """)
+            con.execute('CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_many(self, keys: Iterable[CacheKey]) -> Dict[CacheKey, str]:
+        """Return the cached values for the keys that are present."""
+        by_digest = {key.digest(): key for key in keys}
+        found: Dict[CacheKey, str] = {}
+        if not by_digest:
+            return found
+
+        digests = list(by_digest)
+        with self._lock, self._connect() as con:
+            # Stay well below SQLITE_MAX_VARIABLE_NUMBER
+            for i in range(0, len(digests), 500):
+                chunk = digests[i : i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = con.execute(
+                    f'SELECT key, value FROM translations WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                for digest, value in rows:
+                    found[by_digest[digest]] = value
+            if found:
+                now = time.time()
+                con.executemany(
+                    'UPDATE translations SET last_used = ? WHERE key = ?',
+                    [(now, key.digest()) for key in found],
+                )
+            self.hits += len(found)
+            self.misses += len(by_digest) - len(found)
+        return found
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Mapping[CacheKey, str]) -> None:
+        """Store the values and evict the oldest entries if the cache is over budget."""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            size = sum(len(str(part or '').encode('utf-8')) for part in key) + len(value.encode('utf-8'))
+            rows.append((key.digest(), *key, value, size, now))
+        with self._lock, self._connect() as con:
+            con.executemany('INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self._evict(con)
+
+    def _evict(self, con: sqlite3.Connection) -> None:
+        total = con.execute('SELECT COALESCE(SUM(size), 0) FROM translations').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_free = total - int(self.max_bytes * EVICT_TO_RATIO)
+        freed = 0
+        stale: List[str] = []
+        for key, size in con.execute('SELECT key, size FROM translations ORDER BY last_used'):
+            stale.append(key)
+            freed += size
+            if freed >= to_free:
+                break
+        con.executemany('DELETE FROM translations WHERE key = ?', [(key,) for key in stale])
+        self.evictions += len(stale)
+
+    def size_bytes(self) -> int:
+        with self._connect() as con:
+            return con.execute('SELECT COALESCE(SUM(size), 0) FROM translations').fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._connect() as con:
+            return con.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as con:
+            con.execute('DELETE FROM translations')
+
+    def report(self) -> CacheReport:
+        return CacheReport(
+            'Persistent translations', len(self), self.size_bytes(), self.hits, self.misses, self.evictions, 0
+        )
+
+
+class CacheWriter:
+    """
+    Buffer of new cache entries, stored every `chunk_size` entries and when the block exits.
+
+    A run that crashes, is cancelled or gets killed keeps everything up to its last stored chunk, so running it
+    again only translates the rest.
+
+        with CacheWriter(cache) as writer:
+            for key, value in results:
+                writer[key] = value
+    """
+
+    def __init__(self, cache: TranslationCache, chunk_size: int = CHECKPOINT_SIZE) -> None:
+        self.cache = cache
+        self.chunk_size = chunk_size
+        self._pending: Dict[CacheKey, str] = {}
+
+    def __setitem__(self, key: CacheKey, value: str) -> None:
+        self._pending[key] = value
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        self.cache.set_many(pending)
+
+    def __enter__(self) -> 'CacheWriter':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.flush()
+
+
+_caches: Dict[str, TranslationCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_translation_cache() -> TranslationCache:
+    """
+    Return the process-wide translation cache.
+
+    The location and size budget can be changed with the `KVTA_CACHE_PATH` and `KVTA_CACHE_MAX_MB`
+    environment variables; point the path at a mounted volume to keep the cache across container restarts.
+    """
+    path = os.environ.get('KVTA_CACHE_PATH', str(DEFAULT_CACHE_PATH))
+    max_bytes = int(float(os.environ.get('KVTA_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None or cache.max_bytes != max_bytes:
+            cache = TranslationCache(Path(path), max_bytes)
+            _caches[path] = cache
+        return cache
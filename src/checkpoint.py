@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+
+DEFAULT_CHECKPOINT_DIR = Path.home() / '.cache' / 'kindle_vocab_to_anki' / 'checkpoints'
+# Checkpoints of runs that were never finished are dropped after a week
+CHECKPOINT_MAX_AGE = 7 * 24 * 3600.0
+
+
+def fingerprint(data: pd.DataFrame, **params: Any) -> str:
+    """
+    Identify a run by its dataset and parameters.
+
+    Running the same data with the same parameters again gives the same fingerprint, so it can resume the
+    checkpoint of an interrupted run. Secrets and tuning parameters, like API keys and workers, must be left out.
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps(list(map(str, data.columns))).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """
+    Finished columns of translation runs that haven't completed yet, by run fingerprint.
+
+    A run saves every column as soon as it's translated; when it's started again after a crash, the saved columns
+    are restored and only the rest is translated. The column that was in progress resumes from the translation
+    cache, which is written in chunks.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as con:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS columns (
+                    fingerprint TEXT,
+                    name TEXT,
+                    "values" TEXT,
+                    updated_at REAL,
+                    PRIMARY KEY (fingerprint, name)
+                )
+                """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.directory / 'checkpoints.sqlite3', timeout=30)
+
+    def load(self, run: str) -> Dict[str, List[Any]]:
+        """Return the saved columns of a run."""
+        with self._connect() as con:
+            rows = con.execute('SELECT name, "values" FROM columns WHERE fingerprint = ?', (run,)).fetchall()
+        return {name: json.loads(values) for name, values in rows}
+
+    def save_column(self, run: str, name: str, values: List[Any]) -> None:
+        with self._lock, self._connect() as con:
+            con.execute(
+                'INSERT OR REPLACE INTO columns VALUES (?, ?, ?, ?)', (run, name, json.dumps(values), time.time())
+            )
+
+    def discard(self, run: str) -> None:
+        """Delete the checkpoint of a finished run, and the checkpoints abandoned long ago."""
+        with self._lock, self._connect() as con:
+            con.execute(
+                'DELETE FROM columns WHERE fingerprint = ? OR updated_at < ?', (run, time.time() - CHECKPOINT_MAX_AGE)
+            )
+
+    def runs(self) -> List[str]:
+        with self._connect() as con:
+            return [row[0] for row in con.execute('SELECT DISTINCT fingerprint FROM columns')]
+
+
+_stores: Dict[str, CheckpointStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Return the checkpoint store located at `KVTA_CHECKPOINT_DIR`."""
+    directory = os.environ.get('KVTA_CHECKPOINT_DIR', str(DEFAULT_CHECKPOINT_DIR))
+    with _stores_lock:
+        if directory not in _stores:
+            _stores[directory] = CheckpointStore(Path(directory))
+        return _stores[directory]
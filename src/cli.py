@@ -0,0 +1,243 @@
+import argparse
+import datetime
+import logging
+import os
+import sys
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+from deep_translator import GoogleTranslator
+from tqdm import tqdm
+
+from src import pipeline
+from src.checkpoint import get_checkpoint_store
+from src.export import build_export_table, default_export_columns, write_csv_tables, write_tables_apkg
+from src.query import VocabFilter, VocabQuery
+from src.vocab import VOCAB_CHUNK_SIZE, empty_vocab_frame
+
+logger = logging.getLogger('kindle_vocab_to_anki')
+
+BACKENDS = {'google': 'Google Translate', 'openai': 'OpenAI', 'dictionary': pipeline.DICTIONARY_BACKEND}
+STYLES = {'word': 'Word only', 'context': 'Use context'}
+HIGHLIGHTS = {
+    'none': None,
+    'underscore': 'Replace with underscore',
+    'brackets': 'Surround with [] brackets',
+    'braces': 'Surround with {} brackets',
+    'bold': 'Bold',
+    'cloze': 'Cloze deletion',
+}
+SEPARATORS = {'semicolon': ';', 'tab': '\t', 'comma': ','}
+
+
+def _language_code(value: str) -> str:
+    """Accept a Google Translate language code or name, e.g. 'en' or 'english'."""
+    languages = GoogleTranslator().get_supported_languages(as_dict=True)
+    if value in languages.values():
+        return value
+    if value.lower() in languages:
+        return languages[value.lower()]
+    raise argparse.ArgumentTypeError(f'unsupported language: {value}')
+
+
+def _split(value: str) -> List[str]:
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m src',
+        description='Convert a Kindle vocab.db into a CSV table for Anki, without the web interface.',
+    )
+    parser.add_argument('vocab', type=Path, help='path to vocab.db')
+    parser.add_argument(
+        '-o',
+        '--output',
+        default='-',
+        help='output file: CSV, or an Anki package if it ends with .apkg; "-" writes CSV to stdout (default)',
+    )
+
+    translation = parser.add_argument_group('translation')
+    translation.add_argument('--lang', type=_language_code, default='en', help='target language (default: en)')
+    translation.add_argument(
+        '--backend',
+        choices=BACKENDS,
+        default='google',
+        help='translation backend; "dictionary" looks words and stems up offline and translates the rest with Google',
+    )
+    translation.add_argument(
+        '--dict-dir', type=Path, help='directory of the offline dictionaries, e.g. es_en.tsv (default: KVTA_DICT_DIR)'
+    )
+    translation.add_argument(
+        '--style', choices=STYLES, default='word', help='translate the word alone or in its sentence (not with OpenAI)'
+    )
+    translation.add_argument(
+        '--translate',
+        type=_split,
+        default=['Word'],
+        help='comma-separated columns to translate: Word, Stem, Sentence (default: Word)',
+    )
+    translation.add_argument('--workers', type=int, default=4, help='parallel requests (default: 4)')
+    translation.add_argument('--no-pack', action='store_true', help="don't pack words into combined requests")
+    translation.add_argument('--no-dedup', action='store_true', help='translate repeated values again')
+    translation.add_argument(
+        '--reuse-stems',
+        action='store_true',
+        help='translate every stem once and use it for all its inflected forms (word-only style)',
+    )
+    translation.add_argument('--openai-model', default='gpt-4o-mini', help='OpenAI model (default: gpt-4o-mini)')
+    translation.add_argument('--furigana', action='store_true', help='add furigana to Japanese sentences (OpenAI)')
+    translation.add_argument(
+        '--no-resume',
+        action='store_true',
+        help="don't restore the columns translated by an interrupted run of the same data and options",
+    )
+
+    filters = parser.add_argument_group('filters, applied in this order')
+    filters.add_argument('--top-n', type=int, help='take the last N rows')
+    filters.add_argument('--sort-by', choices=['Timestamp', 'Word'], default='Timestamp', help='sort for --top-n')
+    filters.add_argument(
+        '--start-date', type=datetime.date.fromisoformat, help='only lookups on or after this date (YYYY-MM-DD)'
+    )
+    filters.add_argument('--book', action='append', default=[], help='only this book title (repeatable)')
+    filters.add_argument('--author', action='append', default=[], help='only this author (repeatable)')
+    filters.add_argument('--source-lang', action='append', default=[], help='only this word language (repeatable)')
+    filters.add_argument('--drop-duplicates', action='store_true', help='keep only the last lookup of every word')
+
+    export = parser.add_argument_group('export')
+    export.add_argument('--columns', type=_split, help='comma-separated columns to export, in order')
+    export.add_argument('--highlight', choices=HIGHLIGHTS, default='none', help='add a highlighted sentence column')
+    export.add_argument('--whole-words', action='store_true', help='only highlight whole words')
+    export.add_argument('--sep', choices=SEPARATORS, default='semicolon', help='field separator (default: semicolon)')
+    export.add_argument('--header', action='store_true', help='write the column names')
+    export.add_argument('--deck-name', default='Kindle vocabulary', help='name of the deck in an .apkg output')
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=VOCAB_CHUNK_SIZE,
+        help=f'lookups read, translated and written at a time (default: {VOCAB_CHUNK_SIZE})',
+    )
+    parser.add_argument('-q', '--quiet', action='store_true', help='no progress bars')
+    return parser
+
+
+def translate_chunks(chunks: Iterable[pd.DataFrame], stats: Dict[str, int], **params: Any) -> Iterator[pd.DataFrame]:
+    """
+    Create the additional columns of every chunk, see `src.pipeline.make_more_columns`.
+
+    Only one chunk is held in memory at a time. Values repeated across chunks are served from the persistent
+    translation cache, so they are still translated only once.
+
+    Args:
+        chunks: DataFrames with the data
+        stats: the dedup statistics of the chunks are added up in it
+        params: arguments of `make_more_columns`
+
+    Yields:
+        processed chunks
+    """
+    for chunk in chunks:
+        result = pipeline.make_more_columns(chunk, **params)
+        for key, value in result.attrs.get('dedup_stats', {}).items():
+            stats[key] = stats.get(key, 0) + value
+        yield result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the extraction, filters, translation and export of the app in one go.
+
+    Args:
+        argv: command line arguments, defaults to sys.argv
+
+    Returns:
+        exit code
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+    logger.setLevel(logging.WARNING if args.quiet else logging.INFO)
+
+    unknown = set(args.translate) - {'Word', 'Stem', 'Sentence'}
+    if unknown:
+        parser.error(f'--translate accepts Word, Stem and Sentence, got: {", ".join(sorted(unknown))}')
+    if args.dict_dir:
+        os.environ['KVTA_DICT_DIR'] = str(args.dict_dir)
+    api_key = os.environ.get('OPENAI_API_KEY', '')
+    if args.backend == 'openai' and not api_key:
+        parser.error('the OpenAI backend needs the OPENAI_API_KEY environment variable')
+
+    vocab_filter = VocabFilter(
+        top_n=args.top_n,
+        sort_by=args.sort_by,
+        start_date=args.start_date,
+        books=tuple(args.book),
+        authors=tuple(args.author),
+        langs=tuple(args.source_lang),
+        drop_duplicates=args.drop_duplicates,
+    )
+    try:
+        query = VocabQuery.from_bytes(args.vocab.read_bytes())
+        total = query.count(vocab_filter)
+    except Exception as e:
+        logger.error(f'Failed to parse vocabulary database: {e}')
+        return 1
+    if total == 0:
+        logger.warning('No lookups match the filters')
+
+    progress = partial(tqdm, file=sys.stderr, disable=args.quiet)
+    translators = pipeline.Translators(
+        partial(pipeline.translate, progress=progress),
+        partial(pipeline.translate_with_context, progress=progress),
+        partial(pipeline.translate_openai, progress=progress),
+        partial(pipeline.add_furigana, progress=progress),
+    )
+    backend = BACKENDS[args.backend]
+    # The lookups are read, translated and written one chunk at a time, so memory doesn't grow with the database
+    chunks = query.iter_fetch(vocab_filter, args.chunk_size) if total else iter([empty_vocab_frame()])
+    stats = pipeline.new_dedup_stats()
+    results = translate_chunks(
+        chunks,
+        stats,
+        lang=args.lang,
+        to_translate=args.translate,
+        translate_option=STYLES[args.style] if backend != 'OpenAI' else 'Use context',
+        translation_backend=backend,
+        openai_api_key=api_key,
+        openai_model=args.openai_model,
+        add_furigana_col=args.furigana,
+        workers=args.workers,
+        pack_requests=not args.no_pack,
+        dedup=not args.no_dedup,
+        reuse_stems=args.reuse_stems,
+        translators=translators,
+        checkpoints=None if args.no_resume else get_checkpoint_store(),
+    )
+
+    first = next(results)
+    columns = args.columns or default_export_columns(list(first.columns))
+    missing = [col for col in columns if col not in first.columns]
+    if missing:
+        parser.error(f'unknown columns: {", ".join(missing)}; available: {", ".join(first.columns)}')
+    first_table = build_export_table(first, columns, HIGHLIGHTS[args.highlight], args.whole_words)
+    tables = chain(
+        [first_table],
+        (build_export_table(result, columns, HIGHLIGHTS[args.highlight], args.whole_words) for result in results),
+    )
+    if args.output.endswith('.apkg'):
+        write_tables_apkg(tables, list(first_table.columns), args.output, args.deck_name)
+    elif args.output == '-':
+        write_csv_tables(tables, sys.stdout, SEPARATORS[args.sep], args.header)
+    else:
+        with open(args.output, 'w', encoding='utf-8', newline='') as output:
+            write_csv_tables(tables, output, SEPARATORS[args.sep], args.header)
+
+    if stats.get('lookups'):
+        logger.info(
+            f'{total} rows, {pipeline.translated_count(stats)} texts translated, {stats["deduplicated"]} duplicates '
+            f'saved, {stats["restored"]} restored from a checkpoint, {stats["reused"]} reused from another column'
+        )
+    return 0
@@ -0,0 +1,64 @@
+import sys
+from typing import Any
+
+import pandas as pd
+
+# Columns with few distinct values, e.g. a book title repeated on every lookup of the book
+CATEGORY_COLUMNS = ['Word language', 'Book title', 'Authors', 'Source']
+# Other text columns become categorical when their distinct values are at most this share of the rows
+CATEGORY_RATIO = 0.5
+TIMESTAMP_COLUMN = 'Timestamp'
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+ARROW_STRING = pd.StringDtype('pyarrow')
+
+
+def _intern(values: pd.Series) -> pd.Series:
+    """Make equal strings share one object, e.g. a sentence with several looked up words."""
+    return pd.Series([sys.intern(v) if isinstance(v, str) else v for v in values], index=values.index, dtype=object)
+
+
+def compact_column(values: pd.Series) -> pd.Series:
+    """
+    Store a text column in the smallest representation its values allow.
+
+    Repetitive columns become categorical. Columns without missing values are stored as Arrow strings, in one
+    buffer instead of a Python object per value. The rest keeps object dtype with interned strings, so missing
+    values stay None for the export.
+    """
+    if values.dtype != object:
+        return values
+    if values.name in CATEGORY_COLUMNS or values.nunique(dropna=False) <= len(values) * CATEGORY_RATIO:
+        return values.astype('category')
+    if values.notna().all() and all(isinstance(v, str) for v in values):
+        return values.astype(ARROW_STRING)
+    return _intern(values)
+
+
+def compact_frame(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Build the compact version of the data kept in the session, once when it's loaded or translated.
+
+    The Timestamp column is parsed into datetimes, which are exported with the same text. Text columns are stored
+    as categoricals, Arrow strings or interned strings, see `compact_column`.
+
+    Args:
+        data: extracted or translated data
+
+    Returns:
+        the same data in far less memory
+    """
+    columns = {}
+    for name in data.columns:
+        values = data[name]
+        if name == TIMESTAMP_COLUMN and values.dtype == object:
+            columns[name] = pd.to_datetime(values, format=TIMESTAMP_FORMAT, errors='coerce')
+        else:
+            columns[name] = compact_column(values)
+    result = pd.DataFrame(columns, index=data.index)
+    result.attrs = dict(data.attrs)
+    return result
+
+
+def memory_bytes(*objects: Any) -> int:
+    """Total memory of the DataFrames among the objects, with the strings they hold."""
+    return sum(int(obj.memory_usage(deep=True).sum()) for obj in objects if isinstance(obj, pd.DataFrame))
@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens are refilled at `rate` per second up to `capacity`; `acquire` blocks until enough tokens are available.
+    A non-positive rate disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def run_concurrently(
+    func: Callable[[Any], Any], items: Sequence[Any], workers: int = 1
+) -> Iterator[Tuple[int, Any, Optional[BaseException]]]:
+    """
+    Apply `func` to every item using a thread pool.
+
+    Yields (index, result, error) tuples as soon as each call completes, so the caller can drive a progress bar
+    and put the results back in input order. Errors are yielded instead of raised, which keeps Streamlit calls
+    (warnings, progress) in the calling thread.
+
+    Args:
+        func: function to call for each item
+        items: inputs
+        workers: number of worker threads; 1 runs everything in the calling thread
+
+    Yields:
+        index of the item, its result (None on error) and the raised exception (None on success)
+    """
+    if workers <= 1 or len(items) <= 1:
+        for i, item in enumerate(items):
+            try:
+                yield i, func(item), None
+            except Exception as e:
+                yield i, None, e
+        return
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        futures = {pool.submit(func, item): i for i, item in enumerate(items)}
+        try:
+            for future in as_completed(futures):
+                error = future.exception()
+                yield futures[future], None if error else future.result(), error
+        finally:
+            # Stop queued work if the consumer goes away early
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,198 @@
+import gzip
+import mmap
+import os
+import re
+import struct
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+DEFAULT_DICT_DIR = Path.home() / '.cache' / 'kindle_vocab_to_anki' / 'dictionaries'
+# Sorted index saved next to a dictionary, so it's built only once and then memory-mapped
+INDEX_SUFFIX = '.kvta-index.npy'
+# Dictionary files are named <source>_<target>, e.g. es_en.tsv or de_en.ifo for a StarDict dictionary
+DICTIONARY_NAME = re.compile(r'^(?P<source>[A-Za-z-]+)_(?P<target>[A-Za-z-]+)\.(?P<format>tsv|ifo)$')
+# Translations of a word listed on several lines are joined, up to this number
+MAX_TRANSLATIONS = 3
+
+_TSV_LINE = re.compile(rb'^(?!#)([^\t\r\n]+)\t([^\r\n]*)', re.MULTILINE)
+_HTML_TAG = re.compile(r'<[^>]+>')
+
+
+def normalize(word: str) -> str:
+    """Key of a headword: the same for 'Haus', ' haus' and 'HAUS'."""
+    return unicodedata.normalize('NFC', word).strip().casefold()
+
+
+def _clean(definition: str) -> str:
+    """Turn a dictionary definition into a one-line translation."""
+    lines = (line.strip() for line in _HTML_TAG.sub('\n', definition).splitlines())
+    return '; '.join(line for line in lines if line)
+
+
+def _map_file(path: Path) -> Union[mmap.mmap, bytes]:
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Dictionary:
+    """
+    Bilingual dictionary answering lookups from memory-mapped files.
+
+    Every entry is a row of (key start, key end, value start, value end) offsets into the files, sorted by
+    normalized headword, so a lookup is a binary search that only reads the few entries it compares. The index is
+    built on first use and saved next to the dictionary; later loads map it without reading the dictionary.
+    """
+
+    def __init__(self, keys: Union[mmap.mmap, bytes], values: Union[mmap.mmap, bytes], index: np.ndarray) -> None:
+        self._keys = keys
+        self._values = values
+        self._index = index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> 'Dictionary':
+        """Open a TSV file (headword, tab, translation) or the .ifo file of a StarDict dictionary."""
+        path = Path(path)
+        if path.suffix == '.ifo':
+            return cls._open_stardict(path)
+        data = _map_file(path)
+        return cls(data, data, cls._load_index(path, lambda: cls._tsv_entries(data), data))
+
+    @staticmethod
+    def _tsv_entries(data: Union[mmap.mmap, bytes]) -> np.ndarray:
+        entries = [(m.start(1), m.end(1), m.start(2), m.end(2)) for m in _TSV_LINE.finditer(data)]
+        return np.array(entries, dtype=np.int64).reshape(-1, 4)
+
+    @classmethod
+    def _open_stardict(cls, ifo: Path) -> 'Dictionary':
+        info = dict(line.split('=', 1) for line in ifo.read_text(encoding='utf-8').splitlines() if '=' in line)
+        base = ifo.with_suffix('')
+        keys = _map_file(base.with_suffix('.idx'))
+        if base.with_suffix('.dict').exists():
+            values = _map_file(base.with_suffix('.dict'))
+        else:
+            # A dictzip file can't be mapped, it's decompressed once
+            values = gzip.decompress(base.with_suffix('.dict.dz').read_bytes())
+        offset_format = '>QI' if info.get('idxoffsetbits') == '64' else '>II'
+        offset_size = struct.calcsize(offset_format)
+
+        def entries() -> np.ndarray:
+            rows = []
+            pos = 0
+            while pos < len(keys):
+                end = keys.find(b'\0', pos)
+                if end < 0:
+                    break
+                offset, size = struct.unpack_from(offset_format, keys, end + 1)
+                rows.append((pos, end, offset, offset + size))
+                pos = end + 1 + offset_size
+            return np.array(rows, dtype=np.int64).reshape(-1, 4)
+
+        return cls(keys, values, cls._load_index(base.with_suffix('.idx'), entries, keys))
+
+    @staticmethod
+    def _load_index(path: Path, entries: Callable[[], np.ndarray], keys: Union[mmap.mmap, bytes]) -> np.ndarray:
+        index_path = path.with_name(path.name + INDEX_SUFFIX)
+        try:
+            if index_path.stat().st_mtime >= path.stat().st_mtime:
+                return np.load(index_path, mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+
+        rows = entries()
+        words = [normalize(keys[start:end].decode('utf-8', 'replace')) for start, end in rows[:, :2].tolist()]
+        index = rows[sorted(range(len(words)), key=words.__getitem__)]
+        try:
+            np.save(index_path, index)
+        except OSError:
+            # Read-only location: the index is rebuilt every time the dictionary is opened
+            pass
+        return index
+
+    def _key(self, i: int) -> str:
+        index = self._index
+        return normalize(self._keys[index.item(i, 0) : index.item(i, 1)].decode('utf-8', 'replace'))
+
+    def lookup(self, word: str) -> Optional[str]:
+        """
+        Find the translation of a word.
+
+        Returns:
+            the translations of the headword, joined with commas, or None if the word isn't in the dictionary
+        """
+        key = normalize(word)
+        lo, hi = 0, len(self._index)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        translations: Dict[str, None] = {}
+        while lo < len(self._index) and len(translations) < MAX_TRANSLATIONS and self._key(lo) == key:
+            text = _clean(self._values[self._index.item(lo, 2) : self._index.item(lo, 3)].decode('utf-8', 'replace'))
+            if text:
+                translations[text] = None
+            lo += 1
+        return ', '.join(translations) if translations else None
+
+
+class Dictionaries:
+    """The dictionaries of a directory, opened on first use."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self._opened: Dict[Tuple[Path, float], Dictionary] = {}
+        self._lock = threading.Lock()
+
+    def paths(self) -> Dict[Tuple[str, str], Path]:
+        """Return the dictionary file of every (source language, target language) pair."""
+        if not self.directory.is_dir():
+            return {}
+        found = {}
+        for path in sorted(self.directory.iterdir()):
+            match = DICTIONARY_NAME.match(path.name)
+            if match:
+                found[(match['source'], match['target'])] = path
+        return found
+
+    def get(self, source: str, target: str) -> Optional[Dictionary]:
+        path = self.paths().get((source, target))
+        if path is None:
+            return None
+        key = (path, path.stat().st_mtime)
+        with self._lock:
+            if key not in self._opened:
+                self._opened[key] = Dictionary.open(path)
+            return self._opened[key]
+
+
+_dictionaries: Dict[str, Dictionaries] = {}
+_dictionaries_lock = threading.Lock()
+
+
+def get_dictionaries() -> Dictionaries:
+    """
+    Return the process-wide dictionaries.
+
+    They are read from the directory in the `KVTA_DICT_DIR` environment variable, by default
+    ~/.cache/kindle_vocab_to_anki/dictionaries.
+    """
+    directory = os.environ.get('KVTA_DICT_DIR', str(DEFAULT_DICT_DIR))
+    with _dictionaries_lock:
+        if directory not in _dictionaries:
+            _dictionaries[directory] = Dictionaries(Path(directory))
+        return _dictionaries[directory]
+
+
+def available_pairs() -> List[Tuple[str, str]]:
+    """List the (source language, target language) pairs with a dictionary."""
+    return list(get_dictionaries().paths())
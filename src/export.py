@@ -0,0 +1,130 @@
+import io
+import tempfile
+from typing import IO, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from src.apkg import write_apkg
+from src.highlight import highlight_variants
+
+# Columns exported by default, followed by the translated columns
+DEFAULT_EXPORT_COLUMNS = ['Word', 'Stem', 'Sentence']
+# Rows formatted at a time when writing an export
+EXPORT_CHUNK_ROWS = 10_000
+# Column with the highlighted sentence, whose markup is kept as HTML in an Anki deck
+HIGHLIGHT_COLUMN = 'sentence_with_highlight'
+
+
+def default_export_columns(columns: Sequence[str]) -> List[str]:
+    """Columns selected for export unless the user picks others."""
+    return [col for col in DEFAULT_EXPORT_COLUMNS if col in columns] + [col for col in columns if 'translated' in col]
+
+
+def build_export_table(
+    data: pd.DataFrame,
+    columns: Sequence[str],
+    highlight: Optional[str] = None,
+    word_boundary: bool = False,
+    rename: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """
+    Select the exported columns and add the highlighted sentence.
+
+    Args:
+        data: translated data
+        columns: columns to keep, in order
+        highlight: mode from HIGHLIGHT_FORMATS for the HIGHLIGHT_COLUMN, or None
+        word_boundary: only highlight whole words
+        rename: new names of the columns
+
+    Returns:
+        the table to export
+    """
+    table = data[list(columns)].rename(columns=rename or {})
+    if highlight:
+        translations = data['translated_word'].tolist() if 'translated_word' in data.columns else None
+        variants = highlight_variants(
+            data['Sentence'].tolist(), data['Word'].tolist(), [highlight], translations, word_boundary
+        )
+        table[HIGHLIGHT_COLUMN] = variants[highlight]
+    return table
+
+
+def iter_csv_chunks(
+    table: pd.DataFrame, sep: str = ';', header: bool = False, chunksize: int = EXPORT_CHUNK_ROWS
+) -> Iterator[str]:
+    """
+    Format the table as CSV, `chunksize` rows at a time.
+
+    Joining the chunks gives the same text as `table.to_csv(index=False, sep=sep, header=header)`.
+    """
+    if table.shape[0] == 0:
+        yield table.to_csv(index=False, sep=sep, header=header)
+        return
+    for start in range(0, table.shape[0], chunksize):
+        yield table.iloc[start : start + chunksize].to_csv(index=False, sep=sep, header=header and start == 0)
+
+
+def write_csv(
+    table: pd.DataFrame, output: IO[str], sep: str = ';', header: bool = False, chunksize: int = EXPORT_CHUNK_ROWS
+) -> None:
+    """Write the table as CSV to a text file without building the whole text in memory."""
+    for chunk in iter_csv_chunks(table, sep, header, chunksize):
+        output.write(chunk)
+
+
+def write_csv_tables(tables: Iterable[pd.DataFrame], output: IO[str], sep: str = ';', header: bool = False) -> None:
+    """Write consecutive parts of a table as one CSV, e.g. the chunks of the command line pipeline."""
+    for i, table in enumerate(tables):
+        write_csv(table, output, sep, header and i == 0)
+
+
+def write_table_apkg(table: pd.DataFrame, output: Union[str, IO[bytes]], deck_name: str = 'Kindle vocabulary') -> int:
+    """
+    Write the table as an Anki deck, one note per row with the columns as fields.
+
+    Returns:
+        number of notes written
+    """
+    return write_apkg(
+        output,
+        table.itertuples(index=False, name=None),
+        list(table.columns),
+        deck_name,
+        html_fields=[HIGHLIGHT_COLUMN],
+    )
+
+
+def write_tables_apkg(
+    tables: Iterable[pd.DataFrame],
+    columns: Sequence[str],
+    output: Union[str, IO[bytes]],
+    deck_name: str = 'Kindle vocabulary',
+) -> int:
+    """
+    Write consecutive parts of a table with the given columns as one Anki deck.
+
+    Returns:
+        number of notes written
+    """
+    rows = (row for table in tables for row in table.itertuples(index=False, name=None))
+    return write_apkg(output, rows, list(columns), deck_name, html_fields=[HIGHLIGHT_COLUMN])
+
+
+def csv_tempfile(table: pd.DataFrame, sep: str = ';', header: bool = False) -> BinaryIO:
+    """Write the table as UTF-8 CSV to a temporary file, returned at its start."""
+    output = tempfile.TemporaryFile()
+    text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+    write_csv(table, text, sep, header)
+    text.flush()
+    text.detach()
+    output.seek(0)
+    return output
+
+
+def apkg_tempfile(table: pd.DataFrame, deck_name: str = 'Kindle vocabulary') -> BinaryIO:
+    """Write the table as an Anki deck to a temporary file, returned at its start."""
+    output = tempfile.TemporaryFile()
+    write_table_apkg(table, output, deck_name)
+    output.seek(0)
+    return output
@@ -0,0 +1,100 @@
+import json
+import re
+from typing import Any, Dict, List, Sequence
+
+from src.openai_engine import DEFAULT_MODEL, MAX_BATCH_ITEMS, MODELS, BatchTask, estimate_tokens, plan_by_tokens
+
+# CJK ideographs and the iteration mark; sentences without any are returned as they are
+_KANJI = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff々]')
+_READING = re.compile(r'\[[^\]]*\]')
+# The annotated sentence is about twice as long as the sentence: kana readings and spaces are added
+OUTPUT_RATIO = 2
+
+FURIGANA_INSTRUCTIONS = (
+    'Add furigana readings to the kanji in each Japanese sentence below for use in Anki.\n'
+    'Format: place the reading in square brackets immediately after each kanji or kanji compound.\n'
+    'Add a space before each word that gets furigana — this is required for Anki to render it correctly.\n\n'
+    'Rules:\n'
+    '- Only add furigana to kanji, never to hiragana, katakana, or punctuation\n'
+    '- Preserve the original sentence exactly, only inserting [reading] after kanji\n'
+    '- For kanji compounds (jukugo), give the full compound reading as one unit\n'
+    '- Always add a space before the kanji/compound that receives furigana\n'
+    '- If a word consists only of hiragana or katakana, do not add furigana to it\n\n'
+    'Examples:\n'
+    '- Input: 目を凝らしてよく見てみると、体に、何か網のようなものが絡まっているようだ。\n'
+    '  Output: 目[め]を 凝[こ]らしてよく 見[み]てみると、 体[からだ]に、 何[なに]か 網[あみ]のようなものが 絡[から]まっているようだ。\n'
+    '- Input: 「変身って…。俺は、戦隊ヒーローか。\n'
+    '  Output: 「 変身[へんしん]って…。 俺[おれ]は、 戦隊[せんたい]ヒーローか。\n'
+    '- Input: 黄金に輝く海と太陽の狭間にあって、永遠に時を止められた閉じた世界。\n'
+    '  Output: 黄金[おうごん]に 輝[かがや]く 海[うみ]と 太陽[たいよう]の 狭間[はざま]にあって、 永遠[えいえん]に 時[とき]を 止[と]められた 閉[と]じた 世界[せかい]。\n\n'
+)
+
+# Structured output: the annotated sentence of every sentence id
+FURIGANA_OUTPUT_FORMAT = {
+    'type': 'json_schema',
+    'name': 'furigana',
+    'strict': True,
+    'schema': {
+        'type': 'object',
+        'properties': {
+            'sentences': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {'id': {'type': 'integer'}, 'annotated': {'type': 'string'}},
+                    'required': ['id', 'annotated'],
+                    'additionalProperties': False,
+                },
+            }
+        },
+        'required': ['sentences'],
+        'additionalProperties': False,
+    },
+}
+
+
+def has_kanji(sentence: str) -> bool:
+    return bool(_KANJI.search(sentence))
+
+
+def strip_readings(annotated: str) -> str:
+    """Remove the readings and the spaces added before them, to compare an answer with its sentence."""
+    return _READING.sub('', annotated).replace(' ', '')
+
+
+def build_furigana_request(batch: Sequence[str], lang: str = 'ja') -> Dict[str, Any]:
+    sentences = '\n'.join(f'{idx + 1}. {sentence}' for idx, sentence in enumerate(batch))
+    return {
+        'input': (
+            f'{FURIGANA_INSTRUCTIONS}Sentences:\n{sentences}\n\n'
+            'Answer with one entry per sentence: its number as "id" and the annotated sentence as "annotated".'
+        ),
+        'text': {'format': FURIGANA_OUTPUT_FORMAT},
+    }
+
+
+def parse_furigana(output_text: str, batch: Sequence[str]) -> List[str]:
+    """
+    Read the annotated sentences of a batch from the structured output.
+
+    An annotation that doesn't give back its sentence once the readings are removed is treated as missing, so it's
+    requested again instead of ending up in a card.
+    """
+    try:
+        entries = {int(entry['id']): str(entry['annotated']).strip() for entry in json.loads(output_text)['sentences']}
+    except (ValueError, TypeError, KeyError):
+        return [''] * len(batch)
+    results = []
+    for idx, sentence in enumerate(batch):
+        annotated = entries.get(idx + 1, '')
+        results.append(annotated if strip_readings(annotated) == sentence.replace(' ', '') else '')
+    return results
+
+
+FURIGANA_TASK = BatchTask(build_furigana_request, parse_furigana)
+
+
+def plan_furigana_batches(sentences: Sequence[str], model: str) -> List[List[int]]:
+    """Group the sentences into batches that fit the token budget of the model, see `plan_by_tokens`."""
+    costs = [estimate_tokens(sentence) * (1 + OUTPUT_RATIO) for sentence in sentences]
+    return plan_by_tokens(costs, MODELS.get(model, MODELS[DEFAULT_MODEL]).batch_tokens, MAX_BATCH_ITEMS)
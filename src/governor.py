@@ -0,0 +1,186 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+DEFAULT_BUDGET_MB = 512
+# Seconds an entry is served
+DEFAULT_TTL = 3600.0
+LRU = 'lru'
+LFU = 'lfu'
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory of a cached value in bytes, including the strings it holds."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    created_at: float
+    hits: int = 0
+
+
+@dataclass
+class FunctionStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class CacheReport(NamedTuple):
+    """Diagnostics of the cached values of one function."""
+
+    function: str
+    entries: int
+    size_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+
+class CacheGovernor:
+    """
+    In-memory results of several kinds, e.g. vocabulary statistics and the results of translation jobs, shared under
+    one byte budget.
+
+    Entries are keyed by kind ("function") and key. Every result is kept with its approximate size; when a new result
+    doesn't fit, the least recently used (`policy='lru'`) or least often hit (`policy='lfu'`) entries are evicted,
+    whichever kind they belong to.
+    A result larger than the whole budget isn't kept. Hits, misses and evictions are counted per function.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = DEFAULT_TTL, policy: str = LRU) -> None:
+        if policy not in (LRU, LFU):
+            raise ValueError(f'Unknown eviction policy "{policy}", expected "{LRU}" or "{LFU}"')
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policy = policy
+        self._entries: 'OrderedDict[Tuple[str, str], _Entry]' = OrderedDict()
+        self._stats: Dict[str, FunctionStats] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def get(self, function: str, key: str) -> Tuple[bool, Any]:
+        """Return (True, value) for a fresh cached value, else (False, None)."""
+        with self._lock:
+            stats = self._stats.setdefault(function, FunctionStats())
+            entry = self._entries.get((function, key))
+            if entry is not None and time.monotonic() - entry.created_at > self.ttl:
+                self._remove((function, key))
+                stats.expirations += 1
+                entry = None
+            if entry is None:
+                stats.misses += 1
+                return False, None
+            stats.hits += 1
+            entry.hits += 1
+            self._entries.move_to_end((function, key))
+            return True, entry.value
+
+    def peek(self, function: str, key: str) -> Any:
+        """Return a fresh cached value or None, without counting a hit or miss or changing the eviction order."""
+        with self._lock:
+            entry = self._entries.get((function, key))
+            if entry is None or time.monotonic() - entry.created_at > self.ttl:
+                return None
+            return entry.value
+
+    def put(self, function: str, key: str, value: Any) -> None:
+        size = estimate_size(value)
+        with self._lock:
+            self._stats.setdefault(function, FunctionStats())
+            if (function, key) in self._entries:
+                self._remove((function, key))
+            if size > self.max_bytes:
+                return
+            while self._entries and self._size + size > self.max_bytes:
+                victim = self._victim()
+                self._remove(victim)
+                self._stats[victim[0]].evictions += 1
+            self._entries[(function, key)] = _Entry(value, size, time.monotonic())
+            self._size += size
+
+    def _victim(self) -> Tuple[str, str]:
+        if self.policy == LFU:
+            # The entries are in recency order, so ties go to the least recently used
+            return min(self._entries, key=lambda k: self._entries[k].hits)
+        return next(iter(self._entries))
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        self._size -= self._entries.pop(key).size
+
+    def discard(self, function: str, key: str) -> None:
+        """Drop one entry, e.g. a result that has been handed over."""
+        with self._lock:
+            if (function, key) in self._entries:
+                self._remove((function, key))
+
+    def clear(self, function: Optional[str] = None) -> None:
+        """Drop the entries of a function, or of all functions."""
+        with self._lock:
+            for key in [k for k in self._entries if function is None or k[0] == function]:
+                self._remove(key)
+
+    def report(self) -> List[CacheReport]:
+        with self._lock:
+            sizes: Dict[str, List[int]] = {}
+            for (function, _key), entry in self._entries.items():
+                sizes.setdefault(function, []).append(entry.size)
+            return [
+                CacheReport(
+                    function,
+                    len(sizes.get(function, [])),
+                    sum(sizes.get(function, [])),
+                    stats.hits,
+                    stats.misses,
+                    stats.evictions,
+                    stats.expirations,
+                )
+                for function, stats in sorted(self._stats.items())
+            ]
+
+
+_governor: Optional[CacheGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_cache_governor() -> CacheGovernor:
+    """
+    Return the process-wide cache governor.
+
+    Its budget and eviction policy are read from the `KVTA_MEMORY_CACHE_MB` (default 512) and
+    `KVTA_MEMORY_CACHE_POLICY` ('lru' or 'lfu') environment variables when it's first used.
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            max_bytes = int(float(os.environ.get('KVTA_MEMORY_CACHE_MB', DEFAULT_BUDGET_MB)) * 1024 * 1024)
+            _governor = CacheGovernor(max_bytes, policy=os.environ.get('KVTA_MEMORY_CACHE_POLICY', LRU))
+        return _governor
@@ -0,0 +1,104 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Pattern, Sequence
+
+# Highlight mode -> replacement of the word, formatted with the word and its translation
+HIGHLIGHT_FORMATS = {
+    'Replace with underscore': '_',
+    'Surround with [] brackets': '[{word}]',
+    'Surround with {} brackets': '{{{word}}}',
+    'Bold': '<b>{word}</b>',
+    'Cloze deletion': '{{{{c1::{translation}::{word}}}}}',
+}
+# Cloze deletion of the translation, used by the translated data of step 2
+CLOZE_TRANSLATION = '{{{{c1::{translation}}}}}'
+# Cloze deletion for rows without a translation
+CLOZE_WITHOUT_HINT = '{{{{c1::{word}}}}}'
+# Kind of the highlighted sentences of step 3 kept within the budget of the cache governor
+HIGHLIGHT_RESULTS = 'Highlighted sentences'
+
+
+@lru_cache(maxsize=4096)
+def _word_pattern(word: str) -> Pattern[str]:
+    return re.compile(rf'(?<!\w){re.escape(word)}(?!\w)')
+
+
+def split_on_word(sentences: Sequence[Any], words: Sequence[Any], word_boundary: bool = False) -> List[Any]:
+    """
+    Split every sentence around the occurrences of its word.
+
+    Joining the parts with a replacement gives the same result as `sentence.replace(word, replacement)`, so the
+    sentences are only searched once however many highlight variants are built from them.
+
+    Args:
+        sentences: sentences
+        words: word to look for in the sentence of the same row
+        word_boundary: only match whole words, e.g. "cat" doesn't match in "concatenate"
+
+    Returns:
+        list of parts per row, or the sentence itself when it can't be split (missing sentence or word)
+    """
+    if word_boundary:
+        return [
+            _word_pattern(w).split(s) if isinstance(s, str) and isinstance(w, str) and w else s
+            for s, w in zip(sentences, words)
+        ]
+    return [s.split(w) if isinstance(s, str) and isinstance(w, str) and w else s for s, w in zip(sentences, words)]
+
+
+def join_parts(
+    parts: Sequence[Any], words: Sequence[Any], template: str, translations: Optional[Sequence[Any]] = None
+) -> List[Any]:
+    """
+    Rebuild the sentences with every occurrence of the word replaced by `template`.
+
+    Args:
+        parts: result of `split_on_word`
+        words: words of the rows
+        template: replacement, formatted with `word` and `translation`
+        translations: translations of the words, if the template uses them
+
+    Returns:
+        highlighted sentences
+    """
+    if '{' not in template.replace('{{', '').replace('}}', ''):
+        # The replacement doesn't depend on the row
+        replacement = template.format()
+        return [replacement.join(p) if isinstance(p, list) else p for p in parts]
+
+    if translations is None:
+        translations = [''] * len(parts)
+    result = []
+    for p, word, translation in zip(parts, words, translations):
+        if not isinstance(p, list):
+            result.append(p)
+        elif isinstance(translation, str) and translation:
+            result.append(template.format(word=word, translation=translation).join(p))
+        else:
+            result.append((CLOZE_WITHOUT_HINT if '{translation}' in template else template).format(word=word).join(p))
+    return result
+
+
+def highlight_variants(
+    sentences: Sequence[Any],
+    words: Sequence[Any],
+    modes: Sequence[str] = tuple(HIGHLIGHT_FORMATS),
+    translations: Optional[Sequence[Any]] = None,
+    word_boundary: bool = False,
+) -> Dict[str, List[Any]]:
+    """
+    Build several highlight variants of the sentences in one pass.
+
+    Args:
+        sentences: sentences
+        words: word to highlight in the sentence of the same row
+        modes: names from HIGHLIGHT_FORMATS
+        translations: translation of the word, used by 'Cloze deletion'
+        word_boundary: only match whole words
+
+    Returns:
+        highlighted sentences per mode
+    """
+    words = list(words)
+    parts = split_on_word(sentences, words, word_boundary)
+    return {mode: join_parts(parts, words, HIGHLIGHT_FORMATS[mode], translations) for mode in modes}
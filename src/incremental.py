@@ -0,0 +1,167 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import pandas as pd
+
+DEFAULT_SYNC_DIR = Path.home() / '.cache' / 'kindle_vocab_to_anki' / 'sync'
+# A lookup is the same word looked up in the same sentence at the same moment
+LOOKUP_IDENTITY = ['Word', 'Sentence', 'Timestamp']
+# Earliest lookups remembered per device to recognize it again
+FINGERPRINT_SIZE = 32
+
+
+class SyncState(NamedTuple):
+    """What has already been translated for a vocabulary source."""
+
+    watermark: int
+    rows: int
+    updated_at: float
+
+
+def _lookup_hash(row: Optional[tuple]) -> str:
+    return hashlib.sha1(repr(row).encode('utf-8')).hexdigest()[:16]
+
+
+def lookup_fingerprint(con: sqlite3.Connection, size: int = FINGERPRINT_SIZE) -> List[str]:
+    """Hashes of the earliest `size` lookups, which identify the device the vocab.db comes from."""
+    rows = con.execute(
+        'SELECT word_key, book_key, timestamp FROM LOOKUPS ORDER BY timestamp, word_key LIMIT ?', (size,)
+    ).fetchall()
+    return [_lookup_hash(row) for row in rows]
+
+
+def vocab_source_key(con: sqlite3.Connection) -> str:
+    """
+    Key of a device that has not been synced yet: the hash of its earliest lookup.
+
+    The key alone doesn't survive the user deleting that lookup on the Kindle, so known devices are recognized by
+    their fingerprint instead, see `SyncStore.find_source`.
+    """
+    fingerprint = lookup_fingerprint(con, 1)
+    return fingerprint[0] if fingerprint else _lookup_hash(None)
+
+
+def max_lookup_timestamp(con: sqlite3.Connection) -> int:
+    """Return the newest `LOOKUPS.timestamp` (milliseconds since epoch) in the database."""
+    return con.execute('SELECT COALESCE(MAX(timestamp), 0) FROM LOOKUPS').fetchone()[0]
+
+
+class SyncStore:
+    """
+    Remembers the newest processed lookup and the translated dataset of every vocabulary source.
+
+    A weekly sync then only extracts and translates lookups newer than the watermark and merges them
+    into the stored dataset.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    source_key TEXT PRIMARY KEY,
+                    watermark INTEGER,
+                    rows INTEGER,
+                    updated_at REAL
+                )
+                """)
+            con.execute('CREATE TABLE IF NOT EXISTS fingerprints (source_key TEXT, lookup TEXT)')
+            con.execute('CREATE INDEX IF NOT EXISTS fingerprints_lookup ON fingerprints (lookup)')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.directory / 'watermarks.sqlite3', timeout=30)
+
+    def _dataset_path(self, source_key: str) -> Path:
+        return self.directory / f'{source_key}.parquet'
+
+    def get(self, source_key: str) -> Optional[SyncState]:
+        with self._connect() as con:
+            row = con.execute(
+                'SELECT watermark, rows, updated_at FROM watermarks WHERE source_key = ?', (source_key,)
+            ).fetchone()
+        return SyncState(*row) if row else None
+
+    def find_source(self, fingerprint: Sequence[str]) -> Optional[str]:
+        """
+        Find the synced device sharing the most of its earliest lookups with `fingerprint`.
+
+        Lookups deleted on the Kindle drop out of the fingerprint, the remaining ones still match, so the device is
+        recognized as long as one of the lookups remembered at its last sync is left.
+        """
+        if not fingerprint:
+            return None
+        with self._connect() as con:
+            row = con.execute(
+                f'SELECT source_key FROM fingerprints WHERE lookup IN ({",".join("?" * len(fingerprint))}) '
+                'GROUP BY source_key ORDER BY COUNT(*) DESC LIMIT 1',
+                list(fingerprint),
+            ).fetchone()
+        return row[0] if row else None
+
+    def load_dataset(self, source_key: str) -> pd.DataFrame:
+        path = self._dataset_path(source_key)
+        return pd.read_parquet(path) if path.exists() else pd.DataFrame()
+
+    def save(
+        self, source_key: str, new_data: pd.DataFrame, watermark: int, fingerprint: Sequence[str] = ()
+    ) -> pd.DataFrame:
+        """
+        Merge newly translated rows into the stored dataset and advance the watermark.
+
+        Args:
+            source_key: vocabulary source, see `vocab_source_key`
+            new_data: translated rows extracted after the previous watermark
+            watermark: newest lookup timestamp covered by `new_data`
+            fingerprint: earliest lookups of the synced vocab.db, see `lookup_fingerprint`
+
+        Returns:
+            the merged dataset
+        """
+        with self._lock:
+            merged = pd.concat([self.load_dataset(source_key), new_data], ignore_index=True)
+            subset = [col for col in LOOKUP_IDENTITY if col in merged.columns]
+            if subset:
+                merged = merged.drop_duplicates(subset, keep='last').reset_index(drop=True)
+
+            path = self._dataset_path(source_key)
+            tmp_path = path.with_suffix('.tmp')
+            merged.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            with self._connect() as con:
+                con.execute(
+                    'INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?)',
+                    (source_key, watermark, merged.shape[0], time.time()),
+                )
+                if fingerprint:
+                    con.execute('DELETE FROM fingerprints WHERE source_key = ?', (source_key,))
+                    con.executemany(
+                        'INSERT INTO fingerprints VALUES (?, ?)', [(source_key, lookup) for lookup in fingerprint]
+                    )
+        return merged
+
+    def reset(self, source_key: str) -> None:
+        with self._lock:
+            self._dataset_path(source_key).unlink(missing_ok=True)
+            with self._connect() as con:
+                con.execute('DELETE FROM watermarks WHERE source_key = ?', (source_key,))
+                con.execute('DELETE FROM fingerprints WHERE source_key = ?', (source_key,))
+
+
+_stores: Dict[str, SyncStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_sync_store() -> SyncStore:
+    """Return the sync store located at `KVTA_SYNC_DIR`."""
+    directory = os.environ.get('KVTA_SYNC_DIR', str(DEFAULT_SYNC_DIR))
+    with _stores_lock:
+        if directory not in _stores:
+            _stores[directory] = SyncStore(Path(directory))
+        return _stores[directory]
@@ -0,0 +1,191 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sized
+
+from src.governor import CacheGovernor, get_cache_governor
+
+# Jobs running at the same time in the process; further jobs wait in the queue
+JOB_WORKERS = 2
+# Seconds a finished job is kept for its session to pick up the result
+JOB_TTL = 3600.0
+# Kinds of the job data kept within the budget of the cache governor
+JOB_RESULTS = 'Translation results'
+JOB_PARTIALS = 'Translation previews'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+DONE_STATES = (FINISHED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that was cancelled, at its next progress step."""
+
+
+class Job:
+    """
+    Work running in a background thread, outliving the Streamlit script run that started it.
+
+    The work reports through `progress` and `warn`, which have the signatures the pipeline expects, so a Streamlit
+    page can poll the job instead of blocking on it. Cancellation is cooperative: the next progress step raises
+    JobCancelled.
+
+    The result and the partial results are kept in the cache governor, so they count towards the memory budget
+    shared by all sessions. The least recently used ones are evicted when it's full, and the result is dropped once
+    the session has taken it, see `release`.
+    """
+
+    def __init__(self, description: str, governor: Optional[CacheGovernor] = None) -> None:
+        self.id = uuid.uuid4().hex
+        self.description = description
+        self.state = QUEUED
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.done = 0
+        self.total = 0
+        self.step = ''
+        self.warnings: List[str] = []
+        self.error: Optional[BaseException] = None
+        self._governor = governor or get_cache_governor()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in DONE_STATES
+
+    @property
+    def result(self) -> Any:
+        """Result of the finished job; None if it failed, or if it was released or evicted from memory."""
+        # Polling pages read it every second, which isn't cache traffic worth counting
+        return self._governor.peek(JOB_RESULTS, self.id)
+
+    @property
+    def partial(self) -> Dict[str, Any]:
+        """Results available before the job finishes, e.g. the translated columns; empty once it's finished."""
+        with self._lock:
+            return dict(self._governor.peek(JOB_PARTIALS, self.id) or {})
+
+    def release(self) -> None:
+        """Free the memory of the result, once it has been taken over."""
+        self._governor.discard(JOB_RESULTS, self.id)
+        self._governor.discard(JOB_PARTIALS, self.id)
+
+    @property
+    def fraction(self) -> float:
+        with self._lock:
+            return min(1.0, self.done / self.total) if self.total else 0.0
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled(self.description)
+
+    def progress(
+        self, iterable: Iterable[Any], total: Optional[int] = None, desc: str = '', **kwargs: Any
+    ) -> Iterator[Any]:
+        """Wrap the iterable of a step like tqdm does, counting its items and stopping if the job is cancelled."""
+        with self._lock:
+            self.done, self.step = 0, desc
+            self.total = total if total is not None else len(iterable) if isinstance(iterable, Sized) else 0
+        self.check_cancelled()
+        for item in iterable:
+            yield item
+            with self._lock:
+                self.done += 1
+            self.check_cancelled()
+
+    def warn(self, message: str) -> None:
+        with self._lock:
+            self.warnings.append(message)
+
+    def set_partial(self, key: str, value: Any) -> None:
+        with self._lock:
+            # Previews dropped from a full budget just start over
+            partial = dict(self._governor.peek(JOB_PARTIALS, self.id) or {})
+            partial[key] = value
+            self._governor.put(JOB_PARTIALS, self.id, partial)
+
+    def _run(self, func: Callable[['Job'], Any]) -> None:
+        self.state = RUNNING
+        try:
+            self.check_cancelled()
+            result = func(self)
+            # The result holds everything the previews showed
+            self._governor.discard(JOB_PARTIALS, self.id)
+            self._governor.put(JOB_RESULTS, self.id, result)
+            self.state = FINISHED
+        except JobCancelled:
+            self.state = CANCELLED
+        except Exception as e:
+            self.error = e
+            self.state = FAILED
+        finally:
+            if self.state != FINISHED:
+                self._governor.discard(JOB_PARTIALS, self.id)
+            self.finished_at = time.time()
+
+
+class JobRegistry:
+    """Thread pool running the jobs and the jobs by id, so a page can re-attach to a job after a rerun."""
+
+    def __init__(
+        self, workers: int = JOB_WORKERS, ttl: float = JOB_TTL, governor: Optional[CacheGovernor] = None
+    ) -> None:
+        self.ttl = ttl
+        self.governor = governor or get_cache_governor()
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kvta-job')
+
+    def submit(self, func: Callable[[Job], Any], description: str = '') -> Job:
+        """
+        Start `func(job)` in the background.
+
+        Returns:
+            the job, to poll its progress and get its result
+        """
+        job = Job(description, self.governor)
+        with self._lock:
+            self._expire()
+            self._jobs[job.id] = job
+        self._pool.submit(job._run, func)
+        return job
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _expire(self) -> None:
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > self.ttl:
+                job.release()
+                del self._jobs[job_id]
+
+
+_registry: Optional[JobRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_job_registry() -> JobRegistry:
+    """Return the process-wide job registry, shared by all sessions."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = JobRegistry()
+        return _registry
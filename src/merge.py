@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.incremental import LOOKUP_IDENTITY
+from src.vocab import VOCAB_COLUMNS, connect_vocab, read_lookups
+
+SOURCE_COLUMN = 'Source'
+# Separates the sources of a lookup found in several databases
+SOURCE_SEPARATOR = ', '
+
+
+def read_source(name: str, data: bytes, since: Optional[int] = None) -> pd.DataFrame:
+    """Read the lookups of one vocab.db and tag them with the name of their source."""
+    con = connect_vocab(data)
+    try:
+        lookups = read_lookups(con, since)
+    finally:
+        con.close()
+    lookups[SOURCE_COLUMN] = name
+    return lookups
+
+
+def unique_source_names(names: Sequence[str]) -> List[str]:
+    """Make the names distinguishable, every Kindle calls its database vocab.db."""
+    seen: Dict[str, int] = {}
+    result = []
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        result.append(name if seen[name] == 1 else f'{name} #{seen[name]}')
+    return result
+
+
+def _shared_source_labels(ids: np.ndarray, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Label every group of duplicated lookups with all of its sources.
+
+    Args:
+        ids: group id of every duplicated lookup
+        sources: source of every duplicated lookup
+        targets: group ids to label
+
+    Returns:
+        the sources of every target group, joined in order of first appearance
+    """
+    codes, names = pd.factorize(sources)
+    if len(names) > 63:
+        labels = (
+            pd.Series(sources).groupby(ids, sort=False).agg(lambda group: SOURCE_SEPARATOR.join(dict.fromkeys(group)))
+        )
+        return labels.reindex(targets).to_numpy()
+    # The set of sources of a group is a bit mask, so only the few distinct combinations are turned into text
+    masks = np.zeros(ids.max() + 1, dtype=np.uint64)
+    np.bitwise_or.at(masks, ids, np.left_shift(np.uint64(1), codes.astype(np.uint64)))
+    combos, inverse = np.unique(masks[targets], return_inverse=True)
+    labels = [SOURCE_SEPARATOR.join(name for i, name in enumerate(names) if int(combo) >> i & 1) for combo in combos]
+    return np.array(labels, dtype=object)[inverse.reshape(-1)]
+
+
+def merge_sources(frames: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Merge the lookups of several devices.
+
+    A lookup present in several databases (same word, sentence and timestamp) is kept once, and its Source lists
+    all the databases it came from.
+
+    Args:
+        frames: lookups of every source, with the Source column
+
+    Returns:
+        merged lookups in timestamp order
+    """
+    frames = [frame for frame in frames if frame.shape[0] > 0]
+    if not frames:
+        return pd.DataFrame(columns=VOCAB_COLUMNS + [SOURCE_COLUMN])
+    merged = pd.concat(frames, ignore_index=True)
+
+    # The identity columns are hashed once, duplicates are then found on integer group ids
+    ids = merged.groupby(LOOKUP_IDENTITY, sort=False, dropna=False).ngroup().to_numpy()
+    first = np.zeros(len(ids), dtype=bool)
+    first[np.unique(ids, return_index=True)[1]] = True
+    shared = np.bincount(ids)[ids] > 1
+    if shared.any():
+        # Only the lookups found in several sources get a new label, the others keep their single source
+        merged.loc[shared & first, SOURCE_COLUMN] = _shared_source_labels(
+            ids[shared], merged[SOURCE_COLUMN].to_numpy()[shared], ids[shared & first]
+        )
+        merged = merged.loc[first]
+
+    # Timestamps are 'YYYY-MM-DD HH:MM:SS' strings, so they sort chronologically
+    return merged.sort_values('Timestamp', kind='stable').reset_index(drop=True)
+
+
+def load_vocab_sources(
+    sources: Sequence[Tuple[str, bytes]],
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[pd.DataFrame, Dict[str, Exception]]:
+    """
+    Read several vocab.db files in parallel processes and merge them.
+
+    Args:
+        sources: (name, content) of every database
+        workers: number of processes; defaults to one per database, up to the number of CPUs
+        progress: called with (databases read, total databases) as each one completes
+
+    Returns:
+        merged lookups with a Source column, and the error of every database that couldn't be read
+    """
+    names = unique_source_names([name for name, _ in sources])
+    frames: Dict[int, pd.DataFrame] = {}
+    errors: Dict[str, Exception] = {}
+    workers = min(len(sources), workers or os.cpu_count() or 1)
+
+    if workers <= 1:
+        for i, (name, (_, data)) in enumerate(zip(names, sources)):
+            try:
+                frames[i] = read_source(name, data)
+            except Exception as e:
+                errors[name] = e
+            if progress:
+                progress(i + 1, len(sources))
+    else:
+        # Spawned processes don't inherit the threads of the Streamlit server
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {
+                pool.submit(read_source, name, data): i for i, (name, (_, data)) in enumerate(zip(names, sources))
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                try:
+                    frames[i] = future.result()
+                except Exception as e:
+                    errors[names[i]] = e
+                if progress:
+                    progress(done, len(sources))
+
+    return merge_sources([frames[i] for i in sorted(frames)]), errors
@@ -0,0 +1,412 @@
+import asyncio
+import json
+import math
+import queue
+import threading
+from typing import Any, Callable, Dict, Generator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from src.resilience import backoff_delay, get_breaker
+
+# One item to translate: (source_lang, sentence, word)
+Item = Tuple[str, str, str]
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+# Seconds a request may take, plus seconds per item of its batch: a large structured batch on a reasoning model
+# can take minutes, and a request that times out is billed all the same, retried and counted as a failure
+REQUEST_TIMEOUT = 60.0
+REQUEST_TIMEOUT_PER_ITEM = 5.0
+
+
+class ModelInfo(NamedTuple):
+    """Prices in USD per 1M tokens and the estimated tokens of words and sentences sent in one request."""
+
+    input_price: float
+    output_price: float
+    batch_tokens: int
+
+
+MODELS = {
+    'gpt-4o-mini': ModelInfo(0.15, 0.60, 2000),
+    'gpt-4o': ModelInfo(2.50, 10.00, 3000),
+    'gpt-4.1-nano': ModelInfo(0.10, 0.40, 1500),
+    'gpt-4.1-mini': ModelInfo(0.40, 1.60, 3000),
+    'gpt-4.1': ModelInfo(2.00, 8.00, 4000),
+    'gpt-5-nano': ModelInfo(0.05, 0.40, 1500),
+    'gpt-5-mini': ModelInfo(0.25, 2.00, 3000),
+    'gpt-5': ModelInfo(1.25, 10.00, 4000),
+}
+DEFAULT_MODEL = 'gpt-4o-mini'
+# Estimated output tokens of one translation in the JSON answer
+OUTPUT_TOKENS_PER_ITEM = 20
+# Longer outputs get more likely to skip or shift items, whatever the token budget
+MAX_BATCH_ITEMS = 40
+# Requests for the items missing from an answer, before they are left to the fallback
+MAX_REPAIR_ROUNDS = 2
+
+# Structured output of batch requests: one translation per item id
+BATCH_OUTPUT_FORMAT = {
+    'type': 'json_schema',
+    'name': 'translations',
+    'strict': True,
+    'schema': {
+        'type': 'object',
+        'properties': {
+            'translations': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {'id': {'type': 'integer'}, 'translation': {'type': 'string'}},
+                    'required': ['id', 'translation'],
+                    'additionalProperties': False,
+                },
+            }
+        },
+        'required': ['translations'],
+        'additionalProperties': False,
+    },
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about 4 bytes of UTF-8 per token, which also holds for CJK text."""
+    return math.ceil(len(text.encode('utf-8')) / 4)
+
+
+def _item_line(idx: int, item: Item) -> str:
+    source_lang, sentence, word = item
+    return f'{idx}. Word: "{word}" | Sentence: "{sentence}" | Source language: {source_lang}'
+
+
+def plan_batches(items: Sequence[Item], model: str) -> List[List[int]]:
+    """
+    Group the items into batches that fit the token budget of the model.
+
+    Short words and sentences make large batches, long sentences small ones, so every request costs about the
+    same and long inputs don't push the model into truncated or misnumbered answers.
+
+    Args:
+        items: (source_lang, sentence, word) to translate
+        model: OpenAI model name, see MODELS
+
+    Returns:
+        positions in `items` of every batch
+    """
+    costs = [estimate_tokens(_item_line(i + 1, item)) + OUTPUT_TOKENS_PER_ITEM for i, item in enumerate(items)]
+    return plan_by_tokens(costs, MODELS.get(model, MODELS[DEFAULT_MODEL]).batch_tokens)
+
+
+def plan_by_tokens(costs: Sequence[int], budget: int, max_items: int = MAX_BATCH_ITEMS) -> List[List[int]]:
+    """
+    Group consecutive items into batches of at most `budget` estimated tokens and `max_items` items.
+
+    Returns:
+        positions of the items of every batch; an item over the budget gets a batch of its own
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i, cost in enumerate(costs):
+        if current and (used + cost > budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_single_prompt(item: Item, lang: str) -> str:
+    """Prompt for translating one word with its context sentence."""
+    source_lang, sentence, word = item
+    return (
+        f'Translate the word "{word}" into {lang}.\n'
+        f'Context sentence: "{sentence}"\n'
+        f'Source language: {source_lang}\n\n'
+        f'Rules:\n'
+        f'- Provide 1-3 most common translations, separated by comma\n'
+        f'- Use the context to pick the most relevant meaning first\n'
+        f'- For verbs, give the base/infinitive form\n'
+        f'- Return only the translations, nothing else'
+    )
+
+
+def build_batch_prompt(batch: Sequence[Item], lang: str) -> str:
+    """Prompt for translating several numbered words with their context sentences."""
+    words_block = '\n'.join(_item_line(idx + 1, item) for idx, item in enumerate(batch))
+    return (
+        f'Translate each word below into {lang}.\n\n'
+        f'{words_block}\n\n'
+        f'Rules:\n'
+        f'- For each word, provide 1-3 most common translations, separated by comma\n'
+        f'- Use the context sentence to pick the most relevant meaning first\n'
+        f'- For verbs, give the base/infinitive form\n'
+        f'- Answer with one entry per word: its number as "id" and its translations as "translation"'
+    )
+
+
+def _parse_json_output(output_text: str) -> Optional[Dict[int, str]]:
+    try:
+        entries = json.loads(output_text)['translations']
+        return {int(entry['id']): str(entry['translation']).strip() for entry in entries}
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def parse_output(output_text: str, batch_len: int) -> List[str]:
+    """
+    Parse the model output into one translation per batch item.
+
+    Batch answers are read from the structured JSON output, or from "1. translation" lines for models that
+    ignore the output format. Items missing from the output are returned as empty strings.
+    """
+    if batch_len == 1:
+        return [output_text.strip().replace('"', '').replace('\n', ', ')]
+
+    parsed = _parse_json_output(output_text)
+    if parsed is not None:
+        return [parsed.get(idx + 1, '') for idx in range(batch_len)]
+    parsed = {}
+    for line in output_text.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        # Parse "1. translation" format
+        parts = line.split('.', 1)
+        if len(parts) == 2:
+            try:
+                num = int(parts[0].strip())
+                parsed[num] = parts[1].strip().replace('"', '')
+            except ValueError:
+                pass
+    return [parsed.get(idx + 1, '') for idx in range(batch_len)]
+
+
+def request_timeout(batch: Sequence[Any]) -> float:
+    """Seconds to wait for the answer to a batch, growing with the number of items it has to output."""
+    return REQUEST_TIMEOUT + REQUEST_TIMEOUT_PER_ITEM * len(batch)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Read the server-requested delay from a rate limit response, if any."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+    except ValueError:
+        return None
+    return None
+
+
+def build_translation_request(batch: Sequence[Item], lang: str) -> Dict[str, Any]:
+    if len(batch) == 1:
+        return {'input': build_single_prompt(batch[0], lang)}
+    return {'input': build_batch_prompt(batch, lang), 'text': {'format': BATCH_OUTPUT_FORMAT}}
+
+
+class BatchTask(NamedTuple):
+    """How a batch of items becomes a Responses API request, and its answer one output per item."""
+
+    # (batch, lang) -> arguments of `responses.create` besides the model
+    build_request: Callable[[Sequence[Any], str], Dict[str, Any]]
+    # (output text, batch) -> one output per item, '' for the items missing from the answer
+    parse: Callable[[str, Sequence[Any]], List[str]]
+
+
+TRANSLATION_TASK = BatchTask(build_translation_request, lambda text, batch: parse_output(text, len(batch)))
+
+
+class _Stopped(Exception):
+    """The caller stopped reading the results, the remaining requests are not sent."""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Tell rate limits, connection and server errors from errors that would fail again."""
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+async def _request_batch(
+    client: Any,
+    semaphore: asyncio.Semaphore,
+    model: str,
+    batch: Sequence[Any],
+    lang: str,
+    max_retries: int,
+    task: BatchTask,
+    stop: threading.Event,
+) -> List[str]:
+    """Process a batch, requesting again only the items missing from the answer."""
+    outputs = await _request_once(client, semaphore, model, batch, lang, max_retries, task, stop)
+    for _ in range(MAX_REPAIR_ROUNDS):
+        missing = [i for i, output in enumerate(outputs) if not output]
+        if not missing or len(batch) == 1:
+            break
+        repaired = await _request_once(
+            client, semaphore, model, [batch[i] for i in missing], lang, max_retries, task, stop
+        )
+        for i, output in zip(missing, repaired):
+            outputs[i] = output
+    return outputs
+
+
+async def _request_once(
+    client: Any,
+    semaphore: asyncio.Semaphore,
+    model: str,
+    batch: Sequence[Any],
+    lang: str,
+    max_retries: int,
+    task: BatchTask,
+    stop: threading.Event,
+) -> List[str]:
+    request = task.build_request(batch, lang)
+    timeout = request_timeout(batch)
+    breaker = get_breaker('openai')
+    attempt = 0
+    while True:
+        # Raises CircuitOpenError while OpenAI keeps failing, the batch then goes to the fallback at once
+        breaker.before_call()
+        async with semaphore:
+            if stop.is_set():
+                raise _Stopped()
+            try:
+                result = await client.responses.create(model=model, timeout=timeout, **request)
+            except Exception as e:
+                if not is_retryable(e):
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt >= max_retries:
+                    raise
+                delay = _retry_after(e)
+            else:
+                breaker.record_success()
+                return task.parse(result.output_text, batch)
+        if delay is None:
+            delay = backoff_delay(attempt, BACKOFF_BASE, BACKOFF_CAP)
+        attempt += 1
+        # Sleep outside the semaphore so other batches can use the slot meanwhile
+        await asyncio.sleep(delay)
+
+
+async def _run_batches(
+    batches: Sequence[Sequence[Any]],
+    lang: str,
+    api_key: str,
+    model: str,
+    concurrency: int,
+    base_url: Optional[str],
+    max_retries: int,
+    task: BatchTask,
+    results: 'queue.Queue[Any]',
+    stop: threading.Event,
+) -> None:
+    from openai import AsyncOpenAI
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    # Retries are handled here so that they don't hold a concurrency slot
+    async with AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=REQUEST_TIMEOUT) as client:
+
+        async def run(idx: int, batch: Sequence[Any]) -> None:
+            try:
+                outputs = await _request_batch(client, semaphore, model, batch, lang, max_retries, task, stop)
+                results.put((idx, outputs, None))
+            except _Stopped:
+                pass
+            except Exception as e:
+                results.put((idx, None, e))
+
+        await asyncio.gather(*(run(idx, batch) for idx, batch in enumerate(batches)))
+
+
+def _cancel_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    for task in asyncio.all_tasks(loop):
+        task.cancel()
+
+
+def iter_openai_batches(
+    batches: Sequence[Sequence[Any]],
+    lang: str,
+    api_key: str,
+    model: str,
+    concurrency: int = 4,
+    base_url: Optional[str] = None,
+    max_retries: int = MAX_RETRIES,
+    task: BatchTask = TRANSLATION_TASK,
+) -> Generator[Tuple[int, Optional[List[str]], Optional[BaseException]], None, None]:
+    """
+    Translate batches of words with AsyncOpenAI, keeping up to `concurrency` requests in flight.
+
+    The event loop runs in a helper thread, and results are yielded in the calling thread as each batch completes,
+    so the caller can drive a progress bar and call Streamlit functions. Rate limited and failed requests are
+    retried with jittered exponential backoff, honouring the `retry-after` headers sent by the server; while the
+    circuit breaker of OpenAI is open, the remaining batches fail at once with CircuitOpenError. Once the caller
+    stops iterating, e.g. the job is cancelled or the generator is closed, no further request is sent and the
+    requests in flight are abandoned.
+
+    Args:
+        batches: batches of (source_lang, sentence, word), or the items of `task`
+        lang: target language for translating
+        api_key: OpenAI API key
+        model: OpenAI model name
+        concurrency: maximum number of requests in flight
+        base_url: alternative API endpoint; defaults to OPENAI_BASE_URL or the OpenAI API
+        max_retries: retries per batch on rate limits, timeouts and server errors
+        task: requests and answers of the batches, word translation by default
+
+    Yields:
+        index of the batch, one translation per item ('' if missing from the output) or None, and the error
+    """
+    if not batches:
+        return
+    results: 'queue.Queue[Any]' = queue.Queue()
+    stop = threading.Event()
+    loop = asyncio.new_event_loop()
+
+    def runner() -> None:
+        try:
+            loop.run_until_complete(
+                _run_batches(batches, lang, api_key, model, concurrency, base_url, max_retries, task, results, stop)
+            )
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Client setup failed: report it for every batch that has not been reported yet
+            results.put(('failed', None, e))
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=runner, daemon=True)
+    thread.start()
+    done: Set[int] = set()
+    try:
+        while len(done) < len(batches):
+            idx, outputs, error = results.get()
+            if idx == 'failed':
+                for missing in range(len(batches)):
+                    if missing not in done:
+                        yield missing, None, error
+                break
+            done.add(idx)
+            yield idx, outputs, error
+    finally:
+        if len(done) < len(batches):
+            # Stopped early: batches waiting for a slot are not sent, and the requests in flight are cancelled
+            stop.set()
+            try:
+                loop.call_soon_threadsafe(_cancel_tasks, loop)
+            except RuntimeError:
+                # The loop has already finished
+                pass
+        thread.join()
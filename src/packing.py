@@ -0,0 +1,80 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+# Google keeps line breaks intact, so one text per line survives translation
+PACK_SEPARATOR = '\n'
+# Maximal URL-encoded length of a pack; deep_translator rejects texts of 5000 characters or more, and the text is
+# sent in the query string, where a non-Latin character takes up to 12 characters
+MAX_PACK_CHARS = 4500
+
+
+def encoded_length(text: str) -> int:
+    """Length of the text once URL-encoded in the request."""
+    return len(quote(text, safe=''))
+
+
+def make_packs(
+    items: Sequence[Tuple[str, Any]], indices: Sequence[int], max_chars: int = MAX_PACK_CHARS
+) -> List[List[int]]:
+    """
+    Group the texts into packs that can be sent to Google Translate as one request.
+
+    Only texts with the same source language are packed together, and a pack never exceeds `max_chars` once joined
+    and URL-encoded.
+    Texts that can't be packed safely (non-strings, blank or containing the separator) get a pack of their own.
+
+    Args:
+        items: list of tuples (source_lang, text)
+        indices: positions in `items` to pack
+        max_chars: maximal URL-encoded length of a joined pack
+
+    Returns:
+        lists of positions in `items`, one list per request
+    """
+    by_lang: Dict[str, List[int]] = defaultdict(list)
+    for i in indices:
+        by_lang[items[i][0]].append(i)
+
+    packs: List[List[int]] = []
+    for lang_indices in by_lang.values():
+        current: List[int] = []
+        length = 0
+        separator = encoded_length(PACK_SEPARATOR)
+        for i in lang_indices:
+            text = items[i][1]
+            if not isinstance(text, str) or not text.strip() or PACK_SEPARATOR in text:
+                packs.append([i])
+                continue
+            size = encoded_length(text)
+            if size >= max_chars:
+                packs.append([i])
+                continue
+            added = size + (separator if current else 0)
+            if current and length + added > max_chars:
+                packs.append(current)
+                current, length, added = [], 0, size
+            current.append(i)
+            length += added
+        if current:
+            packs.append(current)
+    return packs
+
+
+def join_pack(texts: Sequence[str]) -> str:
+    return PACK_SEPARATOR.join(texts)
+
+
+def split_pack(translated: Optional[str], count: int) -> Optional[List[str]]:
+    """
+    Split a translated pack back into per-item results.
+
+    Returns:
+        the translations, or None if the number of lines doesn't match the number of packed texts
+    """
+    if not translated:
+        return None
+    parts = [part.strip() for part in translated.split(PACK_SEPARATOR)]
+    if len(parts) != count:
+        parts = [part for part in parts if part]
+    return parts if len(parts) == count else None
@@ -0,0 +1,629 @@
+import logging
+import os
+from contextlib import closing
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+import requests
+from deep_translator import GoogleTranslator
+from deep_translator.exceptions import RequestError, ServerException, TooManyRequests
+
+from src.cache import CacheKey, CacheWriter, get_translation_cache
+from src.checkpoint import CheckpointStore, fingerprint
+from src.concurrency import TokenBucket, run_concurrently
+from src.dictionary import get_dictionaries
+from src.furigana import FURIGANA_TASK, has_kanji, plan_furigana_batches
+from src.highlight import CLOZE_TRANSLATION, HIGHLIGHT_FORMATS, join_parts, split_on_word
+from src.openai_engine import iter_openai_batches, plan_batches
+from src.packing import join_pack, make_packs, split_pack
+from src.resilience import CircuitOpenError, resilient_call
+
+logger = logging.getLogger(__name__)
+
+# The translation pipeline is shared by the Streamlit app and the command line, so nothing here imports Streamlit:
+# progress bars and warnings are passed in as callables.
+
+# Wraps an iterable like tqdm: progress(iterable, total=..., desc=...)
+Progress = Callable[..., Iterable[Any]]
+Warn = Callable[[str], Any]
+
+# Requests per second shared by all Google Translate workers of the process
+google_rate_limiter = TokenBucket(rate=float(os.environ.get('KVTA_GOOGLE_RATE_LIMIT', '10')))
+# Backend translating words and stems with the local dictionaries of `src.dictionary`
+DICTIONARY_BACKEND = 'Offline dictionary'
+# Temporary column with the stem of every word, or the word itself if it has no stem
+STEM_KEY = '_stem_key'
+# Alternative Google Translate endpoint, e.g. the local simulator of `benchmarks.simulator`
+GOOGLE_URL_ENV = 'KVTA_GOOGLE_URL'
+
+
+class Translations(List[str]):
+    """Translations in the order of the texts, counting the texts left as they were because their request failed."""
+
+    def __init__(self, values: Iterable[str] = (), untranslated: int = 0) -> None:
+        super().__init__(values)
+        self.untranslated = untranslated
+
+
+def untranslated_count(translations: List[str]) -> int:
+    """Number of texts a translation function left untranslated, 0 for functions returning a plain list."""
+    return getattr(translations, 'untranslated', 0)
+
+
+def no_progress(iterable: Iterable[Any], **kwargs: Any) -> Iterable[Any]:
+    return iterable
+
+
+def _is_google_transient(error: Exception) -> bool:
+    """Tell throttling, connection and server errors, worth retrying, from texts without translation."""
+    return isinstance(error, (TooManyRequests, RequestError, ServerException, requests.RequestException))
+
+
+def google_translate(text: str, source: str, target: str) -> str:
+    """
+    Translate a single text with Google Translate, respecting the shared rate limit.
+
+    Throttled and failed requests are retried with backoff, and once Google keeps failing its circuit opens and
+    the calls raise CircuitOpenError without a request, see `src.resilience`.
+    """
+
+    def request() -> str:
+        translator = GoogleTranslator(source=source, target=target)
+        url = os.environ.get(GOOGLE_URL_ENV)
+        if url:
+            translator._base_url = url
+        return translator.translate(text)
+
+    # Waiting for the rate limiter doesn't count against the timeout of the request
+    return resilient_call('google', request, _is_google_transient, before_attempt=google_rate_limiter.acquire)
+
+
+def _warn_unavailable(warn: Warn, skipped: int, error: Optional[Exception]) -> None:
+    """Report the texts skipped because their backend was unavailable in one warning instead of one per text."""
+    if skipped:
+        warn(f'{skipped} texts were not translated: {error}')
+
+
+def _translate_pack(items: List[Tuple[str, str]], lang: str) -> List[Tuple[str, Optional[Exception]]]:
+    """
+    Translate texts of the same source language in one Google request.
+
+    Falls back to one request per text if the pack can't be split back into the same number of results.
+
+    Returns:
+        (translation, error) for every text; on error the translation is the source text
+    """
+    text_lang = items[0][0]
+    if len(items) > 1:
+        try:
+            parts = split_pack(google_translate(join_pack([text for _, text in items]), text_lang, lang), len(items))
+            if parts is not None:
+                return [(part, None) for part in parts]
+        except CircuitOpenError as e:
+            return [(text, e) for _, text in items]
+        except Exception:
+            pass
+
+    results: List[Tuple[str, Optional[Exception]]] = []
+    for _, text in items:
+        try:
+            results.append((google_translate(text, text_lang, lang), None))
+        except CircuitOpenError as e:
+            # Google is unavailable: the rest of the pack isn't even tried
+            results.extend((text, e) for _, text in items[len(results) :])
+            break
+        except Exception as e:
+            results.append((text, e))
+    return results
+
+
+def translate(
+    data: List[Tuple[str, str]],
+    lang: str,
+    workers: int = 1,
+    pack: bool = False,
+    progress: Progress = no_progress,
+    warn: Warn = logger.warning,
+) -> List[str]:
+    """
+    Translate text.
+
+    Args:
+        data: list of tuples (source_lang, text)
+        lang: target language for translating
+        workers: number of concurrent requests
+        pack: send many short texts in a single request
+        progress: wraps the iterable of completed requests, e.g. a progress bar
+        warn: reports failed translations
+
+    Returns:
+        the list of the translated words, see `Translations`
+    """
+    cache = get_translation_cache()
+    keys = [CacheKey('google', '', text_lang, lang, text) for text_lang, text in data]
+    cached = cache.get_many(keys)
+
+    translated: List[str] = [cached.get(key, '') for key in keys]
+    pending = [i for i, key in enumerate(keys) if key not in cached]
+    packs = make_packs(data, pending) if pack else [[i] for i in pending]
+    new_entries = CacheWriter(cache)
+
+    def work(pack_indices: List[int]) -> List[Tuple[str, Optional[Exception]]]:
+        return _translate_pack([data[i] for i in pack_indices], lang)
+
+    skipped = 0
+    failed = 0
+    unavailable: Optional[Exception] = None
+    with new_entries:
+        for n, results, error in progress(
+            run_concurrently(work, packs, workers), total=len(packs), desc='Translating...'
+        ):
+            if error is not None:
+                results = [(data[i][1], error) for i in packs[n]]
+            for i, (result, item_error) in zip(packs[n], results):
+                translated[i] = result
+                if isinstance(item_error, CircuitOpenError):
+                    skipped, unavailable = skipped + 1, item_error
+                elif item_error is not None:
+                    failed += 1
+                    warn(f'Translation failed for "{data[i][1]}": {item_error}')
+                else:
+                    new_entries[keys[i]] = result
+
+    _warn_unavailable(warn, skipped, unavailable)
+    return Translations(translated, skipped + failed)
+
+
+def translate_dictionary(
+    data: List[Tuple[str, str]], lang: str, fallback: Callable[[List[Tuple[str, str]]], List[str]]
+) -> List[str]:
+    """
+    Translate words with the offline dictionaries, and only the words they don't contain with `fallback`.
+
+    Args:
+        data: list of tuples (source_lang, text)
+        lang: target language for translating
+        fallback: online translation of the missing words, e.g. `translate` with its options bound
+
+    Returns:
+        the list of the translated words, see `Translations`
+    """
+    dictionaries = get_dictionaries()
+    by_lang = {text_lang: dictionaries.get(text_lang, lang) for text_lang in {text_lang for text_lang, _ in data}}
+    translated: List[str] = []
+    misses = []
+    for i, (text_lang, text) in enumerate(data):
+        dictionary = by_lang[text_lang]
+        found = dictionary.lookup(text) if dictionary is not None and isinstance(text, str) else None
+        if found is None:
+            misses.append(i)
+        translated.append(found or '')
+    logger.info(f'{len(data) - len(misses)} of {len(data)} words found in the offline dictionaries')
+    untranslated = 0
+    if misses:
+        online = fallback([data[i] for i in misses])
+        untranslated = untranslated_count(online)
+        for i, result in zip(misses, online):
+            translated[i] = result
+    return Translations(translated, untranslated)
+
+
+def _translate_word_in_context(text_lang: str, text: str, word: str, lang: str) -> Tuple[str, Optional[str]]:
+    """
+    Translate a word inside its sentence with Google Translate.
+
+    Returns:
+        the translated word and an error message if the word-only fallback had to be used
+    """
+    try:
+        translated_text = google_translate(text.replace(word, f'||{word}|'), text_lang, lang)
+        translated_word = translated_text.split('||')[1].split('|')[0]
+        if translated_word == word:
+            translated_word = google_translate(text, text_lang, lang)
+        return translated_word, None
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        try:
+            return google_translate(word, text_lang, lang), f'Context translation failed for "{word}": {e}'
+        except CircuitOpenError:
+            raise
+        except Exception:
+            return word, f'Context translation failed for "{word}": {e}'
+
+
+def translate_with_context(
+    data: List[Tuple[str, str, str]],
+    lang: str,
+    workers: int = 1,
+    progress: Progress = no_progress,
+    warn: Warn = logger.warning,
+) -> List[str]:
+    """
+    Translate text with context.
+
+    Args:
+        data: list of tuples (source_lang, sentence, word)
+        lang: target language for translating
+        workers: number of concurrent requests
+        progress: wraps the iterable of completed requests, e.g. a progress bar
+        warn: reports failed translations
+
+    Returns:
+        the list of the translated words, see `Translations`
+    """
+    cache = get_translation_cache()
+    keys = [CacheKey('google_context', '', text_lang, lang, word, text) for text_lang, text, word in data]
+    cached = cache.get_many(keys)
+
+    translated: List[str] = [cached.get(key, '') for key in keys]
+    pending = [i for i, key in enumerate(keys) if key not in cached]
+    new_entries = CacheWriter(cache)
+
+    def work(i: int) -> Tuple[str, Optional[str]]:
+        text_lang, text, word = data[i]
+        return _translate_word_in_context(text_lang, text, word, lang)
+
+    skipped = 0
+    failed = 0
+    unavailable: Optional[Exception] = None
+    with new_entries:
+        for n, result, error in progress(
+            run_concurrently(work, pending, workers), total=len(pending), desc='Translating...'
+        ):
+            i = pending[n]
+            if isinstance(error, CircuitOpenError):
+                skipped, unavailable = skipped + 1, error
+                translated[i] = data[i][2]
+                continue
+            if error is not None:
+                warn(f'Context translation failed for "{data[i][2]}": {error}')
+                translated[i] = data[i][2]
+                failed += 1
+                continue
+            translated_word, warning = result
+            translated[i] = translated_word
+            if warning:
+                # Translated without its context at best, it's requested again by the next run
+                warn(warning)
+                failed += 1
+            else:
+                new_entries[keys[i]] = translated_word
+
+    _warn_unavailable(warn, skipped, unavailable)
+    return Translations(translated, skipped + failed)
+
+
+def translate_openai(
+    data: List[Tuple[str, str, str]],
+    lang: str,
+    api_key: str,
+    model: str,
+    concurrency: int = 4,
+    progress: Progress = no_progress,
+    warn: Warn = logger.warning,
+) -> List[str]:
+    """
+    Translate words using OpenAI with sentence context.
+
+    Args:
+        data: list of tuples (source_lang, sentence, word)
+        lang: target language for translating
+        api_key: OpenAI API key
+        model: OpenAI model name
+        concurrency: number of batches sent to OpenAI at the same time
+        progress: wraps the iterable of completed batches, e.g. a progress bar
+        warn: reports failed translations
+
+    Returns:
+        the list of the translated words, see `Translations`
+    """
+    cache = get_translation_cache()
+    all_items = list(data)
+    keys = [CacheKey('openai', model, source_lang, lang, word, sentence) for source_lang, sentence, word in all_items]
+    cached = cache.get_many(keys)
+    translated: List[str] = [cached.get(key, '') for key in keys]
+    # Only the words missing from the cache are sent to OpenAI
+    pending = [i for i, key in enumerate(keys) if key not in cached]
+    new_entries = CacheWriter(cache)
+
+    # Batches are sized by the token budget of the model
+    batch_indices = [[pending[j] for j in batch] for batch in plan_batches([all_items[i] for i in pending], model)]
+    batches = [[all_items[i] for i in idx] for idx in batch_indices]
+
+    skipped = 0
+    failed = 0
+    unavailable: Optional[Exception] = None
+    # Closed explicitly, so that a cancelled job or an error stops the requests that are not sent yet
+    with new_entries, closing(iter_openai_batches(batches, lang, api_key, model, concurrency)) as answers:
+        for n, outputs, error in progress(answers, total=len(batches), desc='Translating with OpenAI...'):
+            batch = batches[n]
+            if isinstance(error, CircuitOpenError):
+                # OpenAI is unavailable, the words go straight to the Google fallback
+                unavailable = error
+                outputs = [''] * len(batch)
+            elif error is not None:
+                if len(batch) == 1:
+                    warn(f'OpenAI translation failed for "{batch[0][2]}": {error}')
+                else:
+                    warn(f'OpenAI batch translation failed: {error}')
+                outputs = [''] * len(batch)
+
+            for i, (source_lang, _sentence, word), t in zip(batch_indices[n], batch, outputs):
+                if not t or t == word:
+                    try:
+                        t = google_translate(word, source_lang, lang)
+                    except CircuitOpenError as e:
+                        skipped, unavailable, t = skipped + 1, e, word
+                    except Exception:
+                        failed, t = failed + 1, word
+                else:
+                    new_entries[keys[i]] = t
+                translated[i] = t
+
+    if unavailable is not None and not skipped:
+        warn(f'OpenAI translation skipped, Google Translate used instead: {unavailable}')
+    _warn_unavailable(warn, skipped, unavailable)
+    return Translations(translated, skipped + failed)
+
+
+def add_furigana(
+    sentences: List[str],
+    api_key: str,
+    model: str,
+    concurrency: int = 4,
+    progress: Progress = no_progress,
+    warn: Warn = logger.warning,
+) -> List[str]:
+    """
+    Add furigana readings to kanji in Japanese sentences.
+
+    Every distinct sentence with kanji is annotated once: from the persistent cache, or in batches of sentences
+    sent to OpenAI concurrently. Sentences without kanji don't need a request.
+
+    Args:
+        sentences: list of Japanese sentences
+        api_key: OpenAI API key
+        model: OpenAI model name
+        concurrency: number of batches sent to OpenAI at the same time
+        progress: wraps the iterable of completed batches, e.g. a progress bar
+        warn: reports failed sentences
+
+    Returns:
+        list of sentences with furigana annotations
+    """
+    unique = list(dict.fromkeys(s for s in sentences if isinstance(s, str) and has_kanji(s)))
+    cache = get_translation_cache()
+    keys = {s: CacheKey('furigana', model, 'ja', 'ja', s) for s in unique}
+    cached = cache.get_many(keys.values())
+    annotated = {s: cached[keys[s]] for s in unique if keys[s] in cached}
+    pending = [s for s in unique if s not in annotated]
+    batches = [[pending[i] for i in batch] for batch in plan_furigana_batches(pending, model)]
+
+    new_entries = CacheWriter(cache)
+    failed = 0
+    skipped = 0
+    unavailable: Optional[Exception] = None
+    with (
+        new_entries,
+        closing(iter_openai_batches(batches, 'ja', api_key, model, concurrency, task=FURIGANA_TASK)) as answers,
+    ):
+        for n, outputs, error in progress(answers, total=len(batches), desc='Adding furigana...'):
+            if isinstance(error, CircuitOpenError):
+                skipped, unavailable = skipped + len(batches[n]), error
+                continue
+            if error is not None:
+                warn(f'Furigana generation failed for {len(batches[n])} sentences: {error}')
+                continue
+            for sentence, result in zip(batches[n], outputs):
+                if result:
+                    annotated[sentence] = new_entries[keys[sentence]] = result
+                else:
+                    failed += 1
+
+    if failed:
+        warn(f'Furigana generation failed for {failed} sentences, they are kept without readings')
+    _warn_unavailable(warn, skipped, unavailable)
+    return Translations([annotated.get(s, s) for s in sentences], len(unique) - len(annotated))
+
+
+def translate_unique(
+    data: pd.DataFrame, key_cols: List[str], translate_fn: Callable[[List[tuple]], List[str]]
+) -> Tuple[Translations, int]:
+    """
+    Translate each unique combination of `key_cols` once and map the results back onto the rows.
+
+    Args:
+        data: pandas DataFrame with the data
+        key_cols: columns that identify a translation, passed to `translate_fn` as tuples
+        translate_fn: function translating a list of tuples
+
+    Returns:
+        translations aligned with the rows of `data` and the number of lookups saved by deduplication
+    """
+    unique = data[key_cols].drop_duplicates()
+    translations = translate_fn(list(unique.itertuples(index=False, name=None)))
+    lookup = unique.assign(_translation=translations)
+    merged = data[key_cols].merge(lookup, on=key_cols, how='left', sort=False)
+    return (
+        Translations(merged['_translation'].tolist(), untranslated_count(translations)),
+        data.shape[0] - unique.shape[0],
+    )
+
+
+def new_dedup_stats() -> Dict[str, int]:
+    """
+    Counters of the texts of a run that weren't sent to a backend, by reason.
+
+    'lookups' counts the texts of every translated column, 'deduplicated' the repeated texts that reused the
+    translation of their first occurrence, 'restored' those of columns restored from a checkpoint, and 'reused'
+    those of columns copied from another column with the same key, e.g. the stems with `reuse_stems`.
+    """
+    return {'lookups': 0, 'deduplicated': 0, 'restored': 0, 'reused': 0}
+
+
+def translated_count(dedup_stats: Dict[str, int]) -> int:
+    """Number of texts of a run that were sent to a backend (or served by the persistent cache)."""
+    return dedup_stats['lookups'] - dedup_stats['deduplicated'] - dedup_stats['restored'] - dedup_stats['reused']
+
+
+class Translators(NamedTuple):
+    """Translation functions used by `make_more_columns`, e.g. wrapped with caching and progress bars."""
+
+    translate: Callable[..., List[str]]
+    translate_with_context: Callable[..., List[str]]
+    translate_openai: Callable[..., List[str]]
+    add_furigana: Callable[..., List[str]]
+
+
+def make_more_columns(
+    data: pd.DataFrame,
+    lang: str,
+    to_translate: List[str],
+    translate_option: str,
+    translation_backend: str = 'Google Translate',
+    openai_api_key: str = '',
+    openai_model: str = 'gpt-4o-mini',
+    add_furigana_col: bool = False,
+    workers: int = 1,
+    pack_requests: bool = False,
+    dedup: bool = True,
+    reuse_stems: bool = False,
+    translators: Optional[Translators] = None,
+    on_column: Optional[Callable[[str, List[Any]], Any]] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+) -> pd.DataFrame:
+    """
+    Create additional columns.
+
+    Args:
+        data: pandas DataFrame with the data
+        lang: target language for translation
+        to_translate: columns to translate
+        translate_option: how to translate the word
+        translation_backend: 'Google Translate', 'OpenAI' or 'Offline dictionary', which translates words and stems
+            with the local dictionaries and the rest with Google Translate
+        openai_api_key: OpenAI API key (required if backend is OpenAI)
+        openai_model: OpenAI model to use
+        add_furigana_col: whether to add furigana column for Japanese sentences
+        workers: number of concurrent requests to the translation backend
+        pack_requests: join many words or stems into one Google Translate request
+        dedup: translate repeated values once; the number of saved lookups is stored in `attrs['dedup_stats']`, see
+            `new_dedup_stats`
+        reuse_stems: in 'Word only' mode, translate every (language, Stem) once and give all the inflected forms of
+            a stem its translation, so the backend calls scale with unique stems
+        translators: translation functions to use; defaults to the functions of this module
+        on_column: called with the name and values of every translated column as soon as it's done, e.g. to show
+            partial results
+        checkpoints: save every translated column there, and restore the saved columns of an interrupted run of
+            the same data and parameters instead of translating them again
+
+    Returns:
+        processed data.
+
+    """
+    if translators is None:
+        translators = Translators(translate, translate_with_context, translate_openai, add_furigana)
+    # The new columns are added to a shallow copy, the rows of the caller's frame aren't copied
+    data = data.copy(deep=False)
+    dedup_stats = new_dedup_stats()
+    run_id = ''
+    restored: Dict[str, List[Any]] = {}
+    if checkpoints is not None:
+        run_id = fingerprint(
+            data,
+            lang=lang,
+            to_translate=to_translate,
+            translate_option=translate_option,
+            translation_backend=translation_backend,
+            openai_model=openai_model,
+            add_furigana_col=add_furigana_col and bool(openai_api_key),
+            pack_requests=pack_requests,
+            dedup=dedup,
+            reuse_stems=reuse_stems,
+        )
+        restored = checkpoints.load(run_id)
+
+    def run(key_cols: List[str], translate_fn: Callable[[List[tuple]], List[str]]) -> List[str]:
+        dedup_stats['lookups'] += data.shape[0]
+        if not dedup:
+            return translate_fn(list(data[key_cols].itertuples(index=False, name=None)))
+        translations, saved = translate_unique(data, key_cols, translate_fn)
+        dedup_stats['deduplicated'] += saved
+        return translations
+
+    def set_column(column: str, values: List[Any]) -> None:
+        data[column] = values
+        if on_column is not None:
+            on_column(column, values)
+
+    def translate_column(column: str, key_cols: List[str], translate_fn: Callable[[List[tuple]], List[str]]) -> None:
+        if column in restored and len(restored[column]) == data.shape[0]:
+            # Translated by an interrupted run of the same data and parameters
+            values = restored[column]
+            dedup_stats['lookups'] += data.shape[0]
+            dedup_stats['restored'] += data.shape[0]
+        else:
+            values = run(key_cols, translate_fn)
+            # A column with texts left untranslated isn't restored, the next run requests them again
+            if checkpoints is not None and not untranslated_count(values):
+                checkpoints.save_column(run_id, column, values)
+        set_column(column, values)
+
+    if translation_backend == 'OpenAI' and openai_api_key:
+        translate_column(
+            'translated_word',
+            ['Word language', 'Sentence', 'Word'],
+            lambda rows: translators.translate_openai(rows, lang, openai_api_key, openai_model, workers),
+        )
+    elif translate_option == 'Use context':
+        translate_column(
+            'translated_word',
+            ['Word language', 'Sentence', 'Word'],
+            lambda rows: translators.translate_with_context(rows, lang, workers),
+        )
+
+    word_only = translate_option == 'Word only' and translation_backend != 'OpenAI'
+    if reuse_stems and word_only:
+        # Words without a stem are their own stem
+        stems = data['Stem'] if 'Stem' in data.columns else pd.Series(None, index=data.index)
+        data[STEM_KEY] = stems.where(stems.notna() & (stems.astype(str).str.strip() != ''), data['Word'])
+    # Translated column of every key column, so a key translated once is reused by the other columns
+    translated_by_key: Dict[str, str] = {}
+    for col in to_translate:
+        if col != 'Word' or (col == 'Word' and word_only):
+            key_col = STEM_KEY if STEM_KEY in data.columns and col in ('Word', 'Stem') else col
+            column = f'translated_{col.lower()}'
+            if key_col in translated_by_key:
+                set_column(column, data[translated_by_key[key_col]].tolist())
+                dedup_stats['lookups'] += data.shape[0]
+                dedup_stats['reused'] += data.shape[0]
+                continue
+            pack = pack_requests and col != 'Sentence'
+            translate_fn = partial(translators.translate, lang=lang, workers=workers, pack=pack)
+            if translation_backend == DICTIONARY_BACKEND and col != 'Sentence':
+                translate_fn = partial(translate_dictionary, lang=lang, fallback=translate_fn)
+            translate_column(column, ['Word language', key_col], translate_fn)
+            translated_by_key[key_col] = column
+    if STEM_KEY in data.columns:
+        data = data.drop(columns=STEM_KEY)
+
+    words = data['Word'].tolist()
+    parts = split_on_word(data['Sentence'].tolist(), words)
+    data['sentence_with_highlight'] = join_parts(parts, words, HIGHLIGHT_FORMATS['Replace with underscore'])
+    translations = data['translated_word'].tolist() if 'translated_word' in data.columns else None
+    data['sentence_with_cloze'] = join_parts(parts, words, CLOZE_TRANSLATION, translations)
+
+    if add_furigana_col and openai_api_key:
+        translate_column(
+            'sentence_with_furigana',
+            ['Sentence'],
+            lambda rows: translators.add_furigana([row[0] for row in rows], openai_api_key, openai_model, workers),
+        )
+
+    if checkpoints is not None:
+        checkpoints.discard(run_id)
+    result = data.reset_index(drop=True)
+    result.attrs['dedup_stats'] = dedup_stats
+    return result
@@ -0,0 +1,288 @@
+import datetime
+import sqlite3
+import threading
+import time
+import weakref
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from src.checkpoint import fingerprint
+from src.governor import CacheReport, FunctionStats
+from src.vocab import (
+    LOOKUPS_FIELDS,
+    LOOKUPS_FROM,
+    VOCAB_CHUNK_SIZE,
+    VOCAB_COLUMNS,
+    connect_vocab,
+    empty_vocab_frame,
+    iter_vocab_frames,
+    parse_lookup_timestamps,
+)
+
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS kvta_lookups_timestamp ON LOOKUPS (timestamp)',
+    'CREATE INDEX IF NOT EXISTS kvta_lookups_word_key ON LOOKUPS (word_key)',
+    'CREATE INDEX IF NOT EXISTS kvta_lookups_book_key ON LOOKUPS (book_key)',
+    'CREATE INDEX IF NOT EXISTS kvta_words_id ON WORDS (id)',
+    'CREATE INDEX IF NOT EXISTS kvta_words_word ON WORDS (word)',
+    'CREATE INDEX IF NOT EXISTS kvta_book_info_id ON BOOK_INFO (id)',
+]
+# Number of small query results (counts, distinct values) kept per VocabQuery
+MAX_CACHED_RESULTS = 256
+
+# Data frame column -> column of the lookups query
+SQL_COLUMNS = {
+    'Word': 'word',
+    'Stem': 'stem',
+    'Word language': 'lang',
+    'Sentence': 'usage',
+    'Book title': 'title',
+    'Authors': 'authors',
+    'Timestamp': 'timestamp',
+}
+
+
+@dataclass(frozen=True)
+class VocabFilter:
+    """
+    Step 2 filters, applied in this order.
+
+    Args:
+        top_n: keep the last N rows after sorting by `sort_by`
+        sort_by: 'Timestamp' or 'Word'
+        start_date: keep lookups made on this local date or later
+        books: keep these book titles; empty keeps all, None keeps the lookups without one
+        authors: keep these authors; empty keeps all, None keeps the lookups without one
+        langs: keep these word languages; empty keeps all, None keeps the lookups without one
+        drop_duplicates: keep only the last lookup of every word among the remaining rows
+    """
+
+    top_n: Optional[int] = None
+    sort_by: str = 'Timestamp'
+    start_date: Optional[datetime.date] = None
+    books: Tuple[str, ...] = ()
+    authors: Tuple[str, ...] = ()
+    langs: Tuple[str, ...] = ()
+    drop_duplicates: bool = False
+
+
+NO_FILTER = VocabFilter()
+
+
+def compile_filter(
+    f: VocabFilter, since: Optional[int] = None, extra_columns: Optional[Mapping[str, str]] = None
+) -> Tuple[str, List[Any]]:
+    """
+    Compile the filters into a parametrized query over LOOKUPS, WORDS and BOOK_INFO.
+
+    Args:
+        f: filters
+        since: only consider lookups with a timestamp (milliseconds since epoch) greater than this
+        extra_columns: additional data frame columns stored in LOOKUPS, mapped to their SQL names
+
+    Returns:
+        SQL selecting the columns of SQL_COLUMNS followed by `extra_columns`, and its parameters
+    """
+    sort_col = SQL_COLUMNS[f.sort_by]
+    params: List[Any] = []
+    extra = list((extra_columns or {}).values())
+    base = f'SELECT {", ".join([LOOKUPS_FIELDS] + [f"LOOKUPS.{col}" for col in extra])} {LOOKUPS_FROM}'
+    if since is not None:
+        base += ' WHERE LOOKUPS.timestamp > ?'
+        params.append(since)
+    names = ', '.join(list(SQL_COLUMNS.values()) + extra)
+    # The row limit is applied first, the remaining filters only narrow its result down
+    sql = f'WITH base({names}) AS ({base}), limited AS (SELECT * FROM base'
+    if f.top_n is not None:
+        sql += f' ORDER BY {sort_col} DESC, timestamp DESC LIMIT ?'
+        params.append(f.top_n)
+    sql += ') SELECT * FROM limited'
+
+    conditions = []
+    if f.start_date is not None:
+        conditions.append('timestamp >= ?')
+        params.append(int(time.mktime(f.start_date.timetuple()) * 1000))
+    for col, values in (('title', f.books), ('authors', f.authors), ('lang', f.langs)):
+        if values:
+            # NULL never matches IN, so the None option is a condition of its own
+            known = [value for value in values if value is not None]
+            condition = [f'{col} IN ({",".join("?" * len(known))})'] if known else []
+            if len(known) < len(values):
+                condition.append(f'{col} IS NULL')
+            conditions.append(f'({" OR ".join(condition)})')
+            params.extend(known)
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    if f.drop_duplicates:
+        # The last lookup of a word in either sort order is its latest one
+        sql = (
+            f'SELECT {names} FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY word ORDER BY timestamp DESC) AS kvta_rank '
+            f'FROM ({sql})) WHERE kvta_rank = 1'
+        )
+    return sql, params
+
+
+class VocabQuery:
+    """
+    Filters the vocabulary with SQL, so that only the matching rows are materialized.
+
+    Wraps an in-memory copy of vocab.db with indexes on the join and filter columns. The data never changes, so the
+    results of counts and distinct values are kept, and Streamlit reruns only query what the changed filter affects.
+    """
+
+    def __init__(
+        self, con: sqlite3.Connection, since: Optional[int] = None, extra_columns: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.con = con
+        self.since = since
+        # Data frame columns besides VOCAB_COLUMNS, e.g. the source of merged devices -> column of LOOKUPS
+        self.extra_columns = extra_columns or {}
+        self._lock = threading.Lock()
+        self._last: Optional[Tuple[VocabFilter, pd.DataFrame]] = None
+        self._results: Dict[Tuple[str, Tuple[Any, ...]], List[tuple]] = {}
+        self.total: Optional[int] = None
+        with self._lock:
+            for statement in INDEXES:
+                self.con.execute(statement)
+            self.con.execute('ANALYZE')
+        self.total = self.count()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, since: Optional[int] = None) -> 'VocabQuery':
+        return cls(connect_vocab(data), since)
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> 'VocabQuery':
+        """
+        Build the vocab.db tables from already extracted data, e.g. the sample data.
+
+        Columns besides VOCAB_COLUMNS are stored with the lookups and returned by `fetch`.
+        """
+        con = sqlite3.connect(':memory:', check_same_thread=False)
+        extra_columns = {col: f'extra_{i}' for i, col in enumerate(c for c in data.columns if c not in VOCAB_COLUMNS)}
+        books = data[['Book title', 'Authors']].drop_duplicates().reset_index(drop=True)
+        book_keys = data[['Book title', 'Authors']].merge(books.reset_index(), how='left')['index']
+        pd.DataFrame(
+            {'id': range(data.shape[0]), 'word': data['Word'], 'stem': data['Stem'], 'lang': data['Word language']}
+        ).to_sql('WORDS', con, index=False)
+        books.rename(columns={'Book title': 'title', 'Authors': 'authors'}).rename_axis('id').reset_index().to_sql(
+            'BOOK_INFO', con, index=False
+        )
+        pd.DataFrame(
+            {
+                'word_key': range(data.shape[0]),
+                'book_key': book_keys.to_numpy(),
+                'usage': data['Sentence'].to_numpy(),
+                'timestamp': parse_lookup_timestamps(data['Timestamp']),
+                **{sql_col: data[col].to_numpy() for col, sql_col in extra_columns.items()},
+            }
+        ).to_sql('LOOKUPS', con, index=False)
+        return cls(con, extra_columns=extra_columns)
+
+    def size_bytes(self) -> int:
+        """Memory of the in-memory database."""
+        with self._lock:
+            pages = self.con.execute('PRAGMA page_count').fetchone()[0]
+            return pages * self.con.execute('PRAGMA page_size').fetchone()[0]
+
+    def _execute(self, sql: str, params: List[Any]) -> List[tuple]:
+        with self._lock:
+            return self.con.execute(sql, params).fetchall()
+
+    def _execute_cached(self, sql: str, params: List[Any]) -> List[tuple]:
+        key = (sql, tuple(params))
+        if key not in self._results:
+            if len(self._results) >= MAX_CACHED_RESULTS:
+                self._results.clear()
+            self._results[key] = self._execute(sql, params)
+        return self._results[key]
+
+    def _compile(self, f: VocabFilter) -> Tuple[str, List[Any]]:
+        if f.top_n is not None and self.total is not None and f.top_n >= self.total:
+            # A limit covering every row doesn't need the sort
+            f = replace(f, top_n=None)
+        return compile_filter(f, self.since, self.extra_columns)
+
+    def count(self, f: VocabFilter = NO_FILTER) -> int:
+        sql, params = self._compile(f)
+        return self._execute_cached(f'SELECT COUNT(*) FROM ({sql})', params)[0][0]
+
+    def distinct(self, column: str, f: VocabFilter = NO_FILTER) -> List[Any]:
+        """Distinct values of a data frame column among the rows matching the filters, in order of appearance."""
+        sql, params = self._compile(f)
+        col = SQL_COLUMNS.get(column) or self.extra_columns[column]
+        rows = self._execute_cached(f'SELECT {col} FROM ({sql}) GROUP BY {col} ORDER BY MIN(timestamp)', params)
+        return [row[0] for row in rows]
+
+    def date_range(self, f: VocabFilter = NO_FILTER) -> Tuple[Optional[datetime.date], Optional[datetime.date]]:
+        """First and last local lookup dates among the rows matching the filters."""
+        sql, params = self._compile(f)
+        first, last = self._execute_cached(f'SELECT MIN(timestamp), MAX(timestamp) FROM ({sql})', params)[0]
+        if first is None:
+            return None, None
+        return datetime.date.fromtimestamp(first / 1000), datetime.date.fromtimestamp(last / 1000)
+
+    def fetch(self, f: VocabFilter = NO_FILTER) -> pd.DataFrame:
+        """
+        Materialize the rows matching the filters, sorted by `f.sort_by`.
+
+        The last result is kept, so Streamlit reruns with unchanged filters don't query again.
+        """
+        if self._last is not None and self._last[0] == f:
+            return self._last[1]
+        chunks = list(self.iter_fetch(f, chunksize=max(self.count(f), 1)))
+        data = chunks[0] if chunks else empty_vocab_frame(list(self.extra_columns))
+        self._last = (f, data)
+        return data
+
+    def iter_fetch(self, f: VocabFilter = NO_FILTER, chunksize: int = VOCAB_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Materialize the rows matching the filters like `fetch`, `chunksize` rows at a time.
+
+        Yields:
+            DataFrames of at most `chunksize` rows, which concatenated give the result of `fetch`
+        """
+        sql, params = self._compile(f)
+        sql = f'{sql} ORDER BY {SQL_COLUMNS[f.sort_by]}, timestamp'
+        chunks = iter_vocab_frames(self.con, sql, params, list(self.extra_columns), chunksize)
+        while True:
+            with self._lock:
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+
+
+# Queries in use by the sessions, by their data; dropped once no session holds them anymore
+_queries: 'weakref.WeakValueDictionary[str, VocabQuery]' = weakref.WeakValueDictionary()
+_queries_lock = threading.Lock()
+_queries_stats = FunctionStats()
+
+
+def get_vocab_query(data: pd.DataFrame) -> VocabQuery:
+    """
+    Return the query over the data, shared by all sessions that loaded the same data, e.g. the sample data.
+
+    Builds the tables with `VocabQuery.from_frame` the first time the data is filtered.
+    """
+    key = fingerprint(data)
+    with _queries_lock:
+        query = _queries.get(key)
+        if query is None:
+            _queries_stats.misses += 1
+            query = _queries[key] = VocabQuery.from_frame(data)
+        else:
+            _queries_stats.hits += 1
+        return query
+
+
+def vocab_query_report() -> CacheReport:
+    """Diagnostics of the queries shared by the sessions; they're held by the sessions, so nothing is evicted."""
+    with _queries_lock:
+        queries = list(_queries.values())
+        hits, misses = _queries_stats.hits, _queries_stats.misses
+    return CacheReport(
+        'Vocabulary query tables', len(queries), sum(q.size_bytes() for q in queries), hits, misses, 0, 0
+    )
@@ -0,0 +1,183 @@
+import random
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, NamedTuple, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Consecutive failed calls that open the circuit of a backend
+FAILURE_THRESHOLD = 5
+# Seconds an open circuit rejects calls before letting a trial call through
+RESET_TIMEOUT = 30.0
+# Seconds a single call may take, e.g. a Google Translate request; OpenAI has its own, see `src.openai_engine`
+CALL_TIMEOUT = 15.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend that failed too often recently."""
+
+    def __init__(self, backend: str, retry_in: float) -> None:
+        super().__init__(backend, retry_in)
+        self.backend = backend
+        self.retry_in = retry_in
+
+    def __str__(self) -> str:
+        return f'{self.backend} is unavailable after repeated errors, retrying in {self.retry_in:.0f}s'
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker of one backend.
+
+    After `failure_threshold` consecutive failures the circuit opens and every call is rejected at once for
+    `reset_timeout` seconds. Then a single trial call is let through (half-open): its success closes the circuit,
+    its failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'half-open' if time.monotonic() - self._opened_at >= self.reset_timeout else 'open'
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the backend must not be called now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_timeout or self._trial:
+                raise CircuitOpenError(self.name, max(0.0, self.reset_timeout - waited))
+            self._trial = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+    def reset(self) -> None:
+        self.record_success()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(backend: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker of a backend, shared by all sessions and workers."""
+    with _breakers_lock:
+        if backend not in _breakers:
+            _breakers[backend] = CircuitBreaker(backend)
+        return _breakers[backend]
+
+
+def reset_breakers() -> None:
+    """Close the circuits of all backends."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    for breaker in breakers:
+        breaker.reset()
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Return the jittered exponential delay before retry number `attempt` (from 0)."""
+    return min(cap, base * 2**attempt) * random.uniform(0.5, 1.0)
+
+
+class RetryPolicy(NamedTuple):
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_cap: float = 10.0
+    timeout: Optional[float] = CALL_TIMEOUT
+
+
+DEFAULT_RETRY = RetryPolicy()
+
+
+def _call_with_timeout(func: Callable[[], T], timeout: Optional[float]) -> T:
+    if timeout is None:
+        return func()
+    future: 'Future[T]' = Future()
+
+    def run() -> None:
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+
+    # A thread of its own starts the call at once, so the timeout only counts the call. One that timed out keeps
+    # its thread until the request gives up, without holding up other calls; the circuit breaker bounds how many.
+    threading.Thread(target=run, daemon=True, name='kvta-call').start()
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        raise TimeoutError(f'No response within {timeout:.0f}s') from None
+
+
+def resilient_call(
+    backend: str,
+    func: Callable[[], T],
+    is_transient: Callable[[Exception], bool],
+    policy: RetryPolicy = DEFAULT_RETRY,
+    before_attempt: Optional[Callable[[], None]] = None,
+) -> T:
+    """
+    Call a backend with a timeout, retries with jittered exponential backoff and its circuit breaker.
+
+    Only transient errors (timeouts, rate limits, connection and server errors) are retried and count as failures
+    of the backend; other errors, e.g. a text without translation, are raised at once.
+
+    Args:
+        backend: name of the backend, see `get_breaker`
+        func: the call, without arguments
+        is_transient: tells whether an error is worth retrying
+        policy: retries, backoff and timeout
+        before_attempt: called before every attempt outside the timeout, e.g. to wait for the rate limiter
+
+    Returns:
+        the result of `func`
+
+    Raises:
+        CircuitOpenError: if the circuit of the backend is open, without calling it
+    """
+    breaker = get_breaker(backend)
+    attempt = 0
+    while True:
+        breaker.before_call()
+        if before_attempt is not None:
+            before_attempt()
+        try:
+            result = _call_with_timeout(func, policy.timeout)
+        except Exception as e:
+            if not isinstance(e, TimeoutError) and not is_transient(e):
+                # The backend answered, e.g. that a text has no translation
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt >= policy.max_retries:
+                raise
+            time.sleep(backoff_delay(attempt, policy.backoff_base, policy.backoff_cap))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
@@ -0,0 +1,116 @@
+import hashlib
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.governor import get_cache_governor
+
+# Columns identifying the content of a dataset
+FINGERPRINT_COLUMNS = ['Word', 'Sentence', 'Book title', 'Word language', 'Timestamp']
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+# Kind of the statistics kept within the budget of the cache governor
+STATS_RESULTS = 'Vocabulary statistics'
+
+
+class VocabStats(NamedTuple):
+    """Aggregates behind the vocabulary statistics, small enough to render on every rerun."""
+
+    word_count: int
+    book_count: int
+    language_count: int
+    active_days: int
+    avg_per_day: float
+    longest_streak: int
+    most_active_book: str
+    first_date: Optional[str]
+    last_date: Optional[str]
+    # Year-month, count, cumulative
+    monthly: pd.DataFrame
+    # Language, count
+    languages: pd.DataFrame
+    # Book title, count
+    books: pd.DataFrame
+    # date, count, day_name, year_week
+    daily: pd.DataFrame
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """Hash of the content of the dataset, the same for equal data loaded twice."""
+    columns = [col for col in FINGERPRINT_COLUMNS if col in df.columns]
+    hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+
+def longest_streak(days: np.ndarray) -> int:
+    """
+    Longest run of consecutive days.
+
+    Args:
+        days: sorted unique days, as integers (e.g. days since epoch)
+
+    Returns:
+        length of the longest run, 0 for no days
+    """
+    if len(days) == 0:
+        return 0
+    # Positions where a new run starts, plus the end of the last run
+    breaks = np.flatnonzero(np.diff(days) != 1) + 1
+    bounds = np.concatenate(([0], breaks, [len(days)]))
+    return int(np.diff(bounds).max())
+
+
+def compute_stats(df: pd.DataFrame) -> VocabStats:
+    """
+    Compute all the statistics of the vocabulary in one pass over the rows.
+
+    The timestamps are parsed once into days, every per-row aggregate is a single count, and the monthly totals,
+    streaks and heatmap are derived from the daily counts.
+
+    Args:
+        df: dataframe with data
+
+    Returns:
+        the aggregates
+    """
+    day_values = pd.to_datetime(df['Timestamp']).to_numpy('datetime64[D]')
+    days, day_counts = np.unique(day_values[~np.isnat(day_values)], return_counts=True)
+    daily = pd.DataFrame({'date': pd.to_datetime(days), 'count': day_counts})
+    daily['day_name'] = np.array(DAY_NAMES, dtype=object)[daily['date'].dt.dayofweek.to_numpy()]
+    iso = daily['date'].dt.isocalendar()
+    daily['year_week'] = daily['date'].dt.year.astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)
+
+    monthly = daily.groupby(daily['date'].dt.strftime('%Y-%m'))['count'].sum().rename_axis('Year-month').reset_index()
+    monthly['cumulative'] = monthly['count'].cumsum()
+
+    languages = df['Word language'].value_counts().rename_axis('Language').reset_index(name='count')
+    books = df['Book title'].value_counts().rename_axis('Book title').reset_index(name='count')
+
+    word_count = df.shape[0]
+    active_days = len(days)
+    return VocabStats(
+        word_count=word_count,
+        book_count=len(books),
+        language_count=len(languages),
+        active_days=active_days,
+        avg_per_day=round(word_count / active_days, 1) if active_days > 0 else 0,
+        longest_streak=longest_streak(days.astype('int64')),
+        most_active_book=str(books['Book title'].iloc[0]) if len(books) > 0 else 'N/A',
+        first_date=str(days[0]) if active_days > 0 else None,
+        last_date=str(days[-1]) if active_days > 0 else None,
+        monthly=monthly,
+        languages=languages,
+        books=books,
+        daily=daily,
+    )
+
+
+def get_vocab_stats(df: pd.DataFrame) -> VocabStats:
+    """Return the statistics of the dataset, computed once per dataset fingerprint while the memory budget allows."""
+    governor = get_cache_governor()
+    key = dataset_fingerprint(df)
+    found, stats = governor.get(STATS_RESULTS, key)
+    if not found:
+        stats = compute_stats(df)
+        governor.put(STATS_RESULTS, key, stats)
+    return stats
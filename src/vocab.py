@@ -0,0 +1,191 @@
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+VOCAB_COLUMNS = ['Word', 'Stem', 'Word language', 'Sentence', 'Book title', 'Authors', 'Timestamp']
+# Number of lookups fetched from vocab.db at a time
+VOCAB_CHUNK_SIZE = 20_000
+
+# Fields of every lookup, in the order of VOCAB_COLUMNS
+LOOKUPS_FIELDS = (
+    'WORDS.word, WORDS.stem, WORDS.lang, LOOKUPS.usage, BOOK_INFO.title, BOOK_INFO.authors, LOOKUPS.timestamp'
+)
+LOOKUPS_FROM = """
+      FROM LOOKUPS
+      LEFT JOIN WORDS
+        ON WORDS.id = LOOKUPS.word_key
+      LEFT JOIN BOOK_INFO
+        ON BOOK_INFO.id = LOOKUPS.book_key
+"""
+# All lookups with their word and book
+LOOKUPS_SELECT = f'SELECT {LOOKUPS_FIELDS} {LOOKUPS_FROM}'
+
+
+def connect_vocab(data: bytes) -> sqlite3.Connection:
+    """Open the bytes of a vocab.db as an in-memory SQLite connection."""
+    if data[18:20] == b'\x02\x02':
+        # In-memory databases don't support WAL, switch the header to the rollback journal
+        data = data[:18] + b'\x01\x01' + data[20:]
+    con = sqlite3.connect(':memory:', check_same_thread=False)
+    if hasattr(con, 'deserialize'):
+        con.deserialize(data)
+    else:
+        _copy_from_file(data, con)
+    return con
+
+
+def _copy_from_file(data: bytes, con: sqlite3.Connection) -> None:
+    """Load a database into `con` through a temporary file, sqlite3 can only load one from memory since Python 3.11."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'vocab.db')
+        with open(path, 'wb') as fp:
+            fp.write(data)
+        with closing(sqlite3.connect(path)) as source:
+            source.backup(con)
+
+
+def _utc_offsets_ms(ms: np.ndarray) -> np.ndarray:
+    """Local UTC offset at every epoch timestamp, looked up once per 15-minute bucket."""
+    buckets, inverse = np.unique(ms // 900_000, return_inverse=True)
+    offsets = np.array([time.localtime(b * 900).tm_gmtoff for b in buckets.tolist()], dtype='int64') * 1000
+    return offsets[inverse.reshape(-1)]
+
+
+def format_lookup_timestamps(timestamps: Sequence[int]) -> np.ndarray:
+    """
+    Convert Kindle lookup timestamps to local time strings.
+
+    Same result as `datetime.fromtimestamp(t / 1000).strftime('%Y-%m-%d %H:%M:%S')` for every value, but the local
+    UTC offset is only looked up once per 15-minute bucket (time zone changes happen on such boundaries).
+
+    Args:
+        timestamps: milliseconds since epoch
+
+    Returns:
+        array of 'YYYY-MM-DD HH:MM:SS' strings
+    """
+    ms = np.asarray(timestamps, dtype='int64')
+    if ms.size == 0:
+        return np.array([], dtype=object)
+    local = (ms + _utc_offsets_ms(ms)).astype('datetime64[ms]').astype('datetime64[s]')
+    return np.char.replace(np.datetime_as_string(local, unit='s'), 'T', ' ').astype(object)
+
+
+def parse_lookup_timestamps(timestamps: Sequence[str]) -> np.ndarray:
+    """
+    Convert local time strings back to milliseconds since epoch, the inverse of `format_lookup_timestamps`.
+
+    Args:
+        timestamps: 'YYYY-MM-DD HH:MM:SS' strings
+
+    Returns:
+        array of int64 timestamps
+    """
+    naive = pd.to_datetime(pd.Series(timestamps, dtype=object)).to_numpy('datetime64[ms]').astype('int64')
+    guess = naive - _utc_offsets_ms(naive)
+    return naive - _utc_offsets_ms(guess)
+
+
+def lookups_to_frame(lookups: pd.DataFrame, extra_columns: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    Name the columns of lookups read with `pd.read_sql_query` and format their timestamps.
+
+    Args:
+        lookups: lookups with the fields of LOOKUPS_FIELDS, followed by the values of `extra_columns`
+        extra_columns: names of additional fields at the end of every row
+
+    Returns:
+        DataFrame with VOCAB_COLUMNS and `extra_columns`
+    """
+    data = lookups.set_axis(VOCAB_COLUMNS + list(extra_columns), axis=1)
+    data['Timestamp'] = format_lookup_timestamps(data['Timestamp'].to_numpy(dtype='int64'))
+    return data
+
+
+def empty_vocab_frame(extra_columns: Sequence[str] = ()) -> pd.DataFrame:
+    return pd.DataFrame({name: pd.Series(dtype=object) for name in VOCAB_COLUMNS + list(extra_columns)})
+
+
+def iter_vocab_frames(
+    con: sqlite3.Connection,
+    sql: str,
+    params: Sequence[Any] = (),
+    extra_columns: Sequence[str] = (),
+    chunksize: int = VOCAB_CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Run a query selecting the fields of LOOKUPS_FIELDS and `extra_columns`, `chunksize` rows at a time.
+
+    pandas transposes the fetched rows into the columns of every chunk in C.
+
+    Args:
+        con: connection to vocab.db
+        sql: the query
+        params: its parameters
+        extra_columns: names of additional fields at the end of every row
+        chunksize: maximal number of rows per chunk
+
+    Yields:
+        non-empty DataFrames with VOCAB_COLUMNS and `extra_columns`
+    """
+    for lookups in pd.read_sql_query(sql, con, params=list(params), chunksize=chunksize, coerce_float=False):
+        if lookups.shape[0]:
+            yield lookups_to_frame(lookups, extra_columns)
+
+
+def iter_lookup_chunks(
+    con: sqlite3.Connection, since: Optional[int] = None, chunksize: int = VOCAB_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Read the lookups from an open vocab.db in timestamp order, `chunksize` rows at a time.
+
+    Args:
+        con: connection to vocab.db
+        since: only read lookups with a timestamp (milliseconds since epoch) greater than this
+        chunksize: maximal number of rows per chunk
+
+    Yields:
+        DataFrames with VOCAB_COLUMNS
+    """
+    where = 'WHERE LOOKUPS.timestamp > ?' if since is not None else ''
+    sql = f'{LOOKUPS_SELECT} {where} ORDER BY LOOKUPS.timestamp, WORDS.stem'
+    return iter_vocab_frames(con, sql, () if since is None else (since,), chunksize=chunksize)
+
+
+def count_lookups(con: sqlite3.Connection, since: Optional[int] = None) -> int:
+    if since is None:
+        return con.execute('SELECT COUNT(*) FROM LOOKUPS').fetchone()[0]
+    return con.execute('SELECT COUNT(*) FROM LOOKUPS WHERE timestamp > ?', (since,)).fetchone()[0]
+
+
+def read_lookups(
+    con: sqlite3.Connection, since: Optional[int] = None, progress: Optional[Callable[[int, int], None]] = None
+) -> pd.DataFrame:
+    """
+    Read all the lookups from an open vocab.db.
+
+    Args:
+        con: connection to vocab.db
+        since: only read lookups with a timestamp (milliseconds since epoch) greater than this
+        progress: called with (rows loaded, total rows) after every chunk
+
+    Returns:
+        DataFrame with VOCAB_COLUMNS, in timestamp order
+    """
+    total = count_lookups(con, since)
+    chunks = []
+    loaded = 0
+    for chunk in iter_lookup_chunks(con, since):
+        chunks.append(chunk)
+        loaded += chunk.shape[0]
+        if progress:
+            progress(loaded, total)
+    if not chunks:
+        return empty_vocab_frame()
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_translation_cache(tmp_path, monkeypatch):
+    """Keep the persistent translation cache, sync state and checkpoints of every test in its own temporary directory."""
+    monkeypatch.setenv('KVTA_CACHE_PATH', str(tmp_path / 'translations.sqlite3'))
+    monkeypatch.setenv('KVTA_SYNC_DIR', str(tmp_path / 'sync'))
+    monkeypatch.setenv('KVTA_CHECKPOINT_DIR', str(tmp_path / 'checkpoints'))
+
+
+@pytest.fixture(autouse=True)
+def closed_circuits():
+    """Start every test with the circuits of all backends closed."""
+    from src.resilience import reset_breakers
+
+    reset_breakers()
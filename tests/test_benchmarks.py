@@ -0,0 +1,27 @@
+import json
+
+from benchmarks.run import compare, main
+from benchmarks.synthetic import generate_vocab_db
+from src.vocab import connect_vocab, read_lookups
+
+
+def test_generate_vocab_db():
+    """Test that the synthetic vocab.db has the requested size, languages and books, with every word in its sentence."""
+    data = read_lookups(connect_vocab(generate_vocab_db(500, languages=('es', 'de'), n_books=3)))
+    assert data.shape[0] == 500
+    assert set(data['Word language']) == {'es', 'de'}
+    assert data['Book title'].nunique() <= 3
+    assert all(word.lower() in sentence.lower() for word, sentence in zip(data['Word'], data['Sentence']))
+
+
+def test_benchmark_report(tmp_path):
+    """Test that the benchmark run reports every stage and that the comparison flags regressions against a baseline."""
+    output = tmp_path / 'report.json'
+    assert main(['--sizes', '200', '--repeat', '1', '-o', str(output)]) == 0
+    report = json.loads(output.read_text())
+    stages = {r['stage'] for r in report['results']}
+    assert {'ingest', 'filter', 'translate_stub', 'stats', 'export_csv', 'export_apkg'} <= stages
+
+    baseline = {'results': [{**r, 'seconds': r['seconds'] / 10} for r in report['results']]}
+    assert len(compare(report, baseline, 1.25)) == len(report['results'])
+    assert compare(report, report, 1.25) == []
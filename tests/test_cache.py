@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+from src.cache import CacheKey, TranslationCache, get_translation_cache
+
+
+def test_cache_roundtrip(tmp_path):
+    """Test that stored values are returned and survive reopening the cache file."""
+    path = tmp_path / 'cache.sqlite3'
+    key = CacheKey('google', '', 'es', 'en', 'hola')
+    TranslationCache(path).set_many({key: 'hello'})
+
+    reopened = TranslationCache(path)
+    assert reopened.get(key) == 'hello'
+    assert reopened.get(key._replace(target_lang='de')) is None
+    assert len(reopened) == 1
+
+
+def test_cache_context_is_part_of_key(tmp_path):
+    """Test that the same word in different sentences is cached separately."""
+    cache = TranslationCache(tmp_path / 'cache.sqlite3')
+    key1 = CacheKey('google_context', '', 'es', 'en', 'banco', 'Me senté en el banco')
+    key2 = CacheKey('google_context', '', 'es', 'en', 'banco', 'Fui al banco')
+    cache.set_many({key1: 'bench', key2: 'bank'})
+
+    assert cache.get_many([key1, key2]) == {key1: 'bench', key2: 'bank'}
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test that the size budget evicts the oldest entries first."""
+    cache = TranslationCache(tmp_path / 'cache.sqlite3', max_bytes=1000)
+    keys = [CacheKey('google', '', 'es', 'en', f'word{i}') for i in range(20)]
+    for key in keys:
+        cache.set_many({key: 'x' * 80})
+
+    assert cache.size_bytes() <= 1000
+    assert cache.get(keys[-1]) is not None
+    assert cache.get(keys[0]) is None
+
+    report = cache.report()
+    assert (report.entries, report.hits, report.misses) == (len(cache), 1, 1)
+    assert report.evictions == len(keys) - len(cache)
+
+
+def test_translate_only_calls_backend_for_new_words():
+    """Test that translate() reuses the persistent cache across calls with different inputs."""
+    from src.pipeline import translate
+
+    with patch('src.pipeline.GoogleTranslator') as mock_google:
+        mock_google.return_value.translate.side_effect = lambda text: text.upper()
+
+        assert translate([('es', 'hola'), ('es', 'mundo')], 'en') == ['HOLA', 'MUNDO']
+        assert translate([('es', 'hola'), ('es', 'mundo'), ('es', 'gato')], 'en') == ['HOLA', 'MUNDO', 'GATO']
+
+    assert mock_google.return_value.translate.call_count == 3
+    assert len(get_translation_cache()) == 3
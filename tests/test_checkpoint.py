@@ -0,0 +1,96 @@
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from src import pipeline
+from src.checkpoint import fingerprint, get_checkpoint_store
+
+
+def _translators(translate):
+    return pipeline.Translators(translate, MagicMock(), MagicMock(), MagicMock())
+
+
+def test_interrupted_run_resumes_finished_columns():
+    """Test that a run started again after a failure restores its finished columns instead of translating them."""
+    df = pd.DataFrame({'Word': ['hola', 'casa'], 'Word language': ['es', 'es'], 'Sentence': ['Hola', 'La casa']})
+    store = get_checkpoint_store()
+
+    def flaky(rows, **kwargs):
+        if rows[0][1] == 'Hola':
+            raise RuntimeError('killed')
+        return [text.upper() for _, text in rows]
+
+    with pytest.raises(RuntimeError):
+        pipeline.make_more_columns(
+            df.copy(), 'en', ['Word', 'Sentence'], 'Word only', translators=_translators(flaky), checkpoints=store
+        )
+    assert len(store.runs()) == 1
+
+    translate = MagicMock(side_effect=lambda rows, **kwargs: [text.upper() for _, text in rows])
+    result = pipeline.make_more_columns(
+        df.copy(), 'en', ['Word', 'Sentence'], 'Word only', translators=_translators(translate), checkpoints=store
+    )
+    # Only the sentences are translated again
+    translate.assert_called_once()
+    assert translate.call_args[0][0] == [('es', 'Hola'), ('es', 'La casa')]
+    assert result['translated_word'].tolist() == ['HOLA', 'CASA']
+    assert result.attrs['dedup_stats'] == {'lookups': 4, 'deduplicated': 0, 'restored': 2, 'reused': 0}
+    assert store.runs() == []
+
+
+def test_column_with_untranslated_texts_is_not_checkpointed():
+    """Test that a column with texts skipped by an unavailable backend is translated again when resuming."""
+    df = pd.DataFrame({'Word': ['hola', 'casa'], 'Word language': ['es', 'es'], 'Sentence': ['Hola', 'La casa']})
+    store = get_checkpoint_store()
+
+    def partly(rows, **kwargs):
+        if rows[0][1] == 'Hola':
+            raise RuntimeError('killed')
+        # The circuit of the backend was open for the second word
+        return pipeline.Translations([rows[0][1].upper(), rows[1][1]], untranslated=1)
+
+    with pytest.raises(RuntimeError):
+        pipeline.make_more_columns(
+            df.copy(), 'en', ['Word', 'Sentence'], 'Word only', translators=_translators(partly), checkpoints=store
+        )
+
+    translate = MagicMock(side_effect=lambda rows, **kwargs: [text.upper() for _, text in rows])
+    result = pipeline.make_more_columns(
+        df.copy(), 'en', ['Word', 'Sentence'], 'Word only', translators=_translators(translate), checkpoints=store
+    )
+    assert translate.call_count == 2
+    assert result['translated_word'].tolist() == ['HOLA', 'CASA']
+
+    empty = pipeline.make_more_columns(
+        df.iloc[:0], 'en', ['Word'], 'Word only', translators=_translators(translate), checkpoints=store
+    )
+    assert empty.shape[0] == 0 and 'translated_word' in empty.columns
+
+
+def test_fingerprint_depends_on_data_and_params():
+    """Test that the fingerprint is stable for equal data and changes with the data or the parameters."""
+    df = pd.DataFrame({'Word': ['hola'], 'Sentence': ['Hola']})
+    assert fingerprint(df, lang='en') == fingerprint(df.copy(), lang='en')
+    assert fingerprint(df, lang='en') != fingerprint(df, lang='de')
+    assert fingerprint(df, lang='en') != fingerprint(df.assign(Word='casa'), lang='en')
+
+
+def test_translate_keeps_finished_chunks_when_interrupted():
+    """Test that translations are stored in chunks while running, so an interrupted run isn't lost."""
+    data = [('es', f'palabra{i}') for i in range(250)]
+
+    def interrupted(iterable, **kwargs):
+        for n, item in enumerate(iterable):
+            if n == 150:
+                raise KeyboardInterrupt
+            yield item
+
+    with patch('src.pipeline.google_translate', side_effect=lambda text, source, target: text.upper()) as google:
+        with pytest.raises(KeyboardInterrupt):
+            pipeline.translate(data, 'en', progress=interrupted)
+        google.reset_mock()
+        result = pipeline.translate(data, 'en')
+
+    assert google.call_count == 100
+    assert result == [text.upper() for _, text in data]
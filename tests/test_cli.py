@@ -0,0 +1,100 @@
+import subprocess
+import sys
+import zipfile
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.cli import main
+from tests.test_utils import _create_test_db
+
+
+def test_cli_runs_pipeline(tmp_path):
+    """Test the headless pipeline from vocab.db to the Anki CSV."""
+    vocab = tmp_path / 'vocab.db'
+    vocab.write_bytes(_create_test_db())
+    output = tmp_path / 'anki.csv'
+
+    with patch('src.pipeline.google_translate', side_effect=lambda text, source, target: text.upper()):
+        code = main(
+            [
+                str(vocab),
+                '-o',
+                str(output),
+                '--lang',
+                'german',
+                '--translate',
+                'Word,Stem',
+                '--start-date',
+                '2023-02-01',
+                '--highlight',
+                'bold',
+                '--sep',
+                'tab',
+                '--header',
+                '--quiet',
+            ]
+        )
+
+    assert code == 0
+    result = pd.read_csv(output, sep='\t')
+    assert list(result.columns) == [
+        'Word',
+        'Stem',
+        'Sentence',
+        'translated_word',
+        'translated_stem',
+        'sentence_with_highlight',
+    ]
+    assert result.to_dict('records') == [
+        {
+            'Word': 'mundo',
+            'Stem': 'mundo',
+            'Sentence': 'El mundo es grande',
+            'translated_word': 'MUNDO',
+            'translated_stem': 'MUNDO',
+            'sentence_with_highlight': 'El <b>mundo</b> es grande',
+        }
+    ]
+
+
+def test_cli_streams_chunks(tmp_path):
+    """Test that a run in chunks of one lookup writes the same table as a run in one chunk."""
+    vocab = tmp_path / 'vocab.db'
+    vocab.write_bytes(_create_test_db())
+    outputs = []
+
+    with patch('src.pipeline.google_translate', side_effect=lambda text, source, target: text.upper()):
+        for chunk_size in ('1', '100'):
+            output = tmp_path / f'anki_{chunk_size}.csv'
+            assert main([str(vocab), '-o', str(output), '--header', '--chunk-size', chunk_size, '--quiet']) == 0
+            outputs.append(output.read_text())
+
+    assert outputs[0] == outputs[1]
+    assert pd.read_csv(tmp_path / 'anki_1.csv', sep=';')['translated_word'].tolist() == ['HOLA', 'MUNDO']
+
+
+def test_cli_rejects_invalid_database(tmp_path):
+    """Test that a file that is not a vocab.db exits with an error code."""
+    vocab = tmp_path / 'vocab.db'
+    vocab.write_bytes(b'not a database')
+    assert main([str(vocab), '-o', str(tmp_path / 'out.csv'), '--quiet']) == 1
+
+
+def test_cli_does_not_import_streamlit():
+    """Test that the command line pipeline runs without importing the web interface."""
+    code = "import sys, src.cli; assert not {'streamlit', 'altair', 'stqdm'} & set(sys.modules)"
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_cli_writes_apkg(tmp_path):
+    """Test that an output ending with .apkg is written as an Anki package."""
+    vocab = tmp_path / 'vocab.db'
+    vocab.write_bytes(_create_test_db())
+    output = tmp_path / 'deck.apkg'
+
+    with patch('src.pipeline.google_translate', side_effect=lambda text, source, target: text.upper()):
+        assert main([str(vocab), '-o', str(output), '--deck-name', 'Spanish', '--quiet']) == 0
+
+    with zipfile.ZipFile(output) as package:
+        assert 'collection.anki2' in package.namelist()
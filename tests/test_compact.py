@@ -0,0 +1,54 @@
+import io
+
+import pandas as pd
+
+from src import pipeline
+from src.compact import compact_frame, memory_bytes
+from src.export import build_export_table, write_csv, write_table_apkg
+
+
+def _sample():
+    return pd.DataFrame(
+        {
+            'Word': ['casa', 'perro', 'casa', 'gato'],
+            'Sentence': ['La casa', 'Un perro', 'Otra casa', None],
+            'Word language': ['es'] * 4,
+            'Book title': ['Libro'] * 4,
+            'Timestamp': ['2023-01-15 10:00:00', '2023-01-16 11:30:00', '2023-02-01 08:00:00', '2023-02-02 09:00:00'],
+        }
+    )
+
+
+def test_compact_frame_keeps_exported_values():
+    """Test that the compact data is exported exactly like the original data."""
+    data = _sample()
+    compact = compact_frame(data)
+
+    assert compact['Book title'].dtype == 'category'
+    assert compact['Timestamp'].dtype.kind == 'M'
+    # A column with missing values keeps None for them
+    assert compact['Sentence'].dtype == object and compact['Sentence'].iloc[3] is None
+
+    def export(frame):
+        table = build_export_table(frame, list(frame.columns))
+        text = io.StringIO()
+        write_csv(table, text, header=True)
+        return text.getvalue(), write_table_apkg(table, io.BytesIO())
+
+    assert export(compact) == export(data)
+
+
+def test_compact_frame_uses_less_memory():
+    """Test that the compact form of repetitive data takes less than a third of the memory."""
+    data = pd.concat([_sample()] * 500, ignore_index=True)
+    assert memory_bytes(compact_frame(data)) < memory_bytes(data) / 3
+
+
+def test_make_more_columns_leaves_input_unchanged():
+    """Test that translating compact session data returns new columns without modifying it."""
+    data = compact_frame(_sample().dropna())
+    translators = pipeline.Translators(lambda rows, **kwargs: [w.upper() for _, w in rows], None, None, None)
+
+    result = pipeline.make_more_columns(data, 'en', ['Word'], 'Word only', translators=translators)
+    assert result['translated_word'].tolist() == ['CASA', 'PERRO', 'CASA']
+    assert 'translated_word' not in data.columns
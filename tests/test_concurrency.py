@@ -0,0 +1,54 @@
+import threading
+import time
+from unittest.mock import patch
+
+from src.concurrency import TokenBucket, run_concurrently
+
+
+def test_token_bucket_limits_rate():
+    """Test that the bucket lets a burst through and then throttles to the refill rate."""
+    bucket = TokenBucket(rate=50, capacity=5)
+    start = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    # 5 tokens are available immediately, the other 10 arrive at 50 per second
+    assert time.monotonic() - start >= 0.18
+
+
+def test_token_bucket_shared_across_threads():
+    """Test that concurrent workers share the same budget."""
+    bucket = TokenBucket(rate=100, capacity=1)
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start >= 0.18
+
+
+def test_run_concurrently_returns_index_and_errors():
+    """Test that results can be put back in input order and errors are reported per item."""
+
+    def work(x: int) -> int:
+        time.sleep(0.01 * (5 - x))
+        if x == 2:
+            raise ValueError('boom')
+        return x * 10
+
+    results = {i: (result, error) for i, result, error in run_concurrently(work, list(range(5)), workers=4)}
+
+    assert [results[i][0] for i in (0, 1, 3, 4)] == [0, 10, 30, 40]
+    assert isinstance(results[2][1], ValueError)
+
+
+def test_translate_concurrently_keeps_order():
+    """Test that translate() with several workers returns results in input order."""
+    from src.pipeline import translate
+
+    words = [('es', f'palabra{i}') for i in range(20)]
+    with patch('src.pipeline.GoogleTranslator') as mock_google:
+        mock_google.return_value.translate.side_effect = lambda text: text.upper()
+        result = translate(words, 'en', workers=8)
+
+    assert result == [word.upper() for _, word in words]
@@ -0,0 +1,66 @@
+import struct
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from src.dictionary import INDEX_SUFFIX, Dictionary, get_dictionaries
+from src.pipeline import DICTIONARY_BACKEND, Translators, make_more_columns, translate_dictionary
+
+
+def test_tsv_dictionary(tmp_path):
+    """Test case-insensitive lookups, entries on several lines and the saved index."""
+    path = tmp_path / 'es_en.tsv'
+    path.write_text('# comment\ncasa\thouse\nperro\tdog\nCasa\thome\nárbol\t<b>tree</b>\n', encoding='utf-8')
+
+    dictionary = Dictionary.open(path)
+    assert len(dictionary) == 4
+    assert dictionary.lookup(' CASA') == 'house, home'
+    assert dictionary.lookup('Árbol') == 'tree'
+    assert dictionary.lookup('gato') is None
+    assert (tmp_path / ('es_en.tsv' + INDEX_SUFFIX)).exists()
+    assert Dictionary.open(path).lookup('perro') == 'dog'
+
+
+def test_stardict_dictionary(tmp_path):
+    """Test a StarDict dictionary with its .ifo, .idx and .dict files."""
+    entries = sorted({'haus': 'house', 'baum': 'tree\nwood', 'hund': 'dog'}.items())
+    definitions = b''
+    idx = b''
+    for word, definition in entries:
+        data = definition.encode()
+        idx += word.encode() + b'\0' + struct.pack('>II', len(definitions), len(data))
+        definitions += data
+    (tmp_path / 'de_en.idx').write_bytes(idx)
+    (tmp_path / 'de_en.dict').write_bytes(definitions)
+    (tmp_path / 'de_en.ifo').write_text(f"StarDict's dict ifo file\nversion=2.4.2\nwordcount={len(entries)}\n")
+
+    dictionary = Dictionary.open(tmp_path / 'de_en.ifo')
+    assert dictionary.lookup('Baum') == 'tree; wood'
+    assert dictionary.lookup('hund') == 'dog'
+    assert dictionary.lookup('katze') is None
+
+
+def test_dictionary_backend_falls_back_on_misses(tmp_path, monkeypatch):
+    """Test that only the words missing from the dictionary are translated online."""
+    monkeypatch.setenv('KVTA_DICT_DIR', str(tmp_path))
+    (tmp_path / 'es_en.tsv').write_text('casa\thouse\nperro\tdog\n', encoding='utf-8')
+    assert (('es', 'en')) in get_dictionaries().paths()
+
+    fallback = MagicMock(side_effect=lambda rows: [f'online {text}' for _, text in rows])
+    data = [('es', 'casa'), ('de', 'haus'), ('es', 'gato'), ('es', 'perro')]
+    assert translate_dictionary(data, 'en', fallback) == ['house', 'online haus', 'online gato', 'dog']
+    fallback.assert_called_once_with([('de', 'haus'), ('es', 'gato')])
+
+    df = pd.DataFrame(
+        {
+            'Word': ['casa', 'gato'],
+            'Stem': ['casa', 'gato'],
+            'Sentence': ['la casa', 'el gato'],
+            'Word language': ['es', 'es'],
+        }
+    )
+    online = MagicMock(side_effect=lambda rows, **kwargs: [f'online {text}' for _, text in rows])
+    result = make_more_columns(
+        df, 'en', ['Word'], 'Word only', DICTIONARY_BACKEND, translators=Translators(online, None, None, None)
+    )
+    assert result['translated_word'].tolist() == ['house', 'online gato']
@@ -0,0 +1,100 @@
+import json
+import sqlite3
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+from src.apkg import FIELD_SEPARATOR, anki_field_names
+from src.export import HIGHLIGHT_COLUMN, apkg_tempfile, csv_tempfile, iter_csv_chunks, write_table_apkg
+
+
+def _table(n: int = 25) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            'Word': [f'palabra{i}' for i in range(n)],
+            'Sentence': [f'Una frase; con "comillas" {i}' for i in range(n)],
+            'translated_word': [f'word{i}' if i % 5 else None for i in range(n)],
+        }
+    )
+
+
+def test_csv_chunks_match_to_csv():
+    """Test that the CSV written in chunks is the same as the one of `to_csv`."""
+    table = _table()
+    for sep, header in ((';', False), ('\t', True)):
+        assert ''.join(iter_csv_chunks(table, sep, header, chunksize=7)) == table.to_csv(
+            index=False, sep=sep, header=header
+        )
+    assert csv_tempfile(table, ';', True).read().decode('utf-8') == table.to_csv(index=False, sep=';')
+
+
+def test_apkg_collection(tmp_path):
+    """Test that the Anki package holds the deck, the note type and one note and card per row."""
+    table = _table()
+    path = tmp_path / 'deck.apkg'
+    assert write_table_apkg(table, str(path), 'Spanish') == 25
+
+    with zipfile.ZipFile(path) as package:
+        assert set(package.namelist()) == {'collection.anki2', 'media'}
+        package.extract('collection.anki2', tmp_path)
+    con = sqlite3.connect(tmp_path / 'collection.anki2')
+    models = json.loads(con.execute('SELECT models FROM col').fetchone()[0])
+    decks = json.loads(con.execute('SELECT decks FROM col').fetchone()[0])
+    (model,) = models.values()
+    assert [field['name'] for field in model['flds']] == ['Word', 'Sentence', 'translated_word']
+    assert 'Spanish' in [deck['name'] for deck in decks.values()]
+
+    notes = con.execute('SELECT id, flds, sfld FROM notes ORDER BY id').fetchall()
+    assert len(notes) == 25
+    assert notes[1][1].split(FIELD_SEPARATOR) == ['palabra1', 'Una frase; con "comillas" 1', 'word1']
+    assert notes[0][1].split(FIELD_SEPARATOR)[2] == ''
+    cards = con.execute('SELECT nid, did, due FROM cards ORDER BY due').fetchall()
+    assert [card[0] for card in cards] == [note[0] for note in notes]
+    assert {card[1] for card in cards} == {model['did']}
+
+
+def test_apkg_ids_are_stable(tmp_path):
+    """Test that the same deck exported twice keeps its deck and note type ids, so Anki updates it on import."""
+    cols = []
+    for n in (3, 5):
+        with zipfile.ZipFile(apkg_tempfile(_table(n), 'Deck')) as package:
+            assert package.read('media') == b'{}'
+            package.extract('collection.anki2', tmp_path / str(n))
+        con = sqlite3.connect(tmp_path / str(n) / 'collection.anki2')
+        models, decks = con.execute('SELECT models, decks FROM col').fetchone()
+        cols.append((json.loads(models).keys(), json.loads(decks).keys()))
+        con.close()
+    assert cols[0] == cols[1]
+
+
+def _notes(table: pd.DataFrame, tmp_path: Path) -> list:
+    with zipfile.ZipFile(apkg_tempfile(table, 'Deck')) as package:
+        package.extract('collection.anki2', tmp_path)
+    con = sqlite3.connect(tmp_path / 'collection.anki2')
+    notes = con.execute('SELECT guid, flds, sfld FROM notes ORDER BY id').fetchall()
+    con.close()
+    return notes
+
+
+def test_apkg_guids_follow_identity_fields(tmp_path):
+    """Test that a note keeps its guid when only its translation changes, so Anki updates it on import."""
+    table = _table(3)
+    guids = [note[0] for note in _notes(table, tmp_path)]
+    retranslated = [note[0] for note in _notes(table.assign(translated_word='better'), tmp_path)]
+    assert retranslated == guids
+    assert len(set(guids)) == 3
+    assert _notes(table.assign(Word='otra'), tmp_path)[0][0] != guids[0]
+
+
+def test_apkg_escapes_html_except_highlight(tmp_path):
+    """Test that field values are HTML-escaped, while the markup of the highlighted sentence is kept."""
+    table = pd.DataFrame({'Word': ['a<b'], 'Sentence': ['x < y & z'], HIGHLIGHT_COLUMN: ['x <b>y</b>']})
+    ((_, flds, sfld),) = _notes(table, tmp_path)
+    assert flds.split(FIELD_SEPARATOR) == ['a&lt;b', 'x &lt; y &amp; z', 'x <b>y</b>']
+    assert sfld == 'a<b'
+
+
+def test_anki_field_names():
+    """Test that column names are made valid and unique as Anki field names."""
+    assert anki_field_names(['Word', 'a:b', '{x}', 'Word', '']) == ['Word', 'ab', 'x', 'Word_', 'Field 5']
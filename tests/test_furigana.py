@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from benchmarks.simulator import TranslationSimulator
+from src import pipeline
+from src.furigana import has_kanji, parse_furigana, plan_furigana_batches
+
+
+@pytest.fixture
+def simulator(monkeypatch):
+    with TranslationSimulator() as sim:
+        monkeypatch.setenv('OPENAI_BASE_URL', sim.openai_url)
+        yield sim
+
+
+def test_parse_furigana():
+    """Test that annotations are matched by id and that an annotation changing its sentence is rejected."""
+    batch = ['猫が好き', '犬を見た']
+    output = json.dumps(
+        {'sentences': [{'id': 2, 'annotated': ' 犬[いぬ]を 見[み]た'}, {'id': 1, 'annotated': ' 猫[ねこ]は 好[す]き'}]}
+    )
+    assert parse_furigana(output, batch) == ['', '犬[いぬ]を 見[み]た']
+    assert parse_furigana('not json', batch) == ['', '']
+
+
+def test_add_furigana_batches_unique_sentences(simulator):
+    """Test that sentences are annotated once, in one request, and that kana-only sentences aren't sent."""
+    sentences = ['猫が好き', 'ありがとう', '猫が好き', '犬を見た', None]
+
+    assert not has_kanji('ありがとう')
+    assert pipeline.add_furigana(sentences, 'sk-test', 'gpt-4.1-mini') == sentences
+    assert len(simulator.records) == 1
+
+    simulator.reset()
+    pipeline.add_furigana(sentences, 'sk-test', 'gpt-4.1-mini')
+    # Served from the persistent cache
+    assert simulator.records == []
+
+
+def test_plan_furigana_batches():
+    """Test that long sentences are split into several batches, each sentence in exactly one."""
+    sentences = ['猫が好き' * 50] * 300
+    batches = plan_furigana_batches(sentences, 'gpt-4.1-mini')
+    assert sorted(i for batch in batches for i in batch) == list(range(300))
+    assert len(batches) > 1
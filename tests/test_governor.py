@@ -0,0 +1,63 @@
+import pytest
+
+from src.governor import LFU, CacheGovernor, estimate_size
+
+
+def test_governor_evicts_across_functions_within_budget():
+    """Test that the byte budget is shared by all functions and the least recently used entries go first."""
+    value = 'x' * 1000
+    governor = CacheGovernor(max_bytes=3 * estimate_size(value))
+    governor.put('translate', 'a', value)
+    governor.put('furigana', 'b', value)
+    governor.put('translate', 'c', value)
+    assert governor.get('translate', 'a') == (True, value)
+
+    governor.put('make_more_columns', 'd', value)
+    assert governor.get('furigana', 'b') == (False, None)
+    assert governor.size_bytes <= governor.max_bytes
+    reports = {r.function: r for r in governor.report()}
+    assert reports['furigana'].evictions == 1 and reports['furigana'].entries == 0
+    assert reports['translate'].entries == 2 and reports['translate'].hit_rate == 1.0
+
+    # A value over the whole budget isn't kept
+    governor.put('translate', 'huge', 'x' * 10_000)
+    assert governor.get('translate', 'huge') == (False, None)
+
+    governor.discard('translate', 'a')
+    assert governor.get('translate', 'a') == (False, None)
+    assert governor.size_bytes == estimate_size(value) * 2
+
+
+def test_governor_lfu_and_ttl():
+    """Test that the LFU policy evicts the least used entry and that expired entries are dropped."""
+    value = 'x' * 1000
+    governor = CacheGovernor(max_bytes=2 * estimate_size(value), policy=LFU)
+    governor.put('f', 'often', value)
+    governor.put('f', 'once', value)
+    for _ in range(3):
+        governor.get('f', 'often')
+    governor.get('f', 'once')
+    governor.put('f', 'new', value)
+    assert governor.get('f', 'often')[0] and not governor.get('f', 'once')[0]
+
+    expired = CacheGovernor(max_bytes=10_000, ttl=0)
+    expired.put('f', 'k', value)
+    assert expired.get('f', 'k') == (False, None)
+    assert expired.report()[0].expirations == 1
+
+    with pytest.raises(ValueError):
+        CacheGovernor(1, policy='fifo')
+
+
+def test_governor_peek_leaves_stats_and_order():
+    """Test that peeking returns a value without counting it or saving it from eviction."""
+    value = 'x' * 1000
+    governor = CacheGovernor(max_bytes=2 * estimate_size(value))
+    governor.put('f', 'old', value)
+    governor.put('f', 'new', value)
+    assert governor.peek('f', 'old') == value and governor.peek('f', 'missing') is None
+
+    governor.put('f', 'newest', value)
+    assert governor.peek('f', 'old') is None
+    report = governor.report()[0]
+    assert (report.hits, report.misses, report.evictions) == (0, 0, 1)
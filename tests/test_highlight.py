@@ -0,0 +1,48 @@
+import pandas as pd
+
+from src.highlight import HIGHLIGHT_FORMATS, highlight_variants, join_parts, split_on_word
+
+
+def test_highlight_variants_match_str_replace():
+    """Test that the variants built in one pass match replacing the word in every sentence."""
+    data = pd.DataFrame(
+        {
+            'Word': ['hola', 'mundo', 'es'],
+            'Sentence': ['Hola hola amigo', 'El mundo es grande', 'Esto es esencial'],
+            'translated_word': ['hello', 'world', 'is'],
+        }
+    )
+    variants = highlight_variants(
+        data['Sentence'].tolist(), data['Word'].tolist(), translations=data['translated_word'].tolist()
+    )
+    assert set(variants) == set(HIGHLIGHT_FORMATS)
+    assert (
+        variants['Replace with underscore'] == data.apply(lambda x: x.Sentence.replace(x.Word, '_'), axis=1).tolist()
+    )
+    assert variants['Surround with {} brackets'] == [
+        'Hola {hola} amigo',
+        'El {mundo} es grande',
+        'Esto {es} {es}encial',
+    ]
+    assert variants['Bold'][1] == 'El <b>mundo</b> es grande'
+    assert variants['Cloze deletion'][0] == 'Hola {{c1::hello::hola}} amigo'
+
+
+def test_highlight_word_boundary():
+    """Test that only whole words are highlighted when asked to."""
+    variants = highlight_variants(
+        ['Esto es esencial', 'cat concatenate cat.'], ['es', 'cat'], ['Bold'], word_boundary=True
+    )
+    assert variants['Bold'] == ['Esto <b>es</b> esencial', '<b>cat</b> concatenate <b>cat</b>.']
+
+
+def test_highlight_missing_values():
+    """Test that missing sentences, words and translations are left as they are."""
+    sentences = ['El mundo', None, 'Sin palabra', 'Otra frase']
+    words = ['mundo', 'x', '', float('nan')]
+    parts = split_on_word(sentences, words)
+    assert join_parts(parts, words, '_') == ['El _', None, 'Sin palabra', 'Otra frase']
+    # Rows without a translation still get a cloze deletion of the word
+    assert join_parts(parts, words, HIGHLIGHT_FORMATS['Cloze deletion'], [None, None, None, None])[0] == (
+        'El {{c1::mundo}}'
+    )
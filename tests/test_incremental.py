@@ -0,0 +1,105 @@
+import datetime
+import os
+import sqlite3
+import tempfile
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.incremental import SyncStore, get_sync_store, lookup_fingerprint, max_lookup_timestamp, vocab_source_key
+from tests.test_utils import FakeUploadedFile, _create_test_db
+
+
+def _append_lookup(db_bytes: bytes, delete_first: bool = False) -> bytes:
+    """Simulate a later copy of the same device's vocab.db with one more lookup."""
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as fp:
+        fp.write(db_bytes)
+        path = fp.name
+    con = sqlite3.connect(path)
+    ts = int(datetime.datetime(2023, 3, 1, 9, 0, 0).timestamp() * 1000)
+    con.execute("INSERT INTO WORDS VALUES ('w3', 'gato', 'gato', 'es')")
+    con.execute(f"INSERT INTO LOOKUPS VALUES ('w3', 'b1', 'El gato duerme', {ts})")
+    if delete_first:
+        # The user deleted the earliest word on the Kindle
+        con.execute("DELETE FROM LOOKUPS WHERE word_key = 'w1'")
+    con.commit()
+    con.close()
+    with open(path, 'rb') as f:
+        new_bytes = f.read()
+    os.unlink(path)
+    return new_bytes
+
+
+@patch('src.utils.st')
+def test_incremental_extraction_after_watermark(mock_st):
+    """Test that the source key is stable as the database grows and only newer lookups are extracted."""
+    from src.utils import get_data_from_vocab, get_vocab_sync_info
+
+    old_db = FakeUploadedFile(_create_test_db())
+    new_db = FakeUploadedFile(_append_lookup(old_db.getvalue()))
+
+    old_key, old_watermark, _ = get_vocab_sync_info(old_db)
+    new_key, new_watermark, _ = get_vocab_sync_info(new_db)
+    assert old_key == new_key
+    assert new_watermark > old_watermark
+
+    new_rows = get_data_from_vocab(new_db, since=old_watermark)
+    assert new_rows['Word'].tolist() == ['gato']
+
+
+@patch('src.utils.st')
+def test_source_key_survives_deleted_lookup(mock_st):
+    """Test that a synced device is recognized after its earliest lookup is deleted."""
+    from src.utils import get_vocab_sync_info
+
+    old_db = FakeUploadedFile(_create_test_db())
+    new_db = FakeUploadedFile(_append_lookup(old_db.getvalue(), delete_first=True))
+
+    old_key, old_watermark, fingerprint = get_vocab_sync_info(old_db)
+    assert get_vocab_sync_info(new_db)[0] != old_key
+    get_sync_store().save(old_key, pd.DataFrame({'Word': ['hola', 'mundo']}), old_watermark, fingerprint)
+
+    assert get_vocab_sync_info(new_db)[0] == old_key
+
+
+def test_sync_store_merges_and_advances_watermark(tmp_path):
+    """Test that saved datasets are merged without duplicated lookups."""
+    store = SyncStore(tmp_path)
+    first = pd.DataFrame(
+        {
+            'Word': ['hola', 'mundo'],
+            'Sentence': ['Hola', 'Mundo'],
+            'Timestamp': ['t1', 't2'],
+            'translated_word': ['hi', 'world'],
+        }
+    )
+    store.save('device', first, 100)
+    second = pd.DataFrame(
+        {
+            'Word': ['mundo', 'gato'],
+            'Sentence': ['Mundo', 'Gato'],
+            'Timestamp': ['t2', 't3'],
+            'translated_word': ['earth', 'cat'],
+        }
+    )
+    merged = store.save('device', second, 200)
+
+    assert merged['Word'].tolist() == ['hola', 'mundo', 'gato']
+    assert merged['translated_word'].tolist() == ['hi', 'earth', 'cat']
+    state = store.get('device')
+    assert state is not None and state.watermark == 200 and state.rows == 3
+    pd.testing.assert_frame_equal(SyncStore(tmp_path).load_dataset('device'), merged)
+
+    store.reset('device')
+    assert store.get('device') is None
+
+
+def test_vocab_source_key_on_connection():
+    """Test the helpers against a raw SQLite connection."""
+    con = sqlite3.connect(':memory:')
+    con.execute('CREATE TABLE LOOKUPS (word_key TEXT, book_key TEXT, usage TEXT, timestamp INTEGER)')
+    con.execute("INSERT INTO LOOKUPS VALUES ('w1', 'b1', 'x', 5), ('w2', 'b1', 'y', 7)")
+    assert max_lookup_timestamp(con) == 7
+    assert len(vocab_source_key(con)) == 16
+    assert lookup_fingerprint(con)[0] == vocab_source_key(con)
+    assert len(lookup_fingerprint(con)) == 2
@@ -0,0 +1,109 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.governor import CacheGovernor, estimate_size
+from src.jobs import CANCELLED, FAILED, FINISHED, JOB_RESULTS, JobRegistry
+
+
+def _wait(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+
+
+def test_job_progress_and_result():
+    """Test that a job reports its progress, warnings, previews and result."""
+    registry = JobRegistry()
+
+    def work(job):
+        total = 0
+        for i in job.progress(range(4), desc='Counting'):
+            total += i
+        job.warn('careful')
+        job.set_partial('total', total)
+        partials.append(job.partial)
+        return total
+
+    partials = []
+    job = registry.submit(work, 'count')
+    _wait(job)
+    assert (job.state, job.result, job.done, job.total) == (FINISHED, 6, 4, 4)
+    assert job.warnings == ['careful'] and partials == [{'total': 6}]
+    # The previews are dropped once the result is there
+    assert job.partial == {}
+    assert registry.get(job.id) is job
+
+
+def test_job_results_count_towards_memory_budget():
+    """Test that finished results are kept within the byte budget and freed once they're taken."""
+    value = 'x' * 1000
+    governor = CacheGovernor(max_bytes=2 * estimate_size(value))
+    registry = JobRegistry(governor=governor)
+
+    jobs = [registry.submit(lambda job: value) for _ in range(3)]
+    for job in jobs:
+        _wait(job)
+    assert [job.result for job in jobs].count(value) == 2
+    assert {r.function: r for r in governor.report()}[JOB_RESULTS].evictions == 1
+
+    # Polling a job isn't counted as cache traffic
+    assert {r.function: r for r in governor.report()}[JOB_RESULTS].hits == 0
+
+    for job in jobs:
+        job.release()
+    assert governor.size_bytes == 0
+
+
+def test_job_cancel_and_failure():
+    """Test that a cancelled job stops at its next progress step and that errors are kept on the job."""
+    registry = JobRegistry()
+    started = threading.Event()
+    seen = []
+
+    def slow(job):
+        for i in job.progress(range(100)):
+            started.set()
+            seen.append(i)
+            time.sleep(0.01)
+
+    job = registry.submit(slow)
+    assert started.wait(5)
+    job.cancel()
+    _wait(job)
+    assert job.state == CANCELLED and len(seen) < 100
+
+    def broken(job):
+        raise ValueError('boom')
+
+    failed = registry.submit(broken)
+    _wait(failed)
+    assert failed.state == FAILED and str(failed.error) == 'boom'
+
+
+@pytest.mark.filterwarnings('ignore')
+def test_start_translation_job_reports_columns():
+    """Test that a translation job runs without Streamlit and publishes every column as soon as it's translated."""
+    from src.utils import start_translation_job
+
+    df = pd.DataFrame({'Word': ['hola', 'casa'], 'Word language': ['es', 'es'], 'Sentence': ['Hola', 'La casa']})
+    partials = []
+    with (
+        patch('src.pipeline.google_translate', side_effect=lambda text, source, target: text.upper()),
+        patch(
+            'src.jobs.Job.set_partial',
+            autospec=True,
+            side_effect=lambda job, key, value: partials.append((key, value)),
+        ),
+    ):
+        job = start_translation_job(df, lang='en', to_translate=['Word'], translate_option='Word only')
+        _wait(job)
+
+    assert job.state == FINISHED
+    assert job.result['translated_word'].tolist() == ['HOLA', 'CASA']
+    assert partials == [('translated_word', ['HOLA', 'CASA'])]
+    assert job.step == 'Translating...' and job.done == job.total == 2
@@ -0,0 +1,63 @@
+import datetime
+import sqlite3
+from pathlib import Path
+
+from src.merge import SOURCE_COLUMN, load_vocab_sources, merge_sources, read_source
+from src.query import VocabFilter, VocabQuery
+from tests.test_utils import _create_test_db
+
+
+def _second_device_db(tmp_path: Path) -> bytes:
+    """Another Kindle that shares one lookup with `_create_test_db`."""
+    path = tmp_path / 'second.db'
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE WORDS (id TEXT, word TEXT, stem TEXT, lang TEXT)')
+    con.execute('CREATE TABLE BOOK_INFO (id TEXT, title TEXT, authors TEXT)')
+    con.execute('CREATE TABLE LOOKUPS (word_key TEXT, book_key TEXT, usage TEXT, timestamp INTEGER)')
+    ts_shared = int(datetime.datetime(2023, 1, 15, 10, 0, 0).timestamp() * 1000)
+    ts_new = int(datetime.datetime(2023, 1, 20, 8, 0, 0).timestamp() * 1000)
+    con.execute("INSERT INTO WORDS VALUES ('x1', 'hola', 'hola', 'es'), ('x2', 'Haus', 'Haus', 'de')")
+    con.execute("INSERT INTO BOOK_INFO VALUES ('k1', 'Test Book', 'Test Author'), ('k2', 'Buch', 'Autor')")
+    con.execute(
+        f"INSERT INTO LOOKUPS VALUES ('x1', 'k1', 'Hola amigo', {ts_shared}), ('x2', 'k2', 'Das Haus', {ts_new})"
+    )
+    con.commit()
+    con.close()
+    return path.read_bytes()
+
+
+def test_merge_sources_keeps_provenance(tmp_path):
+    """Test that lookups of several devices are merged once, with the devices that have them."""
+    merged = merge_sources(
+        [read_source('kindle', _create_test_db()), read_source('paperwhite', _second_device_db(tmp_path))]
+    )
+
+    assert merged['Word'].tolist() == ['hola', 'Haus', 'mundo']
+    assert merged[SOURCE_COLUMN].tolist() == ['kindle, paperwhite', 'paperwhite', 'kindle']
+
+
+def test_load_vocab_sources_in_parallel(tmp_path):
+    """Test that databases are loaded in parallel, same names are told apart and broken ones reported."""
+    sources = [
+        ('vocab.db', _create_test_db()),
+        ('vocab.db', _second_device_db(tmp_path)),
+        ('broken.db', b'not a database'),
+    ]
+    progress = []
+    merged, errors = load_vocab_sources(sources, workers=3, progress=lambda done, total: progress.append(total))
+
+    assert set(errors) == {'broken.db'}
+    assert progress == [3, 3, 3]
+    assert merged[SOURCE_COLUMN].tolist() == ['vocab.db, vocab.db #2', 'vocab.db #2', 'vocab.db']
+
+
+def test_query_keeps_source_column(tmp_path):
+    """Test that the query over merged data returns and filters the source column."""
+    merged = merge_sources(
+        [read_source('kindle', _create_test_db()), read_source('paperwhite', _second_device_db(tmp_path))]
+    )
+    query = VocabQuery.from_frame(merged)
+
+    assert query.fetch().equals(merged)
+    assert query.fetch(VocabFilter(langs=('de',)))[SOURCE_COLUMN].tolist() == ['paperwhite']
+    assert query.distinct(SOURCE_COLUMN) == ['kindle, paperwhite', 'paperwhite', 'kindle']
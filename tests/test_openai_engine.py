@@ -0,0 +1,211 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Set, Tuple
+from unittest.mock import patch
+
+import pytest
+
+from src.openai_engine import MAX_BATCH_ITEMS, iter_openai_batches, parse_output, plan_batches
+from src.resilience import get_breaker
+
+
+def _response_body(text: str) -> Dict[str, Any]:
+    return {
+        'id': 'resp_stub',
+        'object': 'response',
+        'created_at': 0,
+        'model': 'stub',
+        'status': 'completed',
+        'parallel_tool_calls': False,
+        'tool_choice': 'auto',
+        'tools': [],
+        'output': [
+            {
+                'type': 'message',
+                'id': 'msg_stub',
+                'status': 'completed',
+                'role': 'assistant',
+                'content': [{'type': 'output_text', 'text': text, 'annotations': []}],
+            }
+        ],
+    }
+
+
+class StubState:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.rate_limit_first = 0
+        self.delay = 0.05
+        self.base_url = ''
+        # Words left out of the first answer that contains them
+        self.missing_once: Set[str] = set()
+        self.prompts: List[str] = []
+
+
+@pytest.fixture
+def stub_openai() -> Iterator[Any]:
+    """Local HTTP server answering the Responses API with upper-cased words."""
+    state = StubState()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with state.lock:
+                state.requests += 1
+                limited = state.requests <= state.rate_limit_first
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            try:
+                if limited:
+                    self._send(429, {'error': {'message': 'slow down', 'type': 'rate_limit'}}, {'retry-after': '0.05'})
+                    return
+                time.sleep(state.delay)
+                with state.lock:
+                    state.prompts.append(body['input'])
+                numbered = re.findall(r'(\d+)\. Word: "([^"]+)"', body['input'])
+                if numbered and 'text' in body:
+                    with state.lock:
+                        skipped = state.missing_once.intersection(word for _, word in numbered)
+                        state.missing_once -= skipped
+                    entries = [
+                        {'id': int(n), 'translation': word.upper()} for n, word in numbered if word not in skipped
+                    ]
+                    text = json.dumps({'translations': entries})
+                elif numbered:
+                    text = '\n'.join(f'{n}. {word.upper()}' for n, word in numbered)
+                else:
+                    match = re.search(r'Translate the word "([^"]+)"', body['input'])
+                    text = match.group(1).upper() if match else ''
+                self._send(200, _response_body(text))
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+        def _send(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = {}) -> None:
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.base_url = f'http://127.0.0.1:{server.server_address[1]}/v1'
+    yield state
+    server.shutdown()
+
+
+def _batches(n_batches: int, size: int) -> List[List[Tuple[str, str, str]]]:
+    return [[('es', f'frase {b}-{i}', f'palabra{b}x{i}') for i in range(size)] for b in range(n_batches)]
+
+
+def test_parse_output_numbered_lines():
+    """Test that numbered lines are mapped to batch positions and gaps stay empty."""
+    assert parse_output('1. hello, hi\n3. "world"\nnoise', 3) == ['hello, hi', '', 'world']
+    assert parse_output('"hello"\nhi', 1) == ['hello, hi']
+
+
+def test_parse_output_json():
+    """Test that the structured output is mapped by item id."""
+    output = '{"translations": [{"id": 2, "translation": "world"}, {"id": 1, "translation": "hello, hi"}]}'
+    assert parse_output(output, 3) == ['hello, hi', 'world', '']
+
+
+def test_plan_batches_token_budget():
+    """Test that batches are sized by the token budget of the model and capped in items."""
+    short = [('es', 'Hola.', f'w{i}') for i in range(100)]
+    long = [('es', 'palabra ' * 200, f'w{i}') for i in range(10)]
+
+    assert all(len(batch) == MAX_BATCH_ITEMS for batch in plan_batches(short, 'gpt-4o-mini')[:-1])
+    assert [i for batch in plan_batches(short, 'gpt-4o-mini') for i in batch] == list(range(100))
+    assert len(plan_batches(long, 'gpt-4.1-nano')) > len(plan_batches(long, 'gpt-4.1')) > 1
+
+
+def test_engine_requests_only_missing_items(stub_openai):
+    """Test that items missing from a structured answer are requested again on their own."""
+    stub_openai.missing_once = {'palabra0x1', 'palabra0x3'}
+    results = list(iter_openai_batches(_batches(1, 5), 'en', 'sk-test', 'gpt-4o-mini', base_url=stub_openai.base_url))
+
+    assert results == [(0, ['PALABRA0X0', 'PALABRA0X1', 'PALABRA0X2', 'PALABRA0X3', 'PALABRA0X4'], None)]
+    assert stub_openai.requests == 2
+    assert re.findall(r'Word: "([^"]+)"', stub_openai.prompts[1]) == ['palabra0x1', 'palabra0x3']
+
+
+def test_engine_keeps_batches_in_flight(stub_openai):
+    """Test that several batches run concurrently and every batch gets its own results."""
+    batches = _batches(8, 3)
+    results = {
+        idx: outputs
+        for idx, outputs, error in iter_openai_batches(
+            batches, 'en', 'sk-test', 'gpt-4o-mini', concurrency=4, base_url=stub_openai.base_url
+        )
+    }
+
+    assert [results[idx] for idx in range(8)] == [[word.upper() for _, _, word in batch] for batch in batches]
+    assert 1 < stub_openai.max_in_flight <= 4
+
+
+def test_engine_retries_rate_limited_requests(stub_openai):
+    """Test that 429 responses are retried after the server-provided delay."""
+    stub_openai.rate_limit_first = 2
+    results = list(iter_openai_batches(_batches(2, 1), 'en', 'sk-test', 'gpt-4o-mini', base_url=stub_openai.base_url))
+
+    assert all(error is None for _, _, error in results)
+    assert stub_openai.requests == 4
+
+
+def test_slow_batches_do_not_open_the_circuit(stub_openai):
+    """Test that batches answered slowly, but within the time their size allows, don't count as failures."""
+    stub_openai.delay = 0.4
+    batches = _batches(5, 10)
+    # Far shorter than the answers without the time per item
+    with patch('src.openai_engine.REQUEST_TIMEOUT', 0.1), patch('src.openai_engine.REQUEST_TIMEOUT_PER_ITEM', 0.05):
+        results = list(
+            iter_openai_batches(batches, 'en', 'sk-test', 'gpt-4o-mini', concurrency=5, base_url=stub_openai.base_url)
+        )
+
+    assert all(error is None for _, _, error in results) and len(results) == 5
+    assert stub_openai.requests == 5
+    assert get_breaker('openai').state == 'closed'
+
+
+def test_engine_stops_sending_when_closed(stub_openai):
+    """Test that closing the iterator early sends no further requests."""
+    stub_openai.delay = 0.2
+    results = iter_openai_batches(
+        _batches(40, 1), 'en', 'sk-test', 'gpt-4o-mini', concurrency=2, base_url=stub_openai.base_url
+    )
+    next(results)
+    results.close()
+    sent = stub_openai.requests
+    time.sleep(0.5)
+
+    assert sent <= 4
+    assert stub_openai.requests == sent
+
+
+def test_translate_openai_falls_back_to_google(stub_openai, monkeypatch):
+    """Test order-preserving reassembly and the per-item Google fallback when OpenAI returns the word itself."""
+    from src.pipeline import translate_openai
+
+    monkeypatch.setenv('OPENAI_BASE_URL', stub_openai.base_url)
+    data = [('es', f'frase {i}', f'palabra{i}') for i in range(25)] + [('es', 'frase', 'SAME')]
+
+    with patch('src.pipeline.google_translate', return_value='google') as mock_google:
+        result = translate_openai(data, 'en', 'sk-test', 'gpt-4o-mini', 3)
+
+    assert result == [f'PALABRA{i}' for i in range(25)] + ['google']
+    mock_google.assert_called_once_with('SAME', 'es', 'en')
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from src.packing import MAX_PACK_CHARS, encoded_length, join_pack, make_packs, split_pack
+
+
+def test_make_packs_groups_by_language_and_length():
+    """Test that packs never mix source languages or exceed the size limit."""
+    items = [('es', 'uno'), ('de', 'eins'), ('es', 'dos'), ('es', 'tres'), ('de', 'zwei')]
+    assert make_packs(items, range(5)) == [[0, 2, 3], [1, 4]]
+
+    # 'uno%0Ados' is 9 characters, adding '%0Atres' would make it 16
+    assert make_packs(items, [0, 2, 3], max_chars=10) == [[0, 2], [3]]
+
+
+def test_make_packs_budgets_encoded_length():
+    """Test that non-Latin texts, which grow when URL-encoded, are packed within the limit of the request."""
+    items = [('ru', 'слово ' * 70), ('ru', 'книга ' * 70), ('ja', '言葉' * 200), ('es', 'palabra ' * 60)] * 2
+    packs = make_packs(items, range(len(items)))
+
+    assert all(encoded_length(join_pack([items[i][1] for i in pack])) <= MAX_PACK_CHARS for pack in packs)
+    # 420 characters of Cyrillic take 2310 once encoded, so only one fits into a pack
+    assert [0] in packs and [4] in packs
+    # The Spanish texts would fit even before encoding
+    assert [3, 7] in packs
+
+
+def test_make_packs_isolates_unsafe_texts():
+    """Test that texts containing the separator or missing values get their own request."""
+    items = [('es', 'uno'), ('es', 'dos\ntres'), ('es', None), ('es', 'cuatro')]
+    assert sorted(make_packs(items, range(4))) == [[0, 3], [1], [2]]
+
+
+def test_split_pack():
+    """Test splitting translated packs and detecting count mismatches."""
+    assert split_pack(' one \ntwo\nthree', 3) == ['one', 'two', 'three']
+    assert split_pack('one\n\ntwo\nthree\n', 3) == ['one', 'two', 'three']
+    assert split_pack('one two\nthree', 3) is None
+    assert split_pack(join_pack(['a', 'b']), 2) == ['a', 'b']
+
+
+def test_translate_packed_falls_back_only_for_broken_pack():
+    """Test that a pack whose split fails is retried per item while other packs stay packed."""
+    from src.pipeline import translate
+
+    def fake_google(text: str, source: str, target: str) -> str:
+        if source == 'de' and '\n' in text:
+            # Merge the lines, so the pack can't be split
+            return text.upper().replace('\n', ' ')
+        return text.upper()
+
+    data = [('es', 'uno'), ('de', 'eins'), ('es', 'dos'), ('de', 'zwei')]
+    with patch('src.pipeline.google_translate', side_effect=fake_google) as mock_google:
+        result = translate(data, 'en', pack=True)
+
+    assert result == ['UNO', 'EINS', 'DOS', 'ZWEI']
+    # one request for the 'es' pack, one failed 'de' pack and two per-item retries
+    assert mock_google.call_count == 4
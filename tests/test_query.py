@@ -0,0 +1,125 @@
+import datetime
+import gc
+
+import pandas as pd
+
+from src.checkpoint import fingerprint
+from src.query import VocabFilter, VocabQuery, _queries, get_vocab_query, vocab_query_report
+from src.vocab import connect_vocab, iter_lookup_chunks
+from tests.test_utils import _create_test_db
+
+
+def _filter_in_pandas(data: pd.DataFrame, f: VocabFilter) -> pd.DataFrame:
+    """Apply the step 2 filters to the loaded data frame, as the page used to do."""
+    data = data.sort_values([f.sort_by, 'Timestamp'])
+    if f.top_n is not None:
+        data = data[-f.top_n :]
+    if f.start_date is not None:
+        data = data.loc[pd.to_datetime(data['Timestamp']).dt.date >= f.start_date]
+    for col, values in (('Book title', f.books), ('Authors', f.authors), ('Word language', f.langs)):
+        if values:
+            data = data.loc[data[col].isin(values)]
+    return data.reset_index(drop=True)
+
+
+def _sample_data() -> pd.DataFrame:
+    return pd.read_csv('data_example/example_data.csv')[
+        ['Word', 'Stem', 'Word language', 'Sentence', 'Book title', 'Authors', 'Timestamp']
+    ]
+
+
+def test_query_filters_match_pandas():
+    """Test that the filters compiled to SQL select the same rows as in pandas."""
+    data = _sample_data()
+    query = VocabQuery.from_frame(data)
+    first_book = data['Book title'].iloc[0]
+    middle_date = pd.to_datetime(data['Timestamp']).dt.date.sort_values().iloc[data.shape[0] // 2]
+
+    filters = [
+        VocabFilter(),
+        VocabFilter(top_n=10),
+        VocabFilter(top_n=10, sort_by='Word'),
+        VocabFilter(start_date=middle_date),
+        VocabFilter(books=(first_book,)),
+        VocabFilter(top_n=20, start_date=middle_date, langs=tuple(data['Word language'].unique()[:1])),
+    ]
+    for f in filters:
+        expected = _filter_in_pandas(data, f)
+        assert query.count(f) == expected.shape[0]
+        pd.testing.assert_frame_equal(query.fetch(f), expected, check_dtype=False)
+
+
+def test_query_distinct_and_date_range():
+    """Test that the distinct values and the date range cover the filtered rows, also when none are left."""
+    data = _sample_data()
+    query = VocabQuery.from_frame(data)
+
+    assert sorted(query.distinct('Book title')) == sorted(data['Book title'].unique())
+    assert query.distinct('Word language', VocabFilter(top_n=0)) == []
+
+    dates = pd.to_datetime(data['Timestamp']).dt.date
+    assert query.date_range() == (dates.min(), dates.max())
+    assert query.date_range(VocabFilter(top_n=0)) == (None, None)
+
+
+def test_query_from_bytes_matches_loader():
+    """Test that a query over vocab.db returns the lookups of the loader, also after a watermark."""
+    db_bytes = _create_test_db()
+    loaded = pd.concat(iter_lookup_chunks(connect_vocab(db_bytes)), ignore_index=True)
+    query = VocabQuery.from_bytes(db_bytes)
+
+    pd.testing.assert_frame_equal(query.fetch(), loaded)
+    assert query.fetch(VocabFilter(top_n=1))['Word'].tolist() == ['mundo']
+    assert query.count(VocabFilter(start_date=datetime.date(2023, 2, 1))) == 1
+
+    since = int(datetime.datetime(2023, 2, 1).timestamp() * 1000)
+    assert VocabQuery.from_bytes(db_bytes, since).distinct('Word') == ['mundo']
+
+
+def test_query_drop_duplicates_and_chunks():
+    """Test that duplicates are dropped in SQL like in pandas and that chunks add up to the full result."""
+    data = _sample_data()
+    data = pd.concat([data, data.iloc[:5].assign(Timestamp='2030-01-01 10:00:00')], ignore_index=True)
+    query = VocabQuery.from_frame(data)
+
+    for sort_by in ('Timestamp', 'Word'):
+        f = VocabFilter(sort_by=sort_by, drop_duplicates=True)
+        expected = _filter_in_pandas(data, f).drop_duplicates('Word', keep='last').reset_index(drop=True)
+        assert query.count(f) == expected.shape[0]
+        assert sorted(query.fetch(f)['Timestamp']) == sorted(expected['Timestamp'])
+
+        chunks = list(query.iter_fetch(f, chunksize=7))
+        assert all(chunk.shape[0] <= 7 for chunk in chunks)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), query.fetch(f))
+
+
+def test_query_keeps_lookups_without_author():
+    """Test that a lookup without an author is kept when the None option of the author filter is selected."""
+    data = _sample_data()
+    data.loc[0, 'Authors'] = None
+    query = VocabQuery.from_frame(data)
+    author = data['Authors'].iloc[1]
+
+    assert None in query.distinct('Authors')
+    for authors in ((author, None), (author,), (None,)):
+        f = VocabFilter(authors=authors)
+        expected = _filter_in_pandas(data, f)
+        assert query.count(f) == expected.shape[0]
+        pd.testing.assert_frame_equal(query.fetch(f), expected, check_dtype=False)
+    assert query.count(VocabFilter(authors=(None,))) == 1
+
+
+def test_vocab_query_is_shared_by_sessions():
+    """Test that sessions with the same data share one query, which is dropped once no session holds it."""
+    data = _sample_data()
+    before = vocab_query_report()
+    query = get_vocab_query(data)
+    assert get_vocab_query(data.copy()) is query
+    report = vocab_query_report()
+    assert (report.hits - before.hits, report.misses - before.misses) == (1, 1)
+    assert report.size_bytes >= query.size_bytes() > 0
+    assert get_vocab_query(data.iloc[1:]) is not query
+
+    del query
+    gc.collect()
+    assert fingerprint(data) not in _queries
@@ -0,0 +1,84 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from deep_translator.exceptions import TooManyRequests
+
+from src import pipeline
+from src.resilience import (
+    FAILURE_THRESHOLD,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    get_breaker,
+    resilient_call,
+)
+
+NO_WAIT = RetryPolicy(max_retries=2, backoff_base=0, timeout=1)
+
+
+def test_circuit_breaker_states():
+    """Test that the circuit opens after consecutive failures and closes after a successful trial call."""
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    assert breaker.state == 'half-open'
+    breaker.before_call()
+    # Only one trial call at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_resilient_call_retries_transient_errors():
+    """Test that transient errors are retried, other errors raised at once and slow calls timed out."""
+    func = MagicMock(side_effect=[ConnectionError(), ConnectionError(), 'ok'])
+    assert resilient_call('retry', func, lambda e: isinstance(e, ConnectionError), NO_WAIT) == 'ok'
+    assert func.call_count == 3
+
+    func = MagicMock(side_effect=ValueError('no translation'))
+    with pytest.raises(ValueError):
+        resilient_call('retry', func, lambda e: isinstance(e, ConnectionError), NO_WAIT)
+    assert func.call_count == 1
+
+    with pytest.raises(TimeoutError):
+        resilient_call('slow', lambda: time.sleep(0.5), lambda e: False, NO_WAIT._replace(max_retries=0, timeout=0.05))
+
+
+@patch('src.resilience.backoff_delay', return_value=0)
+@patch('src.pipeline.GoogleTranslator')
+def test_throttled_google_is_skipped(mock_translator, mock_delay):
+    """Test that once Google keeps throttling, the remaining words aren't sent and one warning is shown."""
+    mock_translator.return_value.translate.side_effect = TooManyRequests()
+    warn = MagicMock()
+
+    data = [('es', f'palabra{i}') for i in range(50)]
+    assert pipeline.translate(data, 'en', warn=warn) == [text for _, text in data]
+
+    assert mock_translator.return_value.translate.call_count == FAILURE_THRESHOLD
+    # The first word fails on its own, the other 49 are reported together
+    assert warn.call_count == 2
+    assert 'texts were not translated' in warn.call_args[0][0]
+
+
+def test_rate_limit_wait_is_outside_the_timeout():
+    """Test that waiting for the rate limiter before a call neither times it out nor counts as a failure."""
+    waits = []
+
+    def wait_for_token():
+        time.sleep(0.2)
+        waits.append(time.monotonic())
+
+    policy = NO_WAIT._replace(max_retries=0, timeout=0.1)
+    assert resilient_call('limited', lambda: 'ok', lambda e: False, policy, before_attempt=wait_for_token) == 'ok'
+    assert len(waits) == 1
+    assert get_breaker('limited').state == 'closed'
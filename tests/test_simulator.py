@@ -0,0 +1,69 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from benchmarks.load import main
+from benchmarks.simulator import OK, RATE_LIMITED, Latency, SimulatorConfig, TranslationSimulator
+from src import pipeline
+from src.resilience import FAILURE_THRESHOLD, get_breaker
+
+
+@pytest.fixture
+def simulator(monkeypatch):
+    with TranslationSimulator() as sim:
+        monkeypatch.setenv(pipeline.GOOGLE_URL_ENV, sim.google_url)
+        monkeypatch.setenv('OPENAI_BASE_URL', sim.openai_url)
+        yield sim
+
+
+def test_google_paths_against_simulator(simulator):
+    """Test that single and packed Google requests are answered by the simulator."""
+    data = [('es', 'hola'), ('es', 'casa'), ('de', 'haus')]
+
+    assert pipeline.translate(data, 'en', pack=True) == ['HOLA', 'CASA', 'HAUS']
+    assert [record.outcome for record in simulator.records] == [OK, OK]
+    assert pipeline.translate_with_context([('es', 'la casa roja', 'roja')], 'en') == ['ROJA']
+
+
+def test_simulated_faults(simulator):
+    """Test that rate limited requests and malformed batch outputs reach the fallbacks of the pipeline."""
+    simulator.config = SimulatorConfig(rate_limit=1.0)
+    warn = MagicMock()
+    assert pipeline.translate([('es', 'hola')], 'en', warn=warn) == ['hola']
+    warn.assert_called_once()
+    assert simulator.records[-1].outcome == RATE_LIMITED
+
+    simulator.config = SimulatorConfig(malformed=1.0)
+    data = [('es', f'frase {i}', f'palabra{i}') for i in range(3)]
+    with patch('src.pipeline.google_translate', return_value='google'):
+        result = pipeline.translate_openai(data, 'en', 'sk-test', 'simulated')
+    # The middle item is missing from the batch output and falls back to Google Translate
+    assert result == ['PALABRA0', 'google', 'PALABRA2']
+
+
+def test_latency_parse():
+    """Test that latency specifications are parsed and unknown distributions rejected."""
+    assert Latency.parse('uniform:0.1:0.2') == Latency('uniform', 0.1, 0.2)
+    with pytest.raises(ValueError):
+        Latency.parse('normal:1')
+
+
+def test_load_harness(tmp_path):
+    """Test that the load harness reports requests and latency percentiles for every path."""
+    output = tmp_path / 'load.json'
+    assert main(['--items', '20', '--paths', 'google_pack', 'openai', '--latency', 'fixed:0', '-o', str(output)]) == 0
+    results = json.loads(output.read_text())['results']
+    assert [r['path'] for r in results] == ['google_pack', 'openai']
+    assert all(r['requests'] > 0 and r['p99_ms'] >= r['p50_ms'] for r in results)
+
+
+def test_load_harness_closes_circuits_before_every_path(tmp_path):
+    """Test that a circuit left open, e.g. by the failures of a previous path, doesn't turn a path into rejections."""
+    breaker = get_breaker('google')
+    for _ in range(FAILURE_THRESHOLD):
+        breaker.record_failure()
+    output = tmp_path / 'load.json'
+    assert main(['--items', '10', '--paths', 'google', '--latency', 'fixed:0', '-o', str(output)]) == 0
+    (result,) = json.loads(output.read_text())['results']
+    assert result['requests'] > 0 and result['warnings'] == 0
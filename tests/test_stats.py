@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from src.stats import compute_stats, dataset_fingerprint, get_vocab_stats, longest_streak
+
+
+def _data() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            'Word': ['a', 'b', 'c', 'd', 'e', 'f'],
+            'Sentence': ['s'] * 6,
+            'Book title': ['Book 1', 'Book 1', 'Book 2', 'Book 1', 'Book 2', 'Book 1'],
+            'Word language': ['es', 'es', 'en', 'es', 'es', 'es'],
+            'Timestamp': [
+                '2023-01-30 10:00:00',
+                '2023-01-31 23:59:59',
+                '2023-02-01 08:00:00',
+                '2023-02-01 09:00:00',
+                '2023-02-05 12:00:00',
+                '2023-02-06 12:00:00',
+            ],
+        }
+    )
+
+
+def test_compute_stats():
+    """Test that the statistics of a dataset match those counted by hand."""
+    stats = compute_stats(_data())
+
+    assert (stats.word_count, stats.book_count, stats.language_count, stats.active_days) == (6, 2, 2, 5)
+    assert stats.avg_per_day == 1.2
+    assert stats.longest_streak == 3
+    assert stats.most_active_book == 'Book 1'
+    assert (stats.first_date, stats.last_date) == ('2023-01-30', '2023-02-06')
+    assert stats.monthly.to_dict('list') == {
+        'Year-month': ['2023-01', '2023-02'],
+        'count': [2, 4],
+        'cumulative': [2, 6],
+    }
+    assert stats.daily['count'].tolist() == [1, 1, 2, 1, 1]
+    assert stats.daily['day_name'].tolist() == ['Mon', 'Tue', 'Wed', 'Sun', 'Mon']
+    assert stats.daily['year_week'].tolist() == ['2023-W05', '2023-W05', '2023-W05', '2023-W05', '2023-W06']
+
+
+def test_longest_streak():
+    """Test that the longest streak counts consecutive days, also for no days or a single one."""
+    assert longest_streak(np.array([], dtype='int64')) == 0
+    assert longest_streak(np.array([5])) == 1
+    assert longest_streak(np.array([1, 3, 4, 5, 9, 10])) == 3
+
+
+def test_stats_cached_by_fingerprint():
+    """Test that equal datasets share their cached statistics and a changed one gets a new fingerprint."""
+    data = _data()
+    same = _data()
+    assert dataset_fingerprint(data) == dataset_fingerprint(same)
+    assert get_vocab_stats(data) is get_vocab_stats(same)
+
+    same.loc[0, 'Word'] = 'z'
+    assert dataset_fingerprint(data) != dataset_fingerprint(same)
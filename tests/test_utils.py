@@ -111,22 +111,17 @@ def _make_test_df():
     )
 
 
-@patch('src.utils.stqdm', side_effect=lambda x, **kwargs: x)
-@patch('src.utils.st')
-def test_make_more_columns_google_translate(mock_st, mock_stqdm):
+def test_make_more_columns_google_translate():
     """Test make_more_columns with Google Translate (mocked)."""
-    from src.utils import make_more_columns
+    from src.pipeline import make_more_columns
 
     df = _make_test_df()
 
     with (
-        patch('src.utils.translate', return_value=['hello', 'world']) as mock_translate,
-        patch('src.utils.translate_with_context', return_value=['hello', 'world']) as mock_ctx,
+        patch('src.pipeline.translate', return_value=['hello', 'world']) as mock_translate,
+        patch('src.pipeline.translate_with_context', return_value=['hello', 'world']) as mock_ctx,
     ):
 
-        # Clear any cache
-        make_more_columns.clear()
-
         result = make_more_columns(
             data=df,
             lang='en',
@@ -140,21 +135,17 @@ def test_make_more_columns_google_translate(mock_st, mock_stqdm):
         assert 'sentence_with_cloze' in result.columns
 
 
-@patch('src.utils.stqdm', side_effect=lambda x, **kwargs: x)
-@patch('src.utils.st')
-def test_make_more_columns_with_context(mock_st, mock_stqdm):
+def test_make_more_columns_with_context():
     """Test make_more_columns with context translation."""
-    from src.utils import make_more_columns
+    from src.pipeline import make_more_columns
 
     df = _make_test_df()
 
     with (
-        patch('src.utils.translate_with_context', return_value=['hello', 'world']),
-        patch('src.utils.translate', return_value=['hello', 'world']),
+        patch('src.pipeline.translate_with_context', return_value=['hello', 'world']),
+        patch('src.pipeline.translate', return_value=['hello', 'world']),
     ):
 
-        make_more_columns.clear()
-
         result = make_more_columns(
             data=df,
             lang='en',
@@ -196,3 +187,105 @@ def test_estimate_openai_cost(mock_st):
     cost_val2 = float(cost2.replace('~$', ''))
     # gpt-4o should be more expensive
     assert cost_val2 > cost_val
+
+
+def test_make_more_columns_translates_unique_values_once():
+    """Test that repeated words are translated once and mapped back onto every row."""
+    from src.pipeline import make_more_columns
+
+    df = pd.DataFrame(
+        {
+            'Word': ['hola', 'mundo', 'hola', 'hola'],
+            'Stem': ['hola', 'mundo', 'hola', 'hola'],
+            'Word language': ['es', 'es', 'es', 'pt'],
+            'Sentence': ['Hola amigo', 'El mundo es grande', 'Hola otra vez', 'Hola amigo'],
+            'Book title': ['Test Book'] * 4,
+            'Authors': ['Test Author'] * 4,
+            'Timestamp': ['2023-01-15 10:00:00'] * 4,
+        }
+    )
+
+    with patch('src.pipeline.translate', side_effect=lambda rows, **kwargs: [f'{lang}:{w}' for lang, w in rows]) as tr:
+        result = make_more_columns(
+            data=df,
+            lang='en',
+            to_translate=['Word'],
+            translate_option='Word only',
+            translation_backend='Google Translate',
+        )
+
+    tr.assert_called_once()
+    assert tr.call_args[0][0] == [('es', 'hola'), ('es', 'mundo'), ('pt', 'hola')]
+    assert result['translated_word'].tolist() == ['es:hola', 'es:mundo', 'es:hola', 'pt:hola']
+    assert result.attrs['dedup_stats'] == {'lookups': 4, 'deduplicated': 1, 'restored': 0, 'reused': 0}
+
+
+def test_make_more_columns_reuses_stem_translations():
+    """Test that inflected forms of a stem share one translation, also used for the Stem column."""
+    from src.pipeline import make_more_columns
+
+    df = pd.DataFrame(
+        {
+            'Word': ['arrimaba', 'arrimó', 'arrimar', 'casas'],
+            'Stem': ['arrimar', 'arrimar', 'arrimar', None],
+            'Word language': ['es'] * 4,
+            'Sentence': ['Se arrimaba', 'Lo arrimó', 'Arrimar algo', 'Las casas'],
+        }
+    )
+
+    with patch('src.pipeline.translate', side_effect=lambda rows, **kwargs: [f'{lang}:{w}' for lang, w in rows]) as tr:
+        result = make_more_columns(df, 'en', ['Word', 'Stem'], 'Word only', reuse_stems=True)
+
+    tr.assert_called_once()
+    assert tr.call_args[0][0] == [('es', 'arrimar'), ('es', 'casas')]
+    assert result['translated_word'].tolist() == ['es:arrimar'] * 3 + ['es:casas']
+    assert result['translated_stem'].tolist() == result['translated_word'].tolist()
+    assert list(result.columns[:4]) == ['Word', 'Stem', 'Word language', 'Sentence']
+    assert '_stem_key' not in result.columns
+    # Two inflected forms share a stem, and the Stem column is copied from the Word column
+    assert result.attrs['dedup_stats'] == {'lookups': 8, 'deduplicated': 2, 'restored': 0, 'reused': 4}
+
+
+def test_format_lookup_timestamps_matches_fromtimestamp(monkeypatch):
+    """Test the vectorized conversion against datetime.fromtimestamp, including DST changes."""
+    import time
+
+    from src.vocab import format_lookup_timestamps
+
+    monkeypatch.setenv('TZ', 'Europe/Berlin')
+    time.tzset()
+    try:
+        # Around the switch to summer time on 2023-03-26 01:00 UTC
+        start = int(datetime.datetime(2023, 3, 26, 0, 0, tzinfo=datetime.timezone.utc).timestamp() * 1000)
+        timestamps = [start + i * 7 * 60 * 1000 + 123 for i in range(30)]
+        expected = [datetime.datetime.fromtimestamp(t / 1000).strftime('%Y-%m-%d %H:%M:%S') for t in timestamps]
+        assert list(format_lookup_timestamps(timestamps)) == expected
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+@patch('src.utils.st')
+def test_lookup_chunks_match_full_load(mock_st):
+    """Test that chunked extraction yields bounded chunks adding up to the full extraction."""
+    from src.utils import get_data_from_vocab
+    from src.vocab import connect_vocab, iter_lookup_chunks
+
+    fake_file = FakeUploadedFile(_create_test_db())
+    chunks = list(iter_lookup_chunks(connect_vocab(fake_file.getvalue()), chunksize=1))
+    progress = []
+    full = get_data_from_vocab(fake_file, progress=lambda loaded, total: progress.append((loaded, total)))
+
+    assert [chunk.shape[0] for chunk in chunks] == [1, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), full)
+    assert progress == [(2, 2)]
+
+
+def test_vocab_loads_through_temporary_file():
+    """Test that vocab.db loads through a temporary file like from memory, for Python before 3.11."""
+    from src.vocab import _copy_from_file, connect_vocab, read_lookups
+
+    db_bytes = _create_test_db()
+    con = sqlite3.connect(':memory:')
+    _copy_from_file(db_bytes, con)
+    pd.testing.assert_frame_equal(read_lookups(con), read_lookups(connect_vocab(db_bytes)))